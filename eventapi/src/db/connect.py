@@ -18,7 +18,7 @@
 #         print(f" Error connecting Mongo : {e}")
 #         return None
 
-from pymongo.mongo_client import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.server_api import ServerApi
 from threading import Lock
 from dotenv import load_dotenv
@@ -39,18 +39,33 @@ class MongoDBSingleton:
         return cls._instance
 
     def _initialize(self):
-        """Initialize MongoDB connection."""
+        """
+        Initialize the async MongoDB client.
+
+        Motor connects lazily on the first operation, so the connection is
+        verified separately with ``ping`` once the event loop is running.
+        """
         uri = os.environ.get("MONGODB")
         try:
-            self.client = MongoClient(uri, server_api=ServerApi('1'))
-            self.client.admin.command('ping')
-            print("Pinged your deployment. You successfully connected to MongoDB!")
+            self.client = AsyncIOMotorClient(uri, server_api=ServerApi('1'))
             self.db = self.client["eventmanagement"]
         except Exception as e:
             print(f"Error connecting to MongoDB: {e}")
             self.client = None
             self.db = None
 
+    async def ping(self) -> bool:
+        """Check that the deployment is reachable."""
+        if self.client is None:
+            return False
+        try:
+            await self.client.admin.command('ping')
+            print("Pinged your deployment. You successfully connected to MongoDB!")
+            return True
+        except Exception as e:
+            print(f"Error connecting to MongoDB: {e}")
+            return False
+
     def get_database(self):
         """Get the database instance."""
         return self.db
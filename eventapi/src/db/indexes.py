@@ -0,0 +1,252 @@
+"""
+Index registry for the MongoDB collections.
+
+Each repository module registers the indexes its queries depend on, together
+with a few representative query shapes. The registry is applied at startup
+and can be checked from the command line:
+
+    python -m db.indexes            # create missing indexes
+    python -m db.indexes --check    # report drift, exit 1 if any
+    python -m db.indexes --explain  # explain every query shape, exit 1 on COLLSCAN
+"""
+import argparse
+import asyncio
+import importlib
+import sys
+from typing import Dict, List, Optional
+
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+
+# Repository modules that register indexes when imported
+REPOSITORY_MODULES = [
+    "repository.user_repo",
+    "repository.events_repo",
+    "repository.bookings_repo",
+    "repository.tickets_repo",
+    "repository.payments_repo",
+    "repository.offers_repo",
+    "repository.review_repo",
+    "repository.faqs_repo",
+    "repository.feedback_repo",
+    "repository.companies_repo",
+    "repository.idempotency_repo",
+]
+
+# Index options that make two indexes with the same keys different
+COMPARED_OPTIONS = ("unique", "sparse")
+COMPARED_VALUES = ("expireAfterSeconds", "partialFilterExpression")
+
+
+class CollectionIndexes:
+    """Indexes and query shapes a repository relies on for one collection."""
+
+    def __init__(self, collection: str, indexes: List[IndexModel], queries: Optional[List[dict]] = None):
+        self.collection = collection
+        self.indexes = indexes
+        self.queries = queries or []
+
+    def expected(self) -> Dict[str, dict]:
+        """Index documents keyed by name, as sent to createIndexes."""
+        return {index.document["name"]: index.document for index in self.indexes}
+
+
+_registry: Dict[str, CollectionIndexes] = {}
+
+
+def register_indexes(collection: str, indexes: List[IndexModel], queries: Optional[List[dict]] = None) -> CollectionIndexes:
+    """
+    Register the indexes and query shapes for a collection
+
+    Args:
+        collection (str): The collection name
+        indexes (List[IndexModel]): Indexes the repository needs; each must be named
+        queries (Optional[List[dict]]): Query shapes as {"filter": ..., "sort": ...}
+
+    Returns:
+        CollectionIndexes: The registry entry, merged with earlier registrations
+    """
+    entry = _registry.get(collection)
+    if entry is None:
+        entry = _registry[collection] = CollectionIndexes(collection, [])
+    known = entry.expected()
+    for index in indexes:
+        if "name" not in index.document:
+            raise ValueError(f"Index on {collection} must have an explicit name")
+        if index.document["name"] not in known:
+            entry.indexes.append(index)
+    entry.queries.extend(queries or [])
+    return entry
+
+
+def registered_indexes() -> Dict[str, CollectionIndexes]:
+    """Get the registry, keyed by collection name."""
+    return dict(_registry)
+
+
+def load_registry() -> Dict[str, CollectionIndexes]:
+    """Import every repository module so their indexes are registered."""
+    for module in REPOSITORY_MODULES:
+        importlib.import_module(module)
+    return registered_indexes()
+
+
+def _same_index(expected: dict, existing: dict) -> bool:
+    key = expected["key"]
+    if "text" in key.values():
+        # Text indexes are stored as {_fts, _ftsx}; compare the field weights instead
+        weights = expected.get("weights") or {field: 1 for field, kind in key.items() if kind == "text"}
+        if dict(existing.get("weights", {})) != dict(weights):
+            return False
+    elif list(key.items()) != list(existing["key"].items()):
+        return False
+    for option in COMPARED_OPTIONS:
+        if bool(expected.get(option)) != bool(existing.get(option)):
+            return False
+    for option in COMPARED_VALUES:
+        if expected.get(option) != existing.get(option):
+            return False
+    return True
+
+
+async def _existing_indexes(collection) -> Dict[str, dict]:
+    existing = {}
+    async for index in collection.list_indexes():
+        existing[index["name"]] = dict(index)
+    return existing
+
+
+async def index_drift(db) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Compare the registered indexes against the ones in the database
+
+    Args:
+        db: The Motor database
+
+    Returns:
+        Dict[str, Dict[str, List[str]]]: Per collection, the index names that are
+        "missing", "changed" (same name, different definition) or "unexpected"
+        (present in the database but not registered). Collections without drift
+        are omitted.
+    """
+    drift = {}
+    for name, entry in _registry.items():
+        existing = await _existing_indexes(db[name])
+        report = {"missing": [], "changed": [], "unexpected": []}
+        for index_name, document in entry.expected().items():
+            if index_name not in existing:
+                report["missing"].append(index_name)
+            elif not _same_index(document, existing[index_name]):
+                report["changed"].append(index_name)
+        expected_names = set(entry.expected())
+        report["unexpected"] = sorted(n for n in existing if n != "_id_" and n not in expected_names)
+        if any(report.values()):
+            drift[name] = report
+    return drift
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create every registered index that does not exist yet
+
+    Changed indexes are reported by index_drift but never rebuilt here,
+    since dropping an index on a live collection is an operator decision.
+
+    Args:
+        db: The Motor database
+
+    Returns:
+        Dict[str, List[str]]: Names of the indexes created, per collection
+    """
+    created = {}
+    if db is None:
+        print("Skipping index bootstrap: database connection not established")
+        return created
+    for name, entry in _registry.items():
+        existing = await _existing_indexes(db[name])
+        missing = [index for index in entry.indexes if index.document["name"] not in existing]
+        if not missing:
+            continue
+        try:
+            created[name] = await db[name].create_indexes(missing)
+        except PyMongoError as e:
+            print(f"Error creating indexes on {name}: {str(e)}")
+    return created
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return [stage for stage in stages if stage]
+
+
+async def explain_queries(db) -> List[dict]:
+    """
+    Explain each registered query shape
+
+    Args:
+        db: The Motor database
+
+    Returns:
+        List[dict]: One entry per query shape with the winning plan's stages and
+        "uses_index" set to False when the plan contains a COLLSCAN
+    """
+    results = []
+    for name, entry in _registry.items():
+        for query in entry.queries:
+            cursor = db[name].find(query.get("filter", {}), query.get("projection"))
+            if query.get("sort"):
+                cursor = cursor.sort(query["sort"])
+            explanation = await cursor.explain()
+            winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+            stages = _plan_stages(winning_plan)
+            results.append({
+                "collection": name,
+                "query": query,
+                "stages": stages,
+                "uses_index": "COLLSCAN" not in stages,
+            })
+    return results
+
+
+async def _main(args) -> int:
+    from db.connect import MongoDBSingleton
+
+    db = MongoDBSingleton().get_database()
+    if db is None:
+        print("Database connection not established")
+        return 1
+    load_registry()
+    status = 0
+    if args.check:
+        drift = await index_drift(db)
+        for name, report in drift.items():
+            print(f"{name}: {report}")
+        status = 1 if drift else 0
+    elif args.explain:
+        for result in await explain_queries(db):
+            marker = "ok" if result["uses_index"] else "COLLSCAN"
+            print(f"[{marker}] {result['collection']} {result['query']} -> {' > '.join(result['stages'])}")
+            if not result["uses_index"]:
+                status = 1
+    else:
+        created = await ensure_indexes(db)
+        for name, index_names in created.items():
+            print(f"{name}: created {', '.join(index_names)}")
+        if not created:
+            print("All registered indexes exist")
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and check MongoDB indexes")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--check", action="store_true", help="report index drift without creating anything")
+    group.add_argument("--explain", action="store_true", help="explain registered query shapes")
+    # Repositories register into db.indexes, not into this __main__ copy
+    from db import indexes
+    sys.exit(asyncio.run(indexes._main(parser.parse_args())))
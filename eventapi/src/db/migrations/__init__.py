@@ -0,0 +1,10 @@
+"""
+One-off data migrations, run from eventapi/src:
+
+    python -m db.migrations.event_times [--dry-run] [--all]
+    python -m db.migrations.review_summaries
+    python -m db.migrations.review_users [--dry-run]
+
+Each migration is idempotent and only touches documents it has not
+migrated yet, so an interrupted run can simply be started again.
+"""
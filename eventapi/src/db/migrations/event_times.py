@@ -0,0 +1,74 @@
+"""
+Backfill starts_at/ends_at on events created before they were stored.
+
+Events whose date cannot be parsed get starts_at = None so they are not
+picked up again; the run prints them so they can be fixed by hand and
+re-run with --all.
+"""
+import argparse
+import asyncio
+import sys
+
+from pymongo import UpdateOne
+
+from utils.event_time import TIME_SOURCE_FIELDS, time_fields
+
+BATCH_SIZE = 500
+
+
+async def backfill(db, dry_run: bool = False, all_events: bool = False) -> dict:
+    """
+    Set the normalized times on every event that does not have them yet
+
+    Args:
+        db: The Motor database
+        dry_run (bool): Only count what would change
+        all_events (bool): Recompute events that already have starts_at too
+
+    Returns:
+        dict: {"updated": int, "unparsed": [event ids]}
+    """
+    events = db["events"]
+    query = {} if all_events else {"starts_at": {"$exists": False}}
+    projection = {field: 1 for field in TIME_SOURCE_FIELDS}
+    updated = 0
+    unparsed = []
+    batch = []
+    async for event in events.find(query, projection).batch_size(BATCH_SIZE):
+        times = time_fields(event)
+        if not times:
+            unparsed.append(str(event["_id"]))
+            times = {"starts_at": None, "ends_at": None}
+        batch.append(UpdateOne({"_id": event["_id"]}, {"$set": times}))
+        if len(batch) >= BATCH_SIZE:
+            if not dry_run:
+                await events.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            await events.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return {"updated": updated, "unparsed": unparsed}
+
+
+async def _main(args) -> int:
+    from db.connect import MongoDBSingleton
+
+    db = MongoDBSingleton().get_database()
+    if db is None:
+        print("Database connection not established")
+        return 1
+    result = await backfill(db, dry_run=args.dry_run, all_events=args.all)
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {result['updated']} events")
+    for event_id in result["unparsed"]:
+        print(f"Could not parse the date of event {event_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill normalized event start/end times")
+    parser.add_argument("--dry-run", action="store_true", help="count the events without writing")
+    parser.add_argument("--all", action="store_true", help="recompute events that already have starts_at")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
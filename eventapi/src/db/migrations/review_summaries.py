@@ -0,0 +1,25 @@
+"""
+Rebuild every event's rating_summary from the reviews.
+
+addReview keeps the summaries current with $inc; this reconciles them with
+the review collection, e.g. after reviews were deleted or edited by hand.
+Schedule it (e.g. nightly) or run it once to seed the summaries.
+"""
+import asyncio
+import sys
+
+
+async def _main() -> int:
+    from db.connect import MongoDBSingleton
+    from repository.review_repo import ReviewRepo
+
+    if MongoDBSingleton().get_database() is None:
+        print("Database connection not established")
+        return 1
+    result = await ReviewRepo.rebuildSummaries()
+    print(f"Summarized {result['events']} events, reset {result['reset']} without reviews")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,72 @@
+"""
+Store review user references as ObjectId instead of strings.
+
+Reviews used to be written with the user id as a string, which the
+user_id index and the users $lookup cannot match. Only string references
+are touched, so the migration can be re-run; ids that are not valid
+ObjectIds are left alone and reported.
+"""
+import argparse
+import asyncio
+import sys
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+BATCH_SIZE = 500
+
+
+async def migrate(db, dry_run: bool = False) -> dict:
+    """
+    Convert string user ids on reviews to ObjectId
+
+    Args:
+        db: The Motor database
+        dry_run (bool): Only count what would change
+
+    Returns:
+        dict: {"updated": int, "invalid": [review ids]}
+    """
+    reviews = db["reviews"]
+    updated = 0
+    invalid = []
+    batch = []
+    async for review in reviews.find({"user": {"$type": "string"}}, {"user": 1}).batch_size(BATCH_SIZE):
+        if not ObjectId.is_valid(review["user"]):
+            invalid.append(str(review["_id"]))
+            continue
+        batch.append(UpdateOne(
+            {"_id": review["_id"], "user": review["user"]},
+            {"$set": {"user": ObjectId(review["user"])}}
+        ))
+        if len(batch) >= BATCH_SIZE:
+            if not dry_run:
+                await reviews.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            await reviews.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return {"updated": updated, "invalid": invalid}
+
+
+async def _main(args) -> int:
+    from db.connect import MongoDBSingleton
+
+    db = MongoDBSingleton().get_database()
+    if db is None:
+        print("Database connection not established")
+        return 1
+    result = await migrate(db, dry_run=args.dry_run)
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {result['updated']} reviews")
+    for review_id in result["invalid"]:
+        print(f"Review {review_id} has an invalid user id")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert review user ids to ObjectId")
+    parser.add_argument("--dry-run", action="store_true", help="count the reviews without writing")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
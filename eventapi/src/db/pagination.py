@@ -0,0 +1,141 @@
+"""
+Keyset pagination for the list endpoints.
+
+Pages are ordered newest first by ``_id`` (or by another field with ``_id``
+as tie breaker) and the position is carried in an opaque ``next_cursor``
+token, so each page costs one indexed range scan no matter how deep it is.
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from utils.cache import MemoryCache
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TOTAL_COUNT_TTL = 30  # seconds
+
+# "collection:query" -> total; TTL + LRU so one-off filters do not pile up
+_total_cache = MemoryCache(max_entries=int(os.environ.get("TOTAL_COUNT_CACHE_SIZE", 4096)))
+
+
+def encode_cursor(doc: dict, sort_field: str = "_id") -> str:
+    """Build the opaque token pointing just after ``doc``."""
+    payload = {"id": str(doc["_id"])}
+    if sort_field != "_id":
+        value = doc.get(sort_field)
+        if isinstance(value, datetime):
+            payload["v"] = value.isoformat()
+            payload["t"] = "dt"
+        else:
+            payload["v"] = value
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort_field: str = "_id") -> dict:
+    """
+    Decode a token built by encode_cursor
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position = {"_id": ObjectId(payload["id"])}
+        if sort_field != "_id":
+            value = payload["v"]
+            if payload.get("t") == "dt":
+                value = datetime.fromisoformat(value)
+            position[sort_field] = value
+        return position
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def keyset_filter(position: dict, sort_field: str, ascending: bool = False) -> dict:
+    """Filter matching the documents that sort after ``position``."""
+    op = "$gt" if ascending else "$lt"
+    if sort_field == "_id":
+        return {"_id": {op: position["_id"]}}
+    return {"$or": [
+        {sort_field: {op: position[sort_field]}},
+        {sort_field: position[sort_field], "_id": {op: position["_id"]}},
+    ]}
+
+
+async def count_total(collection, query: Optional[dict] = None) -> int:
+    """Count the documents matching ``query``, cached for TOTAL_COUNT_TTL seconds."""
+    query = query or {}
+    key = f"{collection.name}:{query!r}"
+    cached = await _total_cache.get(key)
+    if cached is not None:
+        return int(cached)
+    if query:
+        total = await collection.count_documents(query)
+    else:
+        total = await collection.estimated_document_count()
+    await _total_cache.set(key, str(total).encode(), TOTAL_COUNT_TTL)
+    return total
+
+
+async def paginate(
+    collection,
+    query: Optional[dict] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    sort_field: str = "_id",
+    projection: Optional[dict] = None,
+    include_total: bool = False,
+    ascending: bool = False,
+) -> Dict:
+    """
+    Fetch one page of documents, newest first (or oldest first when ascending)
+
+    Args:
+        collection: The Motor collection
+        query (Optional[dict]): Filter applied to every page
+        limit (int): Page size, clamped to 1..MAX_PAGE_SIZE
+        after (Optional[str]): The next_cursor of the previous page
+        sort_field (str): "_id" or a field indexed together with _id
+        projection (Optional[dict]): Fields to return
+        include_total (bool): Also return the (cached) total match count
+        ascending (bool): Walk sort_field (and _id) upwards instead
+
+    Returns:
+        Dict: {"data": [...], "next_cursor": str | None} and "total" when requested
+
+    Raises:
+        ValueError: If ``after`` is not a valid cursor
+    """
+    query = query or {}
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page_filter = query
+    if after:
+        keyset = keyset_filter(decode_cursor(after, sort_field), sort_field, ascending)
+        page_filter = {"$and": [query, keyset]} if query else keyset
+
+    direction = ASCENDING if ascending else DESCENDING
+    if sort_field == "_id":
+        sort = [("_id", direction)]
+    else:
+        sort = [(sort_field, direction), ("_id", direction)]
+
+    cursor = collection.find(page_filter, projection).sort(sort).limit(limit + 1)
+    docs = await cursor.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    page = {"data": docs, "next_cursor": next_cursor}
+    if include_total:
+        page["total"] = await count_total(collection, query)
+    return page
@@ -0,0 +1,52 @@
+"""
+Single round trip write helpers shared by the repositories.
+
+Inserts return the document that was sent (the driver fills in ``_id``)
+instead of reading it back, and updates use ``find_one_and_update`` so the
+modified document comes back from the same command.
+"""
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+
+async def insert_document(collection, document: dict) -> dict:
+    """
+    Insert a document and return it with its new _id
+
+    Args:
+        collection: The Motor collection
+        document (dict): The document to insert; it is updated in place with _id
+
+    Returns:
+        dict: The inserted document
+
+    Raises:
+        Exception: If the server did not acknowledge an inserted id
+    """
+    result = await collection.insert_one(document)
+    if not result.inserted_id:
+        raise Exception("Failed to insert document")
+    document["_id"] = result.inserted_id
+    return document
+
+
+async def update_document(collection, query: dict, update: dict, projection: Optional[dict] = None) -> Optional[dict]:
+    """
+    Atomically apply an update and return the document after it
+
+    Args:
+        collection: The Motor collection
+        query (dict): Filter selecting the document
+        update (dict): The update operators to apply
+        projection (Optional[dict]): Fields to return
+
+    Returns:
+        Optional[dict]: The updated document, None if nothing matched
+    """
+    return await collection.find_one_and_update(
+        query,
+        update,
+        projection=projection,
+        return_document=ReturnDocument.AFTER
+    )
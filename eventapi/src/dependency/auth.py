@@ -1,40 +1,96 @@
+import time
 from fastapi import HTTPException , status , Depends , Security
 from fastapi.security.api_key import APIKeyHeader
 from jose import JWTError, jwt
-from utils.jwt_config import SECRET_KEY, ALGORITHM
+from utils.jwt_config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.cache import cache_from_env, DocumentCache
 from repository.user_repo import UserRepo
 
 api_key_header = APIKeyHeader(name="Authorization" , auto_error=True)
 
-async def get_current_user(token: str = Security(api_key_header)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+# email -> {"_id", "email", "role"}; configured with PRINCIPAL_CACHE_URL,
+# PRINCIPAL_CACHE_TTL and PRINCIPAL_CACHE_MAX_ENTRIES
+principal_cache = cache_from_env("principals", "PRINCIPAL_CACHE", ttl=300, max_entries=10000)
+# email -> revocation time; tokens issued up to then are refused until they expire
+revoked_tokens = DocumentCache("revoked", principal_cache.backend, ttl=(ACCESS_TOKEN_EXPIRE_MINUTES or 60) * 60)
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def decode_token(token: str) -> dict:
+    """Decode an access token and return its claims"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        return email
     except JWTError:
         raise credentials_exception
-    
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+
+async def get_current_user(token: str = Security(api_key_header)):
+    return decode_token(token)["sub"]
+
+
+async def get_current_claims(token: str = Security(api_key_header)) -> dict:
+    return decode_token(token)
+
+
+async def _load_principal(email: str):
+    user = await UserRepo.findUserByEmail(email=email)
+    if user is None:
+        return None
+    return {"_id": user["_id"], "email": user["email"], "role": user.get("role", "user")}
+
 
-async def admin_only(email : str = Depends(get_current_user)):
+async def get_principal(email: str):
+    """
+    Get the cached principal for an email, loading it from the users collection on a miss
+
+    Args:
+        email (str): The user's email
+
+    Returns:
+        dict: {"_id", "email", "role"}, None if the user does not exist
+    """
+    return await principal_cache.get_or_load(email, lambda: _load_principal(email))
+
+
+async def revoke_principal(email: str):
+    """
+    Revoke every token issued to a user so far
+
+    Call this after a role change or account removal. The cached principal
+    is dropped and tokens issued before now are refused; a fresh login works.
+
+    Args:
+        email (str): The user's email
+    """
+    await principal_cache.invalidate(email)
+    await revoked_tokens.set(email, int(time.time()))
+
+
+async def admin_only(claims : dict = Depends(get_current_claims)):
     """Ensure the user has admin role"""
-    print(f"{email}")
-    if email is not None:
-        user = UserRepo.findUserByEmail(email=email)
-        print(f"{user}")
-        if user['role'] != 'admin':
-            raise HTTPException(
+    # Tokens carrying a non-admin role are refused without a lookup
+    if claims.get("role") not in (None, "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to access this resource",
+        )
+    revoked_at = await revoked_tokens.get(claims["sub"])
+    if revoked_at is not None and claims.get("iat", 0) <= revoked_at:
+        raise credentials_exception
+    principal = await get_principal(claims["sub"])
+    if principal is None:
+        raise credentials_exception
+    if principal["role"] != 'admin':
+        raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to access this resource",
         )
-        return user
-    raise HTTPException(
-        status_code = status.HTTP_404_NOTFOUND,
-        detail="User Not Found",
-    )
\ No newline at end of file
+    return principal
@@ -0,0 +1,8 @@
+"""
+Recurring maintenance jobs, run from eventapi/src:
+
+    python -m jobs.reconcile_payments [--dry-run] [--restart]
+
+Jobs keep a checkpoint file, so an interrupted run continues where it
+stopped when started again.
+"""
@@ -0,0 +1,185 @@
+"""
+Reconcile payments with the gateway's view of their orders.
+
+Payments that have a razorpay_order_id are read in _id order, one batch at
+a time, with only the fields the check needs. Each batch's orders are
+fetched from the gateway with at most CONCURRENCY requests in flight.
+Every discrepancy is appended to a JSON-lines report. Orders the gateway
+reports as paid while we still have the payment as created or failed are
+moved to completed through the webhook path, so their tickets and
+bookings follow; if that fails they are reported with action "failed".
+Other mismatches are only reported.
+
+After every batch the last _id is written to the checkpoint file, so
+memory stays bounded by the batch size and a rerun resumes where the
+last one stopped. The gateway comes from utils.payment_gateway; point
+PAYMENT_GATEWAY_URL at utils/fake_gateway.py for a local run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+from services.paymentService import PAYMENT_TRANSITIONS, PaymentService
+from utils.payment_gateway import GatewayError, PaymentGateway
+
+BATCH_SIZE = 500
+CONCURRENCY = 20
+PROJECTION = {"razorpay_order_id": 1, "status": 1}
+
+# Payment statuses that agree with each gateway order status
+ORDER_STATUSES = {
+    "created": {"created"},
+    "attempted": {"created", "failed"},
+    "paid": {"completed", "refunded"},
+}
+
+
+def load_checkpoint(path: str) -> Dict:
+    """The saved progress of an earlier run, empty when there is none"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: Dict) -> None:
+    """Write the checkpoint atomically so an interrupted write never loses progress"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+async def _check(gateway: PaymentGateway, payment: Dict, limit: asyncio.Semaphore) -> Optional[Dict]:
+    """The discrepancy for one payment, None when it matches the gateway"""
+    order_id = payment["razorpay_order_id"]
+    entry = {"payment_id": str(payment["_id"]), "order_id": order_id, "status": payment.get("status")}
+    async with limit:
+        try:
+            order = await gateway.fetch_order(order_id)
+        except GatewayError as e:
+            issue = "missing" if e.status_code == 404 else "error"
+            return {**entry, "issue": issue, "detail": str(e)}
+    gateway_status = order.get("status")
+    if payment.get("status") in ORDER_STATUSES.get(gateway_status, ()):
+        return None
+    entry.update(issue="status_mismatch", gateway_status=gateway_status, action=None)
+    if gateway_status == "paid" and payment.get("status") in PAYMENT_TRANSITIONS["completed"]:
+        entry["action"] = "completed"
+    return entry
+
+
+async def reconcile(
+    db,
+    gateway: PaymentGateway,
+    report,
+    checkpoint_path: str,
+    dry_run: bool = False,
+    restart: bool = False,
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = CONCURRENCY,
+) -> Dict:
+    """
+    Compare every payment with its gateway order
+
+    Args:
+        db: The Motor database
+        gateway (PaymentGateway): Client used to fetch orders
+        report: Text file the discrepancies are appended to, one JSON object per line
+        checkpoint_path (str): File recording progress after each batch
+        dry_run (bool): Report only, without corrective updates
+        restart (bool): Ignore an existing checkpoint and start from the first payment
+        batch_size (int): Payments read and checked per batch
+        concurrency (int): Maximum gateway requests in flight
+
+    Returns:
+        Dict: The final checkpoint: last_id plus checked/discrepancies/corrected/failed
+        counts; corrections that failed are in the report with action "failed"
+    """
+    payments = db["payments"]
+    checkpoint = {} if restart else load_checkpoint(checkpoint_path)
+    if not checkpoint:
+        checkpoint = {"last_id": None, "checked": 0, "discrepancies": 0, "corrected": 0, "failed": 0,
+                      "started_at": datetime.now().isoformat()}
+    limit = asyncio.Semaphore(concurrency)
+    while True:
+        query = {"razorpay_order_id": {"$type": "string"}}
+        if checkpoint["last_id"]:
+            query["_id"] = {"$gt": ObjectId(checkpoint["last_id"])}
+        batch: List[Dict] = await payments.find(query, PROJECTION).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            return checkpoint
+
+        results = await asyncio.gather(*(_check(gateway, payment, limit) for payment in batch))
+        discrepancies = [entry for entry in results if entry is not None]
+        corrections = [
+            {"event_id": f"reconcile:{entry['order_id']}", "status": "completed",
+             "order_id": entry["order_id"], "payment_id": None}
+            for entry in discrepancies
+            if entry.get("action")
+        ]
+        if corrections and dry_run:
+            checkpoint["corrected"] += len(corrections)
+        elif corrections:
+            try:
+                checkpoint["corrected"] += await PaymentService.apply_webhook_events(corrections)
+            except Exception as e:
+                # The checkpoint moves on, so the report is where these are retried from
+                print(f"Error correcting {len(corrections)} payments: {str(e)}")
+                checkpoint["failed"] = checkpoint.get("failed", 0) + len(corrections)
+                for entry in discrepancies:
+                    if entry.get("action"):
+                        entry.update(action="failed", detail=str(e))
+        for entry in discrepancies:
+            report.write(json.dumps(entry) + "\n")
+        report.flush()
+
+        checkpoint["last_id"] = str(batch[-1]["_id"])
+        checkpoint["checked"] += len(batch)
+        checkpoint["discrepancies"] += len(discrepancies)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+
+async def _main(args) -> int:
+    from db.connect import MongoDBSingleton
+    from utils.payment_gateway import payment_gateway
+
+    db = MongoDBSingleton().get_database()
+    if db is None:
+        print("Database connection not established")
+        return 1
+    try:
+        with open(args.report, "w" if args.restart else "a") as report:
+            result = await reconcile(
+                db,
+                payment_gateway,
+                report,
+                args.checkpoint,
+                dry_run=args.dry_run,
+                restart=args.restart,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+            )
+    finally:
+        await payment_gateway.close()
+    verb = "would correct" if args.dry_run else "corrected"
+    print(f"Checked {result['checked']} payments: {result['discrepancies']} discrepancies, "
+          f"{verb} {result['corrected']}, {result.get('failed', 0)} corrections failed; report in {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile payments with gateway orders")
+    parser.add_argument("--dry-run", action="store_true", help="report without correcting payments")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--report", default="payment_reconciliation.jsonl", help="discrepancy report to append to")
+    parser.add_argument("--checkpoint", default="payment_reconciliation.checkpoint.json", help="progress file")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
@@ -1,6 +1,20 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from db.connect import MongoDBSingleton
+from db.indexes import ensure_indexes
+from utils.qr import shutdown_qr_pool
+from utils.payment_gateway import payment_gateway
+from utils.responses import BSONResponse
+from utils.idempotency import IdempotencyMiddleware, MemoryIdempotencyStore
+from repository.idempotency_repo import IdempotencyRepo
+from services.ticketService import TicketService
+from services.eventService import EventService
+from services.feedbackService import FeedbackService
+from services.paymentService import PaymentService
+from services.checkoutService import CheckoutService
 from routes.authentication import authRouter
 from routes.userRoute import userRouter
 from routes.events import eventRouter
@@ -12,14 +26,54 @@ from routes.ticket import ticketrouter
 from routes.payments import paymentrouter
 from routes.booking import bookingRouter
 from routes.offers import offerRouter
+from routes.checkout import checkoutRouter
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create any registered index that is missing before serving traffic
+    created = await ensure_indexes(MongoDBSingleton().get_database())
+    for collection, indexes in created.items():
+        print(f"Created indexes on {collection}: {', '.join(indexes)}")
+    # Keep the gate scanners' revocation set in step with cancelled tickets
+    revocations = asyncio.create_task(
+        TicketService.sync_revocations(float(os.environ.get("TICKET_REVOCATION_REFRESH", 60)))
+    )
+    # Build the in-memory autocomplete index and keep it fresh across workers
+    suggestions = asyncio.create_task(
+        EventService.sync_suggestions(float(os.environ.get("EVENT_SUGGEST_REFRESH", 300)))
+    )
+    # Batched feedback writes, when FEEDBACK_BUFFERED is set
+    FeedbackService.start_ingestion()
+    # Batched payment webhook processing, resuming events left unapplied
+    await PaymentService.start_webhooks()
+    # Give the seats of unpaid checkouts back
+    checkouts = asyncio.create_task(
+        CheckoutService.sweep_expired(float(os.environ.get("CHECKOUT_SWEEP_INTERVAL", 60)))
+    )
+    yield
+    checkouts.cancel()
+    await PaymentService.stop_webhooks()
+    await FeedbackService.stop_ingestion()
+    suggestions.cancel()
+    revocations.cancel()
+    shutdown_qr_pool()
+    await payment_gateway.close()
+
+app = FastAPI(lifespan=lifespan, default_response_class=BSONResponse)
 
 origins = [
     "http://localhost:3000",
     "http://localhost:3001"
 ]
 
+# Retried creates with the same Idempotency-Key replay the first response;
+# IDEMPOTENCY_STORE=memory keeps keys per process instead of in MongoDB
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=MemoryIdempotencyStore() if os.environ.get("IDEMPOTENCY_STORE") == "memory" else IdempotencyRepo,
+    paths=["/bookings", "/tickets", "/payments", "/checkout"],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins = origins,
@@ -40,11 +94,12 @@ app.include_router(ticketrouter)
 app.include_router(paymentrouter)
 app.include_router(bookingRouter)
 app.include_router(offerRouter)
+app.include_router(checkoutRouter)
 
 #Connect to Db
-db = MongoDBSingleton().get_database()
+mongo_instance = MongoDBSingleton()
 @app.get("/")
-def root():
-    if db is not None:
+async def root():
+    if await mongo_instance.ping():
         return {"message":"DB connect Successfully"}
     return {"message":"Connection Failure"}
\ No newline at end of file
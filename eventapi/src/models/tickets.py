@@ -28,5 +28,5 @@ class Ticket(BaseModel):
     ticket_number: str
     payment_status: str
     payment_method: str
-    qr_code: Optional[str]
+    qr_payload: Optional[str]
     payment_id: Optional[PyObjectId]
\ No newline at end of file
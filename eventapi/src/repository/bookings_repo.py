@@ -1,6 +1,10 @@
 from db.connect import MongoDBSingleton
 from bson import ObjectId
-from pymongo.errors import PyMongoError
+from pymongo import IndexModel, ASCENDING, DESCENDING, UpdateOne, ReturnDocument
+from pymongo.errors import PyMongoError, DuplicateKeyError
+from db.indexes import register_indexes
+from db.pagination import paginate, DEFAULT_PAGE_SIZE
+from db.writes import insert_document, update_document
 from typing import List, Optional, Dict
 from datetime import datetime
 import uuid
@@ -10,14 +14,50 @@ db = MongoDBSingleton().get_database()
 if db is not None:
     bookings_collection = db["bookings"]
     events_collection = db["events"]
+    inventory_collection = db["slot_inventory"]
 else:
     bookings_collection = None
     events_collection = None
+    inventory_collection = None
+
+register_indexes("bookings", [
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    IndexModel([("event_id", ASCENDING), ("created_at", DESCENDING)], name="event_id_created_at"),
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+    IndexModel([("payment_id", ASCENDING)], name="payment_id", sparse=True),
+], queries=[
+    {"filter": {"user_id": ObjectId("000000000000000000000000")}, "sort": [("created_at", DESCENDING)]},
+    {"filter": {"event_id": "000000000000000000000000"}, "sort": [("created_at", DESCENDING)]},
+    {"filter": {}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+    {"filter": {"payment_id": {"$in": [ObjectId("000000000000000000000000")]}, "status": "pending"}},
+])
+
+# One {event_id, slot_name, capacity, sold} row per limited slot
+register_indexes("slot_inventory", [
+    IndexModel([("event_id", ASCENDING), ("slot_name", ASCENDING)], name="event_id_slot_name_unique", unique=True),
+], queries=[
+    {"filter": {"event_id": ObjectId("000000000000000000000000"), "slot_name": "General"}},
+])
+
+
+class SoldOutError(Exception):
+    """Raised when a slot has fewer seats left than a booking asks for"""
+
+
+def _slot_capacity(event: Dict, slot_name: str) -> Optional[int]:
+    """Capacity of a slot as defined on the event, None when it is unlimited"""
+    slots = event.get("slots") or []
+    for slot in slots:
+        if slot.get("name") == slot_name:
+            return slot.get("capacity")
+    if slots:
+        raise Exception(f"Slot {slot_name} not found for this event")
+    return None
+
 
 class BookingRepo:
     @staticmethod
     async def create_booking(booking_data: Booking) -> Optional[Dict]:
-        print(f"create_bookinggggggg : {booking_data}")
         """
         Create a new booking in the database
         
@@ -28,6 +68,7 @@ class BookingRepo:
             Optional[Dict]: The newly created booking document with _id
             
         Raises:
+            SoldOutError: If the slot does not have enough seats left
             PyMongoError: If there's an error during database operation
             Exception: For any other unexpected errors
         """
@@ -43,22 +84,28 @@ class BookingRepo:
                 booking_dict["booking_number"] = f"BK-{uuid.uuid4().hex[:8].upper()}"
             
             # Validate event exists
-            event = events_collection.find_one({"_id": ObjectId(booking_data['event_id'])})
+            event = await events_collection.find_one(
+                {"_id": ObjectId(booking_data['event_id'])},
+                {"slots": 1}
+            )
             if not event:
                 raise Exception(f"Event with id {booking_data['event_id']} not found")
             
-            # Insert the booking
-            result = bookings_collection.insert_one(booking_dict)
-            
-            if result.inserted_id:
-                # Fetch and return the newly created booking
-                new_booking = bookings_collection.find_one(
-                    {"_id": result.inserted_id}
-                )
-                return new_booking
-            else:
-                raise Exception("Failed to create booking")
+            # Take the seats first so concurrent bookings can never oversell
+            quantity = booking_dict["quantity"]
+            reserved = await BookingRepo.reserve_slot(event, booking_dict["slot_name"], quantity)
+            booking_dict["inventory_reserved"] = quantity if reserved else 0
+            
+            # Insert the booking and return it as stored
+            try:
+                return await insert_document(bookings_collection, booking_dict)
+            except Exception:
+                if reserved:
+                    await BookingRepo.release_slot(event["_id"], booking_dict["slot_name"], quantity)
+                raise
                 
+        except SoldOutError:
+            raise
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
             raise Exception(f"Database error occurred: {str(e)}")
@@ -91,9 +138,8 @@ class BookingRepo:
             cursor = bookings_collection.find(
                 {"user_id": ObjectId(user_id)}
             ).sort("created_at", -1)
-            print(f"cursor : {cursor.count()}")
             tickets = []
-            for ticket in cursor:
+            async for ticket in cursor:
                 print(f"ticket : {ticket}")
                 tickets.append(ticket)        
             return tickets
@@ -131,9 +177,8 @@ class BookingRepo:
                 {"event_id": event_id}
             ).sort("created_at", -1)
 
-            print(f"cursor : {cursor.count()}")
             tickets = []
-            for ticket in cursor:
+            async for ticket in cursor:
                 print(f"ticket : {ticket}")
                 tickets.append(ticket)
             
@@ -168,7 +213,7 @@ class BookingRepo:
             if not ObjectId.is_valid(booking_id):
                 raise Exception("Invalid booking ID format")
                 
-            booking = bookings_collection.find_one({"_id": ObjectId(booking_id)})
+            booking = await bookings_collection.find_one({"_id": ObjectId(booking_id)})
             return booking
             
         except PyMongoError as e:
@@ -179,13 +224,14 @@ class BookingRepo:
             raise Exception(f"Error retrieving booking: {str(e)}")
 
     @staticmethod
-    async def update_booking_status(booking_id: str, status: str) -> Optional[Dict]:
+    async def update_booking_status(booking_id: str, status: str, reason: Optional[str] = None) -> Optional[Dict]:
         """
         Update the status of a booking
         
         Args:
             booking_id (str): The ID of the booking
             status (str): The new status
+            reason (Optional[str]): Stored as cancel_reason when the booking is cancelled
             
         Returns:
             Optional[Dict]: The updated booking document if found, None otherwise
@@ -201,24 +247,37 @@ class BookingRepo:
             if not ObjectId.is_valid(booking_id):
                 raise Exception("Invalid booking ID format")
                 
-            result = bookings_collection.update_one(
-                {"_id": ObjectId(booking_id)},
-                {
-                    "$set": {
-                        "status": status,
-                        "updated_at": datetime.now()
-                    }
-                }
+            now = datetime.now()
+            if status == "cancelled":
+                # Only the update that actually cancels the booking gives its seats
+                # back, and it zeroes inventory_reserved so they are never given twice
+                changes = {"status": status, "inventory_reserved": 0, "updated_at": now}
+                if reason:
+                    changes["cancel_reason"] = reason
+                before = await bookings_collection.find_one_and_update(
+                    {"_id": ObjectId(booking_id), "status": {"$ne": "cancelled"}},
+                    {"$set": changes},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if before is None:
+                    return await bookings_collection.find_one({"_id": ObjectId(booking_id)})
+                await BookingRepo._release_booking(before)
+                return {**before, **changes}
+            
+            updated = await update_document(
+                bookings_collection,
+                {"_id": ObjectId(booking_id), "status": {"$ne": "cancelled"}},
+                {"$set": {"status": status, "updated_at": now}}
             )
-            
-            if result.modified_count == 0:
+            if updated is not None:
+                return updated
+            booking = await bookings_collection.find_one({"_id": ObjectId(booking_id)})
+            if booking is None:
                 return None
-                
-            updated_booking = bookings_collection.find_one(
-                {"_id": ObjectId(booking_id)}
-            )
-            return updated_booking
+            return await BookingRepo._reopen_booking(booking, status)
             
+        except SoldOutError:
+            raise
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
             raise Exception(f"Database error occurred: {str(e)}")
@@ -226,6 +285,38 @@ class BookingRepo:
             print(f"Error updating booking: {str(e)}")
             raise Exception(f"Error updating booking: {str(e)}")
 
+    @staticmethod
+    async def _reopen_booking(booking: Dict, status: str) -> Optional[Dict]:
+        """
+        Move a cancelled booking back to another status, taking its seats again
+        
+        Raises:
+            SoldOutError: If the slot no longer has enough seats
+        """
+        event = await events_collection.find_one({"_id": ObjectId(booking["event_id"])}, {"slots": 1})
+        if not event:
+            raise Exception(f"Event with id {booking['event_id']} not found")
+        quantity = booking["quantity"]
+        reserved = await BookingRepo.reserve_slot(event, booking["slot_name"], quantity)
+        reopened = await update_document(
+            bookings_collection,
+            {"_id": booking["_id"], "status": "cancelled"},
+            {
+                "$set": {
+                    "status": status,
+                    "inventory_reserved": quantity if reserved else 0,
+                    "updated_at": datetime.now()
+                },
+                "$unset": {"cancel_reason": ""}
+            }
+        )
+        if reopened is None:
+            # Someone else reopened it first; they hold the seats
+            if reserved:
+                await BookingRepo.release_slot(event["_id"], booking["slot_name"], quantity)
+            return await bookings_collection.find_one({"_id": booking["_id"]})
+        return reopened
+
     @staticmethod
     async def update_booking_payment(
         booking_id: str, 
@@ -262,17 +353,11 @@ class BookingRepo:
             if ticket_id:
                 update_dict["ticket_id"] = ObjectId(ticket_id)
             
-            result = await bookings_collection.update_one(
+            updated_booking = await update_document(
+                bookings_collection,
                 {"_id": ObjectId(booking_id)},
                 {"$set": update_dict}
             )
-            
-            if result.modified_count == 0:
-                return None
-                
-            updated_booking = await bookings_collection.find_one(
-                {"_id": ObjectId(booking_id)}
-            )
             return updated_booking
             
         except PyMongoError as e:
@@ -282,6 +367,77 @@ class BookingRepo:
             print(f"Error updating booking: {str(e)}")
             raise Exception(f"Error updating booking: {str(e)}")
 
+    @staticmethod
+    async def confirm_paid(payment_ids: List[ObjectId]) -> int:
+        """
+        Confirm the bookings of completed payments
+        
+        Pending bookings are confirmed in one update. Bookings cancelled
+        because their payment failed or expired (cancel_reason
+        "payment_failed") before the capture arrived take their seats again;
+        if the slot sold out meanwhile they stay cancelled and are logged for
+        a refund. Bookings cancelled for any other reason stay cancelled.
+        
+        Args:
+            payment_ids (List[ObjectId]): IDs of completed payments
+            
+        Returns:
+            int: Number of bookings confirmed
+            
+        Raises:
+            PyMongoError: If the update fails
+        """
+        if bookings_collection is None:
+            raise Exception("Database connection not established")
+        if not payment_ids:
+            return 0
+        result = await bookings_collection.update_many(
+            {"payment_id": {"$in": payment_ids}, "status": "pending"},
+            {"$set": {"status": "confirmed", "updated_at": datetime.now()}}
+        )
+        confirmed = result.modified_count
+        cursor = bookings_collection.find(
+            {"payment_id": {"$in": payment_ids}, "status": "cancelled", "cancel_reason": "payment_failed"},
+            {"_id": 1, "payment_id": 1}
+        )
+        async for booking in cursor:
+            try:
+                await BookingRepo.update_booking_status(str(booking["_id"]), "confirmed")
+                confirmed += 1
+            except SoldOutError:
+                print(f"Booking {booking['_id']} was paid after its seats were resold; refund payment {booking['payment_id']}")
+        return confirmed
+
+    @staticmethod
+    async def cancel_for_payments(payment_ids: List[ObjectId], reason: str) -> int:
+        """
+        Cancel the bookings of failed or refunded payments and give their seats back
+        
+        Args:
+            payment_ids (List[ObjectId]): IDs of failed or refunded payments
+            reason (str): The cancel_reason, "payment_failed" or "refunded"
+            
+        Returns:
+            int: Number of bookings cancelled by this call
+            
+        Raises:
+            Exception: If a booking could not be cancelled
+        """
+        if bookings_collection is None:
+            raise Exception("Database connection not established")
+        if not payment_ids:
+            return 0
+        cursor = bookings_collection.find(
+            {"payment_id": {"$in": payment_ids}, "status": {"$ne": "cancelled"}},
+            {"_id": 1}
+        )
+        cancelled = 0
+        async for booking in cursor:
+            # update_booking_status releases the seats exactly once
+            await BookingRepo.update_booking_status(str(booking["_id"]), "cancelled", reason)
+            cancelled += 1
+        return cancelled
+
     @staticmethod
     async def delete_booking(booking_id: str) -> bool:
         """
@@ -304,8 +460,12 @@ class BookingRepo:
             if not ObjectId.is_valid(booking_id):
                 raise Exception("Invalid booking ID format")
                 
-            result = bookings_collection.delete_one({"_id": ObjectId(booking_id)})
-            return result.deleted_count > 0
+            deleted = await bookings_collection.find_one_and_delete({"_id": ObjectId(booking_id)})
+            if deleted is None:
+                return False
+            if deleted.get("status") != "cancelled":
+                await BookingRepo._release_booking(deleted)
+            return True
             
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -316,12 +476,67 @@ class BookingRepo:
         
 
     @staticmethod
-    async def getAllBookings() -> List[Dict]:
+    async def slot_inventory(event_id: str) -> Dict[str, Dict]:
+        """
+        Live seat counts of an event's limited slots
+
+        Args:
+            event_id (str): The event ID
+
+        Returns:
+            Dict[str, Dict]: {"capacity", "sold"} keyed by slot name; slots that
+            have not been booked yet have no row
+        """
+        try:
+            if inventory_collection is None:
+                raise Exception("Database connection not established")
+            cursor = inventory_collection.find(
+                {"event_id": ObjectId(event_id)},
+                {"_id": 0, "slot_name": 1, "capacity": 1, "sold": 1}
+            )
+            rows = await cursor.to_list(length=None)
+            return {row["slot_name"]: {"capacity": row["capacity"], "sold": row["sold"]} for row in rows}
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def event_popularity() -> Dict[str, int]:
         """
-        Get all bookings from the database
+        Seats booked per event, ignoring cancelled bookings
+
+        Returns:
+            Dict[str, int]: Quantity booked keyed by event id
+        """
+        try:
+            if bookings_collection is None:
+                raise Exception("Database connection not established")
+            pipeline = [
+                {"$match": {"status": {"$ne": "cancelled"}}},
+                {"$group": {"_id": {"$toString": "$event_id"}, "booked": {"$sum": "$quantity"}}},
+            ]
+            rows = await bookings_collection.aggregate(pipeline).to_list(length=None)
+            return {row["_id"]: row["booked"] for row in rows}
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def getAllBookings(
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
+        """
+        Get one page of bookings, newest first
         
+        Args:
+            limit (int): Maximum number of bookings to return
+            after (Optional[str]): The next_cursor of the previous page
+            include_total (bool): Whether to include the total booking count
+            
         Returns:
-            List[Dict]: List of all booking documents
+            Dict: {"data": [...], "next_cursor": ...} plus "total" if requested
             
         Raises:
             PyMongoError: If there's an error during database operation
@@ -331,15 +546,141 @@ class BookingRepo:
             if bookings_collection is None:
                 raise Exception("Database connection not established")
             
-            cursor = bookings_collection.find()
-            bookings = []
-            for booking in cursor:
-                bookings.append(booking)
-            return bookings
+            return await paginate(
+                bookings_collection,
+                limit=limit,
+                after=after,
+                sort_field="created_at",
+                include_total=include_total
+            )
             
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
             raise Exception(f"Database error occurred: {str(e)}")
         except Exception as e:
             print(f"Error retrieving all bookings: {str(e)}")
-            raise Exception(f"Error retrieving all bookings: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error retrieving all bookings: {str(e)}")
+
+    @staticmethod
+    async def reserve_slot(event: Dict, slot_name: str, quantity: int, session=None) -> bool:
+        """
+        Atomically take seats from an event slot
+        
+        The $inc only applies while sold + quantity <= capacity, so parallel
+        reservations can never push a slot past its capacity. Inventory rows
+        are created from the event's slot capacity on first use; inside a
+        transaction call ensure_slot before it starts instead, since a
+        duplicate key error from a racing upsert aborts the transaction.
+        
+        Args:
+            event (Dict): The event (needs _id and slots)
+            slot_name (str): The slot to book
+            quantity (int): Number of seats
+            session: Client session to run the update in, for use inside a transaction
+            
+        Returns:
+            bool: True if seats were reserved, False if the slot has no capacity limit
+            
+        Raises:
+            SoldOutError: If the slot does not have enough seats left
+        """
+        capacity = _slot_capacity(event, slot_name)
+        if capacity is None:
+            return False
+        
+        available = {
+            "event_id": event["_id"],
+            "slot_name": slot_name,
+            "$expr": {"$lte": [{"$add": ["$sold", quantity]}, "$capacity"]},
+        }
+        result = await inventory_collection.update_one(available, {"$inc": {"sold": quantity}}, session=session)
+        if result.modified_count:
+            return True
+        
+        if session is None:
+            # First booking of this slot: create its row, then try again
+            await BookingRepo.ensure_slot(event, slot_name)
+            result = await inventory_collection.update_one(available, {"$inc": {"sold": quantity}})
+            if result.modified_count:
+                return True
+        raise SoldOutError(f"Not enough seats left in slot {slot_name}")
+
+    @staticmethod
+    async def ensure_slot(event: Dict, slot_name: str) -> bool:
+        """
+        Create a slot's inventory row from the event's capacity if it has none
+        
+        Args:
+            event (Dict): The event (needs _id and slots)
+            slot_name (str): The slot
+            
+        Returns:
+            bool: True if the slot is limited (and now has a row), False if it has no capacity limit
+        """
+        capacity = _slot_capacity(event, slot_name)
+        if capacity is None:
+            return False
+        try:
+            await inventory_collection.update_one(
+                {"event_id": event["_id"], "slot_name": slot_name},
+                {"$setOnInsert": {"capacity": capacity, "sold": 0}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # A concurrent first booking created it
+            pass
+        return True
+
+    @staticmethod
+    async def release_slot(event_id: ObjectId, slot_name: str, quantity: int) -> None:
+        """
+        Give reserved seats back to a slot
+        
+        Args:
+            event_id (ObjectId): The event ID
+            slot_name (str): The slot
+            quantity (int): Number of seats to release
+        """
+        await inventory_collection.update_one(
+            {"event_id": ObjectId(event_id), "slot_name": slot_name, "sold": {"$gte": quantity}},
+            {"$inc": {"sold": -quantity}}
+        )
+
+    @staticmethod
+    async def _release_booking(booking: Dict) -> None:
+        """Release the seats a booking holds, if it reserved any"""
+        quantity = booking.get("inventory_reserved", 0)
+        if quantity:
+            await BookingRepo.release_slot(booking["event_id"], booking["slot_name"], quantity)
+
+    @staticmethod
+    async def sync_slot_capacity(event_id: str, slots: List[Dict]) -> None:
+        """
+        Apply the capacities of an event's slots to their inventory rows
+        
+        Args:
+            event_id (str): The event ID
+            slots (List[Dict]): The event's slots; slots without capacity are skipped
+            
+        Raises:
+            Exception: If the update fails
+        """
+        try:
+            if inventory_collection is None:
+                raise Exception("Database connection not established")
+            
+            operations = [
+                UpdateOne(
+                    {"event_id": ObjectId(event_id), "slot_name": slot["name"]},
+                    {"$set": {"capacity": slot["capacity"]}, "$setOnInsert": {"sold": 0}},
+                    upsert=True
+                )
+                for slot in slots
+                if slot.get("name") and slot.get("capacity") is not None
+            ]
+            if operations:
+                await inventory_collection.bulk_write(operations, ordered=False)
+                
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
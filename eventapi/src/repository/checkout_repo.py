@@ -0,0 +1,69 @@
+from db.connect import MongoDBSingleton
+from pymongo.errors import PyMongoError
+from repository.bookings_repo import BookingRepo, SoldOutError
+from typing import Dict
+
+mongo = MongoDBSingleton()
+db = mongo.get_database()
+if db is not None:
+    bookings_collection = db["bookings"]
+    payments_collection = db["payments"]
+    tickets_collection = db["tickets"]
+else:
+    bookings_collection = None
+    payments_collection = None
+    tickets_collection = None
+
+
+class CheckoutRepo:
+    @staticmethod
+    async def create_checkout(event: Dict, booking: Dict, payment: Dict, ticket: Dict) -> Dict:
+        """
+        Reserve seats and create a booking, payment and ticket in one transaction
+        
+        The three documents must already carry their _id and references to
+        each other. Either the seats are taken and all three are stored, or
+        nothing is; transient transaction errors are retried by the driver.
+        The slot's inventory row is created before the transaction starts:
+        a duplicate key error from racing upserts would abort it.
+        
+        Args:
+            event (Dict): The event (needs _id and slots)
+            booking (Dict): The booking document; its inventory_reserved is filled in
+            payment (Dict): The payment document
+            ticket (Dict): The ticket document
+            
+        Returns:
+            Dict: {"booking", "payment", "ticket"} as stored
+            
+        Raises:
+            SoldOutError: If the slot does not have enough seats left
+            Exception: If the transaction fails
+        """
+        try:
+            if bookings_collection is None:
+                raise Exception("Database connection not established")
+            
+            await BookingRepo.ensure_slot(event, booking["slot_name"])
+            
+            async def write(session):
+                reserved = await BookingRepo.reserve_slot(
+                    event, booking["slot_name"], booking["quantity"], session=session
+                )
+                booking["inventory_reserved"] = booking["quantity"] if reserved else 0
+                await bookings_collection.insert_one(booking, session=session)
+                await payments_collection.insert_one(payment, session=session)
+                await tickets_collection.insert_one(ticket, session=session)
+            
+            async with await mongo.client.start_session() as session:
+                await session.with_transaction(write)
+            return {"booking": booking, "payment": payment, "ticket": ticket}
+            
+        except SoldOutError:
+            raise
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+        except Exception as e:
+            print(f"Error creating checkout: {str(e)}")
+            raise Exception(f"Error creating checkout: {str(e)}")
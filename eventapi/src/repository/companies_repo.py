@@ -2,6 +2,8 @@ from db.connect import MongoDBSingleton
 from bson import ObjectId
 from schemas.companiesSchema import CompaniesAdmin
 from typing import List, Optional
+from db.writes import insert_document
+from utils.snapshot import catalog_snapshots
 
 db = MongoDBSingleton().get_database()
 if db is not None:
@@ -29,7 +31,7 @@ class CompanyRepo():
             # print("Inside findcompanies")
             companies_cursor = companies_collection.find({}, {'_id': 0})
             companies = []
-            for company in companies_cursor:
+            async for company in companies_cursor:
                 companies.append(company)
             # print(f"companies repo {companies}")
             return companies
@@ -62,19 +64,10 @@ class CompanyRepo():
             # Convert Pydantic model to dict
             company_dict = company_data.model_dump(exclude_unset=True)
             
-            # Use Motor's async insert_one
-            result = await companies_collection.insert_one(company_dict)
-            
-            if result.inserted_id:
-                # Use Motor's async find_one to get the new document
-                new_company = await companies_collection.find_one(
-                    {"_id": result.inserted_id}
-                )
-                if new_company:
-                    new_company['_id'] = str(new_company['_id'])
-                return new_company
-            
-            raise Exception("Failed to insert company")
+            # Insert and return the document as stored
+            created = await insert_document(companies_collection, company_dict)
+            catalog_snapshots.invalidate("companies")
+            return created
                 
         except Exception as e:
             print(f"Error adding company: {str(e)}")
@@ -1,8 +1,18 @@
 from models import event
 from db.connect import MongoDBSingleton
+from db.indexes import register_indexes
+from db.pagination import paginate, decode_cursor, encode_cursor, keyset_filter, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from db.writes import update_document
+from utils.cache import cache_from_env
+from utils.event_time import TIME_SOURCE_FIELDS, parse_bound, time_fields
+from utils import geohash
+from pymongo import IndexModel, ASCENDING, DESCENDING, GEOSPHERE, TEXT
 from bson import ObjectId
 from schemas.eventSchema import EventSchemaAdminReq
+import os
 import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 db = MongoDBSingleton().get_database()
 if db is not None:
@@ -10,33 +20,105 @@ if db is not None:
 else:
     events_collection = None
 
+register_indexes("events", [
+    IndexModel([("state", ASCENDING), ("city", ASCENDING)], name="state_city"),
+    IndexModel([("category", ASCENDING), ("_id", DESCENDING)], name="category_id"),
+    IndexModel(
+        [("state", ASCENDING), ("city", ASCENDING), ("category", ASCENDING), ("_id", DESCENDING)],
+        name="state_city_category_id",
+    ),
+    IndexModel([("tags", ASCENDING), ("_id", DESCENDING)], name="tags_id"),
+    IndexModel([("category", ASCENDING), ("price", ASCENDING)], name="category_price"),
+    IndexModel([("starts_at", ASCENDING), ("_id", ASCENDING)], name="starts_at_id"),
+    IndexModel([("location", GEOSPHERE), ("category", ASCENDING), ("starts_at", ASCENDING)], name="location_2dsphere"),
+    IndexModel([("state", ASCENDING), ("starts_at", ASCENDING), ("_id", ASCENDING)], name="state_starts_at_id"),
+    IndexModel(
+        [("title", TEXT), ("tags", TEXT), ("description", TEXT)],
+        weights={"title": 10, "tags": 5, "description": 1},
+        default_language="english",
+        name="events_text",
+    ),
+], queries=[
+    {"filter": {"state": "Maharashtra"}},
+    {"filter": {"state": "Maharashtra", "city": "Mumbai"}},
+    {"filter": {"category": "music"}, "sort": [("_id", DESCENDING)]},
+    {"filter": {"state": "Maharashtra", "city": "Mumbai", "category": "music"}, "sort": [("_id", DESCENDING)]},
+    {"filter": {"tags": "jazz"}, "sort": [("_id", DESCENDING)]},
+    {"filter": {"category": "music", "price": {"$gte": 500, "$lte": 2000}}},
+    {"filter": {"starts_at": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2026, 1, 1)}}},
+    {"filter": {"location": {"$nearSphere": {"$geometry": {"type": "Point", "coordinates": [72.8777, 19.076]}, "$maxDistance": 10000}}, "category": "music"}},
+    {"filter": {"starts_at": {"$gte": datetime(2025, 1, 1)}}, "sort": [("starts_at", ASCENDING), ("_id", ASCENDING)]},
+    {
+        "filter": {"state": "Maharashtra", "starts_at": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 2, 1)}},
+        "sort": [("starts_at", ASCENDING), ("_id", ASCENDING)],
+        "projection": {"_id": 1, "starts_at": 1},
+    },
+    {"filter": {"$text": {"$search": "music"}}},
+    {"filter": {"$text": {"$search": "music"}, "category": "music"}},
+])
+
+# Read-through cache for the catalog reads; createEvent/updateEvent invalidate it.
+# Configured with EVENT_CACHE_URL (redis://... to share it), EVENT_CACHE_TTL
+# and EVENT_CACHE_MAX_ENTRIES.
+event_cache = cache_from_env("events", "EVENT_CACHE", ttl=60, max_entries=1024)
+
+# Search result pages keyed by the normalized query; short-lived because a
+# popular query is repeated many times a minute while the catalog rarely
+# changes. Configured with EVENT_SEARCH_CACHE_URL/_TTL/_MAX_ENTRIES.
+search_cache = cache_from_env("event_search", "EVENT_SEARCH_CACHE", ttl=30, max_entries=2048)
+
+# Nearby-event pages keyed by the geohash cell of the query point, so mobile
+# clients a few metres apart share an entry. EVENT_NEAR_CACHE_PRECISION sets
+# the cell size (7 = about 150 m); EVENT_NEAR_CACHE_URL/_TTL/_MAX_ENTRIES as usual.
+near_cache = cache_from_env("event_near", "EVENT_NEAR_CACHE", ttl=60, max_entries=4096)
+NEAR_CACHE_PRECISION = int(os.environ.get("EVENT_NEAR_CACHE_PRECISION", 7))
+
+# Listing fields only; the long text and slot details stay on the detail page
+LIST_PROJECTION = {"about": 0, "additionalInfo": 0, "description": 0, "slots": 0}
+
+# Upper bounds of the price facet buckets; anything above the last one is "more"
+PRICE_BUCKETS = [0, 500, 1000, 2500, 5000, 10000]
+FACET_TAG_LIMIT = 20
+
+
+def normalize_search(q: str) -> str:
+    """
+    Canonical form of a search string so equivalent queries share a cache entry
+
+    Lowercases and collapses whitespace. Plain term lists are also
+    deduplicated and sorted, since $text ORs the terms; phrases and negations
+    keep their order.
+    """
+    terms = q.lower().split()
+    if '"' in q or any(term.startswith("-") for term in terms):
+        return " ".join(terms)
+    return " ".join(sorted(set(terms)))
+
 
 class EventsRepo():
 
     @staticmethod
-    async def findEvents():
+    async def findEvents(
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
+        """
+        Get one page of events, newest first
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...} plus "total" if requested
+        """
         try:
             if events_collection is None:
                 raise Exception("Database connection not initialized")
     
-            print("Fetching events from database...")
-            # Remove the '_id': 0 projection to allow ID conversion
-            print(f"Events collection: {events_collection.find({})}")
-            events_cursor = events_collection.find({})
-            print(f"Events cursor: {events_cursor}")
-            events = []
-            for event in events_cursor:
-                print(f"Event: {event}")
-                events.append(event)
-
-            # Transform the events to handle ObjectId
-            transformed_events = []
-            for event in events:
-                event['_id'] = str(event['_id'])  # Convert ObjectId to string
-                transformed_events.append(event)
-    
-            print(f"Found {len(transformed_events)} events")
-            return transformed_events
+            page = await event_cache.get_or_load(
+                f"page:{limit}:{after}:{include_total}",
+                lambda: paginate(events_collection, limit=limit, after=after, include_total=include_total)
+            )
+            print(f"Found {len(page['data'])} events")
+            return page
     
         except Exception as e:
             print(f"Error in findEvents: {str(e)}")
@@ -44,31 +126,43 @@ class EventsRepo():
     
     @staticmethod
     async def findEventById(eventId : str):
-        event = events_collection.find_one({"_id": ObjectId(eventId)})
-        print(f"eventttt {event}")
-        return event
+        return await event_cache.get_or_load(
+            f"id:{eventId}",
+            lambda: events_collection.find_one({"_id": ObjectId(eventId)})
+        )
     
     @staticmethod
-    def findEventByName(eventName : str):
-        return events_collection.find_one({"name": eventName})
+    async def findEventByName(eventName : str):
+        return await events_collection.find_one({"name": eventName})
         
     @staticmethod
-    def findEventByStateName(stateName : str):
-        return events_collection.find_one({"state": stateName})
+    async def findEventByStateName(stateName : str):
+        return await event_cache.get_or_load(
+            f"state:{stateName}",
+            lambda: events_collection.find({"state": stateName}).sort("_id", DESCENDING).to_list(length=MAX_PAGE_SIZE)
+        )
     
     @staticmethod
-    def findEventByCityName(stateName : str , cityName : str):
-        return events_collection.find_one({"state": stateName , "city": cityName})
+    async def findEventByCityName(stateName : str , cityName : str):
+        return await event_cache.get_or_load(
+            f"city:{stateName}:{cityName}",
+            lambda: events_collection.find({"state": stateName , "city": cityName}).sort("_id", DESCENDING).to_list(length=MAX_PAGE_SIZE)
+        )
     
     @staticmethod
-    def createEvent(event : EventSchemaAdminReq):
+    async def createEvent(event : EventSchemaAdminReq):
         """Create event"""
         try:
             if events_collection is None:
                 raise Exception("Database connection failed")
-            returned_event = events_collection.insert_one(event)
+            event_dict = event if isinstance(event, dict) else event.model_dump()
+            event_dict.update(time_fields(event_dict) or {"starts_at": None, "ends_at": None})
+            returned_event = await events_collection.insert_one(event_dict)
             if returned_event is not None:
-                return event
+                await event_cache.invalidate()
+                await search_cache.invalidate()
+                await near_cache.invalidate()
+                return event_dict
             return None
         except Exception as e:
             raise Exception(f"Error creating event: {str(e)}")
@@ -79,28 +173,28 @@ class EventsRepo():
         update event
         """
         try:
-            print(f"eeefefererrfef {event}")
             if events_collection is None:
                 raise Exception("Database connection failed")
-            existing_event = await EventsRepo.findEventById(eventId)
-            print(f"exxxxxx {existing_event}")
-            if not existing_event:
-                raise Exception("Event not found")
             update_data = event if isinstance(event, dict) else event.model_dump(exclude_unset=True)
-            print(f"upppppppp {update_data}")
-            result = events_collection.update_one(
+            if any(field in update_data for field in TIME_SOURCE_FIELDS):
+                # Recompute the normalized times from the merged date/time/end
+                current = await events_collection.find_one(
+                    {"_id": ObjectId(eventId)},
+                    {field: 1 for field in TIME_SOURCE_FIELDS}
+                ) or {}
+                times = time_fields({**current, **update_data})
+                update_data = {**update_data, **(times or {"starts_at": None, "ends_at": None})}
+            updated_event = await update_document(
+                events_collection,
                 {"_id": ObjectId(eventId)},
                 {"$set": update_data}
             )
-
-            print(f"Modified count: {result.modified_count}")
-        
-            if result.modified_count > 0:
-                # Get and return the updated document
-                updated_event = await EventsRepo.findEventById(eventId)
-                return updated_event
-                
-            return None
+            if not updated_event:
+                raise Exception("Event not found")
+            await event_cache.invalidate()
+            await search_cache.invalidate()
+            await near_cache.invalidate()
+            return updated_event
         except Exception as e:
             raise Exception(f"Error updating event: {str(e)}")
 
@@ -108,23 +202,332 @@ class EventsRepo():
     @staticmethod
     async def geteventbycategory(category: str):
         """
-        Get events by partial category name match using regex
-        Returns list of events matching the category pattern
+        Get events in a category (exact match), newest first
+        Returns list of events in the category
         """
         try:
             if events_collection is None:
                 raise Exception("Database connection failed")
-            # Find all events matching the category pattern
-            cursor = events_collection.find({"$text": {"$search": "music"}})
-            events = []
-            for event in cursor:
-                events.append(event)
-            # Transform events to handle ObjectId
-            transformed_events = []
-            for event in events:
-                event['_id'] = str(event['_id'])
-                transformed_events.append(event)
-            return transformed_events
+            cursor = events_collection.find({"category": category}, LIST_PROJECTION).sort("_id", DESCENDING)
+            return await cursor.to_list(length=MAX_PAGE_SIZE)
         except Exception as e:
             print(f"Error in geteventbycategory: {str(e)}")
-            raise Exception(f"Error fetching events by category: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error fetching events by category: {str(e)}")
+
+    @staticmethod
+    async def searchEvents(
+        q: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None
+    ) -> Dict:
+        """
+        Full-text search over title, tags and description, ranked by relevance
+
+        Args:
+            q (Optional[str]): Search terms; without it the category is listed newest first
+            category (Optional[str]): Exact category filter
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...}; hits carry their "score"
+
+        Raises:
+            ValueError: If ``after`` is not a valid cursor
+        """
+        try:
+            if events_collection is None:
+                raise Exception("Database connection not initialized")
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            terms = normalize_search(q) if q else ""
+            return await search_cache.get_or_load(
+                f"{terms}|{category}|{limit}|{after}",
+                lambda: EventsRepo._search(terms, category, limit, after)
+            )
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error in searchEvents: {str(e)}")
+            raise Exception(f"Failed to search events: {str(e)}")
+
+    @staticmethod
+    async def _search(terms: str, category: Optional[str], limit: int, after: Optional[str]) -> Dict:
+        match = {"category": category} if category else {}
+        if not terms:
+            return await paginate(events_collection, match, limit=limit, after=after, projection=LIST_PROJECTION)
+
+        # Relevance order is (score desc, _id desc), so the cursor carries the
+        # score of the last hit and the next page resumes right after it
+        match["$text"] = {"$search": terms}
+        pipeline = [{"$match": match}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+        if after:
+            pipeline.append({"$match": keyset_filter(decode_cursor(after, "score"), "score")})
+        pipeline += [
+            {"$sort": {"score": -1, "_id": -1}},
+            {"$limit": limit + 1},
+            {"$project": LIST_PROJECTION},
+        ]
+        docs = await events_collection.aggregate(pipeline).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1], "score")
+        return {"data": docs, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def filterEvents(
+        filters: Dict,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None
+    ) -> Dict:
+        """
+        Get one page of events matching the filters plus facet counts, in one aggregation
+
+        Args:
+            filters (Dict): Any of state, city, category, min_price, max_price,
+                date_from, date_to (ISO dates) and tags (events must have all of them)
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ..., "total": int, "facets": {...}} where
+            facets has the counts per state, city, category, tag and price bucket
+
+        Raises:
+            ValueError: If ``after`` is not a valid cursor
+        """
+        try:
+            if events_collection is None:
+                raise Exception("Database connection not initialized")
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            match = EventsRepo._filter_query(filters)
+            keyset = keyset_filter(decode_cursor(after), "_id") if after else None
+            key = "facet:" + "|".join(f"{name}={filters[name]}" for name in sorted(filters)) + f":{limit}:{after}"
+            return await event_cache.get_or_load(key, lambda: EventsRepo._facet(match, keyset, limit))
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error in filterEvents: {str(e)}")
+            raise Exception(f"Failed to filter events: {str(e)}")
+
+    @staticmethod
+    def _filter_query(filters: Dict) -> Dict:
+        query = {field: filters[field] for field in ("state", "city", "category") if filters.get(field)}
+        if filters.get("tags"):
+            query["tags"] = {"$all": list(filters["tags"])}
+        price = {}
+        if filters.get("min_price") is not None:
+            price["$gte"] = filters["min_price"]
+        if filters.get("max_price") is not None:
+            price["$lte"] = filters["max_price"]
+        if price:
+            query["price"] = price
+        # The dates are local calendar days; compare against the normalized
+        # starts_at, as the free-form date strings do not sort
+        starts_at = {}
+        if filters.get("date_from"):
+            starts_at["$gte"] = parse_bound(filters["date_from"])
+        if filters.get("date_to"):
+            starts_at["$lt"] = parse_bound(filters["date_to"]) + timedelta(days=1)
+        if starts_at:
+            query["starts_at"] = starts_at
+        return query
+
+    @staticmethod
+    async def _facet(match: Dict, keyset: Optional[Dict], limit: int) -> Dict:
+        results = [{"$sort": {"_id": -1}}]
+        if keyset:
+            results.append({"$match": keyset})
+        results += [{"$limit": limit + 1}, {"$project": LIST_PROJECTION}]
+
+        pipeline = [
+            {"$match": match},
+            {"$facet": {
+                "results": results,
+                "total": [{"$count": "count"}],
+                "state": [{"$sortByCount": "$state"}],
+                "city": [{"$sortByCount": "$city"}],
+                "category": [{"$sortByCount": "$category"}],
+                "tags": [{"$unwind": "$tags"}, {"$sortByCount": "$tags"}, {"$limit": FACET_TAG_LIMIT}],
+                "price": [{"$bucket": {
+                    "groupBy": "$price",
+                    "boundaries": PRICE_BUCKETS,
+                    "default": "more",
+                }}],
+            }},
+        ]
+        faceted = await events_collection.aggregate(pipeline).to_list(length=1)
+        faceted = faceted[0] if faceted else {}
+
+        docs = faceted.get("results", [])
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1])
+        total = faceted.get("total") or [{"count": 0}]
+        facets = {
+            name: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in faceted.get(name, []) if bucket["_id"] is not None]
+            for name in ("state", "city", "category", "tags", "price")
+        }
+        return {"data": docs, "next_cursor": next_cursor, "total": total[0]["count"], "facets": facets}
+
+    @staticmethod
+    async def findUpcoming(
+        starts_from: datetime,
+        starts_before: Optional[datetime] = None,
+        state: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None
+    ) -> Dict:
+        """
+        Get one page of events starting in a time range, soonest first
+
+        Args:
+            starts_from (datetime): Earliest start, inclusive (UTC)
+            starts_before (Optional[datetime]): Latest start, exclusive (UTC)
+            state (Optional[str]): Exact state
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...}
+
+        Raises:
+            ValueError: If ``after`` is not a valid cursor
+        """
+        try:
+            if events_collection is None:
+                raise Exception("Database connection not initialized")
+            starts_at = {"$gte": starts_from}
+            if starts_before is not None:
+                starts_at["$lt"] = starts_before
+            query = {"state": state, "starts_at": starts_at} if state else {"starts_at": starts_at}
+            return await event_cache.get_or_load(
+                f"upcoming:{state}:{starts_from.isoformat()}:{starts_before}:{limit}:{after}",
+                lambda: paginate(
+                    events_collection,
+                    query,
+                    limit=limit,
+                    after=after,
+                    sort_field="starts_at",
+                    projection=LIST_PROJECTION,
+                    ascending=True,
+                )
+            )
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error in findUpcoming: {str(e)}")
+            raise Exception(f"Failed to fetch upcoming events: {str(e)}")
+
+    @staticmethod
+    async def findNear(
+        lat: float,
+        lng: float,
+        radius_m: float,
+        category: Optional[str] = None,
+        starts_from: Optional[datetime] = None,
+        starts_before: Optional[datetime] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None
+    ) -> Dict:
+        """
+        Get one page of events within a radius, nearest first
+
+        The point is snapped to the centre of its geohash cell so repeated
+        queries from around the same spot are answered from near_cache;
+        distances are measured from that centre.
+
+        Args:
+            lat (float): Latitude of the user
+            lng (float): Longitude of the user
+            radius_m (float): Search radius in metres
+            category (Optional[str]): Exact category
+            starts_from (Optional[datetime]): Earliest start, inclusive (UTC)
+            starts_before (Optional[datetime]): Latest start, exclusive (UTC)
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...}; each event has "distance" in metres
+
+        Raises:
+            ValueError: If ``after`` is not a valid cursor
+        """
+        try:
+            if events_collection is None:
+                raise Exception("Database connection not initialized")
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            cell = geohash.encode(lat, lng, NEAR_CACHE_PRECISION)
+            key = f"{cell}:{radius_m}:{category}:{starts_from}:{starts_before}:{limit}:{after}"
+            return await near_cache.get_or_load(
+                key,
+                lambda: EventsRepo._near(cell, radius_m, category, starts_from, starts_before, limit, after)
+            )
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error in findNear: {str(e)}")
+            raise Exception(f"Failed to fetch nearby events: {str(e)}")
+
+    @staticmethod
+    async def _near(
+        cell: str,
+        radius_m: float,
+        category: Optional[str],
+        starts_from: Optional[datetime],
+        starts_before: Optional[datetime],
+        limit: int,
+        after: Optional[str]
+    ) -> Dict:
+        center_lat, center_lng = geohash.decode(cell)
+        query = {"category": category} if category else {}
+        starts_at = {}
+        if starts_from is not None:
+            starts_at["$gte"] = starts_from
+        if starts_before is not None:
+            starts_at["$lt"] = starts_before
+        if starts_at:
+            query["starts_at"] = starts_at
+
+        pipeline = [{"$geoNear": {
+            "near": {"type": "Point", "coordinates": [center_lng, center_lat]},
+            "distanceField": "distance",
+            "maxDistance": radius_m,
+            "query": query,
+            "spherical": True,
+        }}]
+        # Nearest first is (distance asc, _id asc); resume right after the last hit
+        if after:
+            pipeline.append({"$match": keyset_filter(decode_cursor(after, "distance"), "distance", ascending=True)})
+        pipeline += [
+            {"$sort": {"distance": 1, "_id": 1}},
+            {"$limit": limit + 1},
+            {"$project": LIST_PROJECTION},
+        ]
+        docs = await events_collection.aggregate(pipeline).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1], "distance")
+        return {"data": docs, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def suggestSource() -> List[Dict]:
+        """Get the fields the autocomplete index is built from, for every event"""
+        try:
+            if events_collection is None:
+                raise Exception("Database connection not initialized")
+            cursor = events_collection.find({}, {"title": 1, "venue": 1, "city": 1, "tags": 1})
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            print(f"Error in suggestSource: {str(e)}")
+            raise Exception(f"Failed to load events for suggestions: {str(e)}")
+
+    @staticmethod
+    def cacheStats() -> Dict:
+        """Hit/miss/eviction counters of the event, search and nearby caches"""
+        return {"events": event_cache.stats(), "search": search_cache.stats(), "near": near_cache.stats()}
\ No newline at end of file
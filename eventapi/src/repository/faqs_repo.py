@@ -2,7 +2,10 @@ from db.connect import MongoDBSingleton
 from bson import ObjectId
 from schemas.faqsSchema import FAQsSchemaReq
 from pymongo.errors import PyMongoError
-from typing import List, Optional
+from typing import Dict, Optional
+from db.pagination import paginate, DEFAULT_PAGE_SIZE
+from db.writes import insert_document
+from utils.snapshot import catalog_snapshots
 
 db = MongoDBSingleton().get_database()
 if db is not None:
@@ -31,13 +34,9 @@ class FAQsRepo:
                 raise Exception("Database connection not established")
                 
             faq_dict = faq.model_dump(exclude_none=True, exclude={'id'})
-            result = faqs_collection.insert_one(faq_dict)
-            
-            if result.inserted_id:
-                new_faq = faqs_collection.find_one({"_id": result.inserted_id})
-                return new_faq
-            else:
-                raise Exception("Failed to insert FAQ")
+            created = await insert_document(faqs_collection, faq_dict)
+            catalog_snapshots.invalidate("faqs")
+            return created
                 
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -47,12 +46,21 @@ class FAQsRepo:
             raise Exception(f"Error adding FAQ: {str(e)}")
 
     @staticmethod
-    async def getAllFAQs() -> List[dict]:
+    async def getAllFAQs(
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
         """
-        Get all FAQs from the database
+        Get one page of FAQs from the database, newest first
         
+        Args:
+            limit (int): Maximum number of FAQs to return
+            after (Optional[str]): The next_cursor of the previous page
+            include_total (bool): Whether to include the total FAQ count
+            
         Returns:
-            List[dict]: List of FAQ documents
+            Dict: {"data": [...], "next_cursor": ...} plus "total" if requested
             
         Raises:
             PyMongoError: If there's an error during database operation
@@ -62,9 +70,7 @@ class FAQsRepo:
             if faqs_collection is None:
                 raise Exception("Database connection not established")
                 
-            cursor = faqs_collection.find({})
-            faqs = cursor.to_list(length=None)
-            return faqs
+            return await paginate(faqs_collection, limit=limit, after=after, include_total=include_total)
             
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -95,7 +101,7 @@ class FAQsRepo:
             if not ObjectId.is_valid(faq_id):
                 raise Exception("Invalid FAQ ID format")
                 
-            faq = faqs_collection.find_one({"_id": ObjectId(faq_id)})
+            faq = await faqs_collection.find_one({"_id": ObjectId(faq_id)})
             return faq
             
         except PyMongoError as e:
@@ -3,6 +3,7 @@ from bson import ObjectId
 from schemas.feedbackSchema import FeedbackSchemaReq
 from pymongo.errors import PyMongoError
 from typing import List, Optional
+from db.writes import insert_document
 
 db = MongoDBSingleton().get_database()
 if db is not None:
@@ -30,20 +31,10 @@ class FeedbackRepo():
             if feedback_collection is None:
                 raise Exception("Database connection not established")
                 
-            # Convert Pydantic model to dict excluding any None values
-            feedback_dict = feedback.model_dump(exclude_none=True, exclude={'id'})
+            feedback_dict = FeedbackRepo.toDocument(feedback)
             
-            # Insert the feedback
-            result = feedback_collection.insert_one(feedback_dict)
-            
-            if result.inserted_id:
-                # Fetch and return the newly created feedback
-                new_feedback = feedback_collection.find_one(
-                    {"_id": result.inserted_id}
-                )
-                return new_feedback
-            else:
-                raise Exception("Failed to insert feedback")
+            # Insert the feedback and return it as stored
+            return await insert_document(feedback_collection, feedback_dict)
                 
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -52,6 +43,31 @@ class FeedbackRepo():
             print(f"Error adding feedback: {str(e)}")
             raise Exception(f"Error adding feedback: {str(e)}")
 
+    @staticmethod
+    def toDocument(feedback: FeedbackSchemaReq) -> dict:
+        """Convert a feedback submission to the document stored, excluding any None values"""
+        return feedback.model_dump(exclude_none=True, exclude={'id'})
+
+    @staticmethod
+    async def addFeedbackBatch(feedbacks: List[dict]) -> int:
+        """
+        Insert a batch of feedback documents in one round trip
+        
+        Args:
+            feedbacks (List[dict]): Documents built by toDocument, with their _id set
+            
+        Returns:
+            int: Number of documents inserted
+            
+        Raises:
+            BulkWriteError: If some documents were rejected; the others are inserted
+            PyMongoError: If the batch could not be written
+        """
+        if feedback_collection is None:
+            raise Exception("Database connection not established")
+        result = await feedback_collection.insert_many(feedbacks, ordered=False)
+        return len(result.inserted_ids)
+
     @staticmethod
     async def getFeedbackByUser(user_id: str) -> List[dict]:
         """
@@ -75,7 +91,7 @@ class FeedbackRepo():
                 raise Exception("Invalid user ID format")
             
             # Use await with the find operation
-            cursor = feedback_collection.find({"user": user_id}).to_list(None)
+            cursor = await feedback_collection.find({"user": user_id}).to_list(None)
             return cursor if cursor else []
             
         except PyMongoError as e:
@@ -107,7 +123,7 @@ class FeedbackRepo():
             if not ObjectId.is_valid(feedback_id):
                 raise Exception("Invalid feedback ID format")
                 
-            feedback = feedback_collection.find_one({"_id": ObjectId(feedback_id)})
+            feedback = await feedback_collection.find_one({"_id": ObjectId(feedback_id)})
             return feedback
             
         except PyMongoError as e:
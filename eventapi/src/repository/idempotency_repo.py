@@ -0,0 +1,102 @@
+from db.connect import MongoDBSingleton
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import PyMongoError, DuplicateKeyError
+from db.indexes import register_indexes
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import os
+
+db = MongoDBSingleton().get_database()
+if db is not None:
+    idempotency_collection = db["idempotency_keys"]
+else:
+    idempotency_collection = None
+
+# Stored responses are replayed for this long after the first request
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL_HOURS", 24)) * 3600
+# A pending claim older than this is treated as abandoned (its worker died)
+IDEMPOTENCY_LEASE = timedelta(seconds=float(os.environ.get("IDEMPOTENCY_LEASE", 60)))
+
+register_indexes("idempotency_keys", [
+    IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=IDEMPOTENCY_TTL),
+])
+
+
+class IdempotencyRepo:
+    """Mongo-backed store for the Idempotency-Key middleware."""
+
+    @staticmethod
+    async def claim(key: str, fingerprint: str) -> Optional[Dict]:
+        """
+        Claim a key for the request about to run
+        
+        Args:
+            key (str): The scoped idempotency key
+            fingerprint (str): Hash of the request the key was sent with
+            
+        Returns:
+            Optional[Dict]: None if this request owns the key now, otherwise the
+            existing record ({"fingerprint", "state", ...})
+            
+        Raises:
+            Exception: If the store cannot be reached
+        """
+        try:
+            if idempotency_collection is None:
+                raise Exception("Database connection not established")
+            now = datetime.now()
+            try:
+                await idempotency_collection.insert_one(
+                    {"_id": key, "fingerprint": fingerprint, "state": "pending", "created_at": now}
+                )
+                return None
+            except DuplicateKeyError:
+                pass
+            # Take over a claim whose owner never finished
+            taken = await idempotency_collection.find_one_and_update(
+                {"_id": key, "fingerprint": fingerprint, "state": "pending",
+                 "created_at": {"$lt": now - IDEMPOTENCY_LEASE}},
+                {"$set": {"created_at": now}}
+            )
+            if taken is not None:
+                return None
+            return await idempotency_collection.find_one({"_id": key})
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def get(key: str) -> Optional[Dict]:
+        """Get the record of a key, None if it expired or was released"""
+        try:
+            return await idempotency_collection.find_one({"_id": key})
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def complete(key: str, status_code: int, headers: List[List[str]], body: bytes) -> None:
+        """Store the response of the request that owns the key"""
+        try:
+            await idempotency_collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "state": "done",
+                    "status_code": status_code,
+                    "headers": headers,
+                    "body": body,
+                    "created_at": datetime.now(),
+                }}
+            )
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def release(key: str) -> None:
+        """Drop a pending claim so the client's retry runs the request again"""
+        try:
+            await idempotency_collection.delete_one({"_id": key, "state": "pending"})
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
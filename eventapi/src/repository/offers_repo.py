@@ -1,7 +1,12 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from bson import ObjectId
 from db.connect import MongoDBSingleton
+from db.indexes import register_indexes
+from db.pagination import paginate, DEFAULT_PAGE_SIZE
+from db.writes import insert_document, update_document
+from pymongo import IndexModel, ASCENDING
 from models.offers import Offers
+from utils.snapshot import catalog_snapshots
 from datetime import datetime
 
 db = MongoDBSingleton().get_database()
@@ -10,6 +15,17 @@ if db is not None:
 else:
     offers_collection = None
 
+register_indexes("offers", [
+    IndexModel([("promo_code", ASCENDING)], name="promo_code_unique", unique=True),
+    IndexModel([("is_active", ASCENDING), ("valid_till", ASCENDING)], name="is_active_valid_till"),
+], queries=[
+    {"filter": {"promo_code": "PROMO"}},
+    {"filter": {"is_active": True, "valid_till": {"$gt": datetime(2025, 1, 1)}, "excluded_events": {"$ne": "000000000000000000000000"}}},
+])
+
+# Offers shown on an event page
+EVENT_OFFER_LIMIT = 20
+
 class OffersRepo:
     @staticmethod
     async def create_offer(offer_data: Offers) -> dict:
@@ -18,12 +34,9 @@ class OffersRepo:
         try:
             if offers_collection is None:
                 raise Exception("Database connection not initialized")
-            result = offers_collection.insert_one(offer_data)
-            print("Inserted offer:", result.inserted_id)
-            if result.inserted_id:
-                offer = await OffersRepo.find_offer_by_id(str(result.inserted_id))
-                return offer
-            raise Exception("Failed to create offer")
+            created = await insert_document(offers_collection, offer_data)
+            catalog_snapshots.invalidate("featured_offers")
+            return created
         except Exception as e:
             raise Exception(f"Error creating offer: {str(e)}")
 
@@ -34,23 +47,23 @@ class OffersRepo:
             if offers_collection is None:
                 raise Exception("Database connection not initialized")
                 
-            offer = offers_collection.find_one({"_id": ObjectId(offer_id)})
+            offer = await offers_collection.find_one({"_id": ObjectId(offer_id)})
             return offer
         except Exception as e:
             raise Exception(f"Error finding offer: {str(e)}")
 
     @staticmethod
-    async def find_all_offers() -> List[dict]:
-        """Find all offers with optional active only filter"""
+    async def find_all_offers(
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
+        """Find one page of offers, newest first"""
         try:
             if offers_collection is None:
                 raise Exception("Database connection not initialized")
                 
-            cursor = offers_collection.find({})
-            offers = []
-            for offer in cursor:
-                offers.append(offer)
-            return offers
+            return await paginate(offers_collection, limit=limit, after=after, include_total=include_total)
         except Exception as e:
             raise Exception(f"Error finding offers: {str(e)}")
 
@@ -61,19 +74,13 @@ class OffersRepo:
             if offers_collection is None:
                 raise Exception("Database connection not initialized")
 
-            existing_offer = await OffersRepo.find_offer_by_id(offer_id)
-            if not existing_offer:
-                raise Exception("Offer not found")
-
             update_data = offer_data if isinstance(offer_data, dict) else offer_data.model_dump(exclude_unset=True)
 
-            result = offers_collection.update_one({"_id": ObjectId(offer_id)}, {"$set": update_data})
-
-            if result.modified_count > 0:
-                updated_offer = await OffersRepo.find_offer_by_id(offer_id)
-                return updated_offer    
-            
-            return None
+            updated_offer = await update_document(offers_collection, {"_id": ObjectId(offer_id)}, {"$set": update_data})
+            if not updated_offer:
+                raise Exception("Offer not found")
+            catalog_snapshots.invalidate("featured_offers")
+            return updated_offer
         except Exception as e:
             raise Exception(f"Error updating offer: {str(e)}")
 
@@ -85,6 +92,7 @@ class OffersRepo:
                 raise Exception("Database connection not initialized")
                 
             result = await offers_collection.delete_one({"_id": ObjectId(offer_id)})
+            catalog_snapshots.invalidate("featured_offers")
             return result.deleted_count > 0
         except Exception as e:
             raise Exception(f"Error deleting offer: {str(e)}")
@@ -114,7 +122,7 @@ class OffersRepo:
             if offers_collection is None:
                 raise Exception("Database connection not initialized")
                 
-            offer = offers_collection.find_one({"promo_code": promo_code})
+            offer = await offers_collection.find_one({"promo_code": promo_code})
             return offer
         except Exception as e:
             raise Exception(f"Error finding offer by promo code: {str(e)}")
@@ -137,3 +145,18 @@ class OffersRepo:
         except Exception as e:
             raise Exception(f"Error finding featured offers: {str(e)}")
 
+    @staticmethod
+    async def find_offers_for_event(event_id: str) -> List[dict]:
+        """Find the active offers that do not exclude an event, featured first"""
+        try:
+            if offers_collection is None:
+                raise Exception("Database connection not initialized")
+
+            cursor = offers_collection.find({
+                "is_active": True,
+                "valid_till": {"$gt": datetime.utcnow()},
+                "excluded_events": {"$ne": event_id}
+            }).sort([("is_featured", -1), ("valid_till", ASCENDING)]).limit(EVENT_OFFER_LIMIT)
+            return await cursor.to_list(length=EVENT_OFFER_LIMIT)
+        except Exception as e:
+            raise Exception(f"Error finding offers for event: {str(e)}")
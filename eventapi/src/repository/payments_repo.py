@@ -1,15 +1,43 @@
 from db.connect import MongoDBSingleton
 from bson import ObjectId
-from pymongo.errors import PyMongoError
+from pymongo import IndexModel, ASCENDING, UpdateOne
+from pymongo.errors import PyMongoError, DuplicateKeyError
 from typing import Optional, Dict ,List
 from datetime import datetime
 from models.payment import Payment
+from db.indexes import register_indexes
+from db.pagination import paginate, DEFAULT_PAGE_SIZE
+from db.writes import insert_document, update_document
+import os
 
 db = MongoDBSingleton().get_database()
 if db is not None:
     payments_collection = db["payments"]
+    webhooks_collection = db["payment_webhooks"]
 else:
     payments_collection = None
+    webhooks_collection = None
+
+# Applied webhook events are kept this long to recognise gateway redeliveries
+WEBHOOK_RETENTION = int(os.environ.get("PAYMENT_WEBHOOK_RETENTION_DAYS", 30)) * 86400
+
+register_indexes("payments", [
+    IndexModel([("razorpay_order_id", ASCENDING)], name="razorpay_order_id"),
+    IndexModel([("razorpay_payment_id", ASCENDING)], name="razorpay_payment_id", sparse=True),
+    IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+], queries=[
+    {"filter": {"razorpay_order_id": "order_0"}},
+    {"filter": {"razorpay_payment_id": "pay_0"}},
+    {"filter": {"status": "created", "booking_id": {"$exists": True}, "created_at": {"$lt": datetime(2025, 1, 1)}}},
+])
+
+# One row per gateway event id; unapplied rows (no applied_at) are replayed on startup
+register_indexes("payment_webhooks", [
+    IndexModel([("event_id", ASCENDING)], name="event_id_unique", unique=True),
+    IndexModel([("applied_at", ASCENDING)], name="applied_at_ttl", expireAfterSeconds=WEBHOOK_RETENTION),
+], queries=[
+    {"filter": {"applied_at": None}},
+])
 
 class PaymentRepo:
     @staticmethod
@@ -38,17 +66,8 @@ class PaymentRepo:
                 payment_dict = payment_data.dict(exclude_none=True, by_alias=True)
 
             
-            # Insert the payment
-            result = payments_collection.insert_one(payment_dict)
-            
-            if result.inserted_id:
-                # Fetch and return the newly created payment
-                new_payment = payments_collection.find_one(
-                    {"_id": result.inserted_id}
-                )
-                return new_payment
-            else:
-                raise Exception("Failed to create payment")
+            # Insert the payment and return it as stored
+            return await insert_document(payments_collection, payment_dict)
                 
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -89,6 +108,25 @@ class PaymentRepo:
             print(f"Error retrieving payment: {str(e)}")
             raise Exception(f"Error retrieving payment: {str(e)}")
     
+    @staticmethod
+    async def get_payment_by_order_id(order_id: str) -> Optional[Dict]:
+        """
+        Get the payment of a gateway order
+        
+        Args:
+            order_id (str): The razorpay_order_id
+            
+        Returns:
+            Optional[Dict]: The payment document if found, None otherwise
+        """
+        try:
+            if payments_collection is None:
+                raise Exception("Database connection not established")
+            return await payments_collection.find_one({"razorpay_order_id": order_id})
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+    
     @staticmethod
     async def update_payment_status(payment_id: str, status: str) -> Optional[Dict]:
         """
@@ -112,15 +150,11 @@ class PaymentRepo:
             if not ObjectId.is_valid(payment_id):
                 raise Exception("Invalid payment ID format")
                 
-            result = payments_collection.update_one(
+            updated_payment = await update_document(
+                payments_collection,
                 {"_id": ObjectId(payment_id)},
                 {"$set": {"status": status, "updated_at": datetime.now()}}
             )
-            
-            if result.modified_count == 0:
-                return None
-                
-            updated_payment = payments_collection.find_one({"_id": ObjectId(payment_id)})
             return updated_payment
             
         except PyMongoError as e:
@@ -130,13 +164,218 @@ class PaymentRepo:
             print(f"Error updating payment: {str(e)}")
             raise Exception(f"Error updating payment: {str(e)}")
         
-    
-    async def get_all_payments() -> List[dict]:
-        payments_cursor = payments_collection.find({})
-        payments = []
-        for payment in payments_cursor:
-            payments.append(payment)
-        return payments
-
-    async def get_payment_by_id(payment_id: str) -> Optional[dict]:
-        return await payments_collection.find_one({"_id": ObjectId(payment_id)})
\ No newline at end of file
+    @staticmethod
+    async def set_order_id(payment_id: ObjectId, order_id: str) -> Optional[Dict]:
+        """Attach the gateway order opened for a payment"""
+        try:
+            if payments_collection is None:
+                raise Exception("Database connection not established")
+            return await update_document(
+                payments_collection,
+                {"_id": payment_id},
+                {"$set": {"razorpay_order_id": order_id, "updated_at": datetime.now()}}
+            )
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def unpaid_checkouts(created_before: datetime, limit: int = 500) -> List[Dict]:
+        """
+        Checkout payments still awaiting payment that were opened before a cut-off
+
+        Args:
+            created_before (datetime): Only payments created earlier are returned
+            limit (int): Maximum number of payments
+
+        Returns:
+            List[Dict]: The payments' _id and razorpay_order_id (None if the order was never opened)
+        """
+        try:
+            if payments_collection is None:
+                raise Exception("Database connection not established")
+            cursor = payments_collection.find(
+                {"status": "created", "booking_id": {"$exists": True}, "created_at": {"$lt": created_before}},
+                {"razorpay_order_id": 1}
+            ).sort("created_at", ASCENDING).limit(limit)
+            return await cursor.to_list(length=limit)
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def get_all_payments(
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
+        """
+        Get one page of payments, newest first
+        
+        Args:
+            limit (int): Maximum number of payments to return
+            after (Optional[str]): The next_cursor of the previous page
+            include_total (bool): Whether to include the total payment count
+            
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...} plus "total" if requested
+        """
+        if payments_collection is None:
+            raise Exception("Database connection not established")
+        return await paginate(payments_collection, limit=limit, after=after, include_total=include_total)
+
+    @staticmethod
+    async def record_webhook(event: Dict) -> bool:
+        """
+        Store a gateway webhook event unless it was already received
+
+        Args:
+            event (Dict): The parsed event, with its gateway "event_id"
+
+        Returns:
+            bool: True if the event is new, False if it is a redelivery
+
+        Raises:
+            Exception: If the event could not be stored
+        """
+        try:
+            if webhooks_collection is None:
+                raise Exception("Database connection not established")
+            await webhooks_collection.insert_one({**event, "received_at": datetime.now()})
+            return True
+        except DuplicateKeyError:
+            return False
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def forget_webhook(event_id: str) -> None:
+        """Drop a recorded event so the gateway's redelivery is processed again"""
+        try:
+            await webhooks_collection.delete_one({"event_id": event_id, "applied_at": None})
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def retry_failed_webhook(event_id: str) -> bool:
+        """
+        Take a dead-lettered event back for another try
+
+        Only one redelivery wins the update, so concurrent redeliveries do
+        not queue the event twice.
+
+        Args:
+            event_id (str): The gateway's event id
+
+        Returns:
+            bool: True if the event was dead-lettered and is now pending again
+
+        Raises:
+            Exception: If the event could not be updated
+        """
+        try:
+            if webhooks_collection is None:
+                raise Exception("Database connection not established")
+            event = await webhooks_collection.find_one_and_update(
+                {"event_id": event_id, "failed_at": {"$exists": True}, "applied_at": None},
+                {"$unset": {"failed_at": "", "error": ""}},
+                projection={"_id": 1}
+            )
+            return event is not None
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def mark_webhook_failed(event_id: str, error: str) -> None:
+        """Dead-letter an event that could not be applied, counting the attempt"""
+        try:
+            if webhooks_collection is None:
+                raise Exception("Database connection not established")
+            await webhooks_collection.update_one(
+                {"event_id": event_id, "applied_at": None},
+                {"$set": {"failed_at": datetime.now(), "error": error[:500]}, "$inc": {"attempts": 1}}
+            )
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def pending_webhooks() -> List[Dict]:
+        """Recorded events that were never applied, oldest first, dead-lettered ones included"""
+        try:
+            if webhooks_collection is None:
+                raise Exception("Database connection not established")
+            cursor = webhooks_collection.find(
+                {"applied_at": None},
+                {"_id": 0, "received_at": 0, "failed_at": 0, "error": 0, "attempts": 0}
+            )
+            return await cursor.sort("gateway_created_at", ASCENDING).to_list(length=None)
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+
+    @staticmethod
+    async def mark_webhooks_applied(event_ids: List[str]) -> None:
+        """Set applied_at on processed events, which starts their retention period"""
+        if event_ids:
+            await webhooks_collection.update_many(
+                {"event_id": {"$in": event_ids}},
+                {"$set": {"applied_at": datetime.now()}, "$unset": {"failed_at": "", "error": ""}}
+            )
+
+    @staticmethod
+    async def apply_transitions(transitions: List[Dict]) -> List[Dict]:
+        """
+        Apply gateway status transitions to payments in one bulk write
+
+        Each transition only applies while the payment is in one of its
+        "from" states, so redeliveries and out-of-order events are no-ops.
+        The writes are ordered: a capture followed by a refund in the same
+        batch lands in that order.
+
+        Args:
+            transitions (List[Dict]): {"order_id", "payment_id", "status", "from"}; payments
+                are matched by order_id, or by payment_id when the event has no order, or
+                by our own "_id" when the payment has neither
+
+        Returns:
+            List[Dict]: The touched payments' _id, ticket_id and status after the write
+
+        Raises:
+            PyMongoError: If the write fails; the transitions can be applied again
+        """
+        if payments_collection is None:
+            raise Exception("Database connection not established")
+        operations = []
+        order_ids, payment_ids, ids = set(), set(), set()
+        for transition in transitions:
+            if transition.get("order_id"):
+                match = {"razorpay_order_id": transition["order_id"]}
+                order_ids.add(transition["order_id"])
+            elif transition.get("payment_id"):
+                match = {"razorpay_payment_id": transition["payment_id"]}
+                payment_ids.add(transition["payment_id"])
+            elif transition.get("_id"):
+                match = {"_id": transition["_id"]}
+                ids.add(transition["_id"])
+            else:
+                continue
+            changes = {"status": transition["status"], "updated_at": datetime.now()}
+            if transition.get("payment_id"):
+                changes["razorpay_payment_id"] = transition["payment_id"]
+            operations.append(UpdateOne({**match, "status": {"$in": transition["from"]}}, {"$set": changes}))
+        if not operations:
+            return []
+        await payments_collection.bulk_write(operations, ordered=True)
+        cursor = payments_collection.find(
+            {"$or": [
+                {"razorpay_order_id": {"$in": list(order_ids)}},
+                {"razorpay_payment_id": {"$in": list(payment_ids)}},
+                {"_id": {"$in": list(ids)}},
+            ]},
+            {"ticket_id": 1, "status": 1}
+        )
+        return await cursor.to_list(length=None)
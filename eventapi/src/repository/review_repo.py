@@ -1,12 +1,51 @@
 from db.connect import MongoDBSingleton
 from bson import ObjectId
 from schemas.reviewSchema import ReviewSchemaReq
+from db.indexes import register_indexes
+from db.pagination import paginate, DEFAULT_PAGE_SIZE
+from db.writes import insert_document
+from repository.events_repo import event_cache
+from pymongo import IndexModel, ASCENDING, DESCENDING, UpdateOne
+from typing import Dict, List, Optional
 
 db = MongoDBSingleton().get_database()
 if db is not None:
     review_collection = db["reviews"]
+    events_collection = db["events"]
+    users_collection = db["users"]
 else:
     review_collection = None
+    events_collection = None
+    users_collection = None
+
+register_indexes("reviews", [
+    IndexModel([("event", ASCENDING), ("_id", DESCENDING)], name="event_id"),
+    IndexModel([("event", ASCENDING), ("rating", DESCENDING), ("_id", DESCENDING)], name="event_rating_id"),
+    IndexModel([("user", ASCENDING), ("_id", DESCENDING)], name="user_id"),
+], queries=[
+    {"filter": {"user": ObjectId("000000000000000000000000")}, "sort": [("_id", DESCENDING)]},
+    {"filter": {"event": "000000000000000000000000"}, "sort": [("_id", DESCENDING)]},
+    {"filter": {"event": "000000000000000000000000"}, "sort": [("rating", DESCENDING), ("_id", DESCENDING)]},
+])
+
+# Each event document carries
+#   rating_summary = {"count": n, "sum": total of the ratings, "stars": {"1": n1, ..., "5": n5}}
+# kept up to date with $inc by addReview and rebuilt by rebuildSummaries.
+STARS = [str(star) for star in range(1, 6)]
+REVIEW_SORTS = {"recent": "_id", "rating": "rating"}
+SUMMARY_BATCH_SIZE = 500
+
+
+def summarize(raw: Optional[Dict]) -> Dict:
+    """Public form of a stored rating_summary: count, average and per-star counts"""
+    raw = raw or {}
+    count = raw.get("count", 0)
+    stars = raw.get("stars") or {}
+    return {
+        "count": count,
+        "average": round(raw.get("sum", 0) / count, 2) if count else None,
+        "stars": {star: stars.get(star, 0) for star in STARS},
+    }
 
 class ReviewRepo():
 
@@ -31,37 +70,42 @@ class ReviewRepo():
             if not review:
                 raise Exception("Review data is required")
                 
-            # Convert Pydantic model to dict
+            # Convert Pydantic model to dict; users are referenced by ObjectId
             review_dict = review.model_dump(exclude={'id'})
+            if review_dict.get("user"):
+                review_dict["user"] = ObjectId(review_dict["user"])
             
-            # Insert the review
-            result = review_collection.insert_one(review_dict)
-            
-            if result.inserted_id:
-                # Fetch and return the newly created review
-                new_review = review_collection.find_one(
-                    {"_id": result.inserted_id}
-                )
-                return new_review
-            else:
-                raise Exception("Failed to insert review")
+            # Insert the review and return it as stored
+            created = await insert_document(review_collection, review_dict)
+            if review_dict.get("event"):
+                await ReviewRepo.countRating(review_dict["event"], review_dict["rating"])
+            return created
                 
         except Exception as e:
             print(f"Error adding review: {str(e)}")
             raise Exception(f"Failed to add review: {str(e)}")
         
     @staticmethod
-    async def getReviewByEvent(event: ObjectId):
+    async def getReviewByEvent(
+        event: ObjectId,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort_by: str = "recent"
+    ) -> Dict:
         """
-        Get all reviews for a specific event
+        Get one page of reviews for a specific event
         
         Args:
             event (ObjectId): The ID of the event to get reviews for
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+            sort_by (str): "recent" (newest first) or "rating" (highest first)
             
         Returns:
-            list: List of review documents if found, empty list if not found
+            Dict: {"data": [...], "next_cursor": ...}
             
         Raises:
+            ValueError: If ``after`` is not a valid cursor
             Exception: If there's an error during the database operation
         """
         try:
@@ -71,12 +115,16 @@ class ReviewRepo():
             if not ObjectId.is_valid(event):
                 raise Exception("Invalid event ID format")
                 
-            cursor = review_collection.find({"event": event})
-            print(cursor)
-            reviews = cursor.to_list(length=None)
-            print(reviews)
-            return reviews
+            return await paginate(
+                review_collection,
+                {"event": str(event)},
+                limit=limit,
+                after=after,
+                sort_field=REVIEW_SORTS[sort_by]
+            )
             
+        except ValueError:
+            raise
         except Exception as e:
             print(f"Error retrieving reviews: {str(e)}")
             raise Exception(f"Failed to retrieve reviews: {str(e)}")    
@@ -103,12 +151,137 @@ class ReviewRepo():
             if not ObjectId.is_valid(user):
                 raise Exception("Invalid user ID format")
                 
-            cursor = review_collection.find({"user": str(user)})
-            reviews = cursor.to_list(length=None)
-            print(f"reviews {reviews}")
+            cursor = review_collection.find({"user": ObjectId(user)}).sort("_id", DESCENDING)
+            reviews = await cursor.to_list(length=None)
             return reviews
             
         except Exception as e:
             print(f"Error retrieving reviews: {str(e)}")
             raise Exception(f"Failed to retrieve reviews: {str(e)}")            
-    
\ No newline at end of file
+    
+
+    @staticmethod
+    async def getReviewsByEmail(email: str) -> Optional[List[Dict]]:
+        """
+        Get a user's reviews, newest first, with the event titles, in one aggregation
+
+        Starts from the users collection so email -> user -> reviews -> events
+        is resolved in a single round trip.
+
+        Args:
+            email (str): The email of the user
+
+        Returns:
+            list: Review documents, each with "event_title"
+            None: If no user has this email
+
+        Raises:
+            Exception: If there's an error during the database operation
+        """
+        try:
+            if users_collection is None:
+                raise Exception("Database connection failed")
+
+            pipeline = [
+                {"$match": {"email": email}},
+                {"$project": {"_id": 1}},
+                {"$lookup": {
+                    "from": "reviews",
+                    "localField": "_id",
+                    "foreignField": "user",
+                    "as": "reviews",
+                    "pipeline": [
+                        {"$sort": {"_id": -1}},
+                        {"$lookup": {
+                            "from": "events",
+                            "let": {"event_id": {"$convert": {
+                                "input": "$event", "to": "objectId", "onError": None, "onNull": None
+                            }}},
+                            "pipeline": [
+                                {"$match": {"$expr": {"$eq": ["$_id", "$$event_id"]}}},
+                                {"$project": {"_id": 0, "title": 1}},
+                            ],
+                            "as": "event_detail",
+                        }},
+                        {"$set": {"event_title": {"$first": "$event_detail.title"}}},
+                        {"$unset": "event_detail"},
+                    ],
+                }},
+            ]
+            users = await users_collection.aggregate(pipeline).to_list(length=1)
+            if not users:
+                return None
+            return users[0]["reviews"]
+
+        except Exception as e:
+            print(f"Error retrieving reviews by email: {str(e)}")
+            raise Exception(f"Failed to retrieve reviews: {str(e)}")
+
+    @staticmethod
+    async def countRating(event: str, rating: int):
+        """
+        Add one rating to an event's rating_summary
+
+        Args:
+            event (str): The ID of the event
+            rating (int): The rating, 1 to 5
+        """
+        await events_collection.update_one(
+            {"_id": ObjectId(event)},
+            {"$inc": {
+                "rating_summary.count": 1,
+                "rating_summary.sum": rating,
+                f"rating_summary.stars.{rating}": 1,
+            }}
+        )
+        await event_cache.invalidate(f"id:{event}")
+
+    @staticmethod
+    async def rebuildSummaries() -> Dict:
+        """
+        Recompute every event's rating_summary from the reviews
+
+        Reconciles the $inc-maintained counters with the review collection,
+        e.g. after reviews were deleted or edited by hand.
+
+        Returns:
+            Dict: {"events": number of events summarized, "reset": events whose reviews are all gone}
+
+        Raises:
+            Exception: If there's an error during the database operation
+        """
+        try:
+            if review_collection is None or events_collection is None:
+                raise Exception("Database connection failed")
+
+            pipeline = [
+                {"$match": {"event": {"$ne": None}, "rating": {"$in": list(range(1, 6))}}},
+                {"$group": {"_id": {"event": "$event", "rating": "$rating"}, "n": {"$sum": 1}}},
+            ]
+            summaries: Dict[str, Dict] = {}
+            async for row in review_collection.aggregate(pipeline):
+                event, rating = str(row["_id"]["event"]), row["_id"]["rating"]
+                if not ObjectId.is_valid(event):
+                    continue
+                summary = summaries.setdefault(event, {"count": 0, "sum": 0, "stars": {star: 0 for star in STARS}})
+                summary["count"] += row["n"]
+                summary["sum"] += rating * row["n"]
+                summary["stars"][str(rating)] += row["n"]
+
+            operations = [
+                UpdateOne({"_id": ObjectId(event)}, {"$set": {"rating_summary": summary}})
+                for event, summary in summaries.items()
+            ]
+            for start in range(0, len(operations), SUMMARY_BATCH_SIZE):
+                await events_collection.bulk_write(operations[start:start + SUMMARY_BATCH_SIZE], ordered=False)
+
+            reset = await events_collection.update_many(
+                {"rating_summary.count": {"$gt": 0}, "_id": {"$nin": [ObjectId(event) for event in summaries]}},
+                {"$set": {"rating_summary": {"count": 0, "sum": 0, "stars": {star: 0 for star in STARS}}}}
+            )
+            await event_cache.invalidate()
+            return {"events": len(summaries), "reset": reset.modified_count}
+
+        except Exception as e:
+            print(f"Error rebuilding rating summaries: {str(e)}")
+            raise Exception(f"Failed to rebuild rating summaries: {str(e)}")
@@ -1,8 +1,12 @@
 from db.connect import MongoDBSingleton
 from bson import ObjectId
 from schemas.ticketSchema import TicketSchemaReq
+from pymongo import IndexModel, ASCENDING, UpdateOne
 from pymongo.errors import PyMongoError
-from typing import List, Optional, Dict
+from db.indexes import register_indexes
+from db.pagination import paginate, DEFAULT_PAGE_SIZE
+from db.writes import insert_document, update_document
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime
 import uuid
 
@@ -10,19 +14,74 @@ db = MongoDBSingleton().get_database()
 if db is not None:
     tickets_collection = db["tickets"]
     events_collection = db["events"]
+    revocations_collection = db["ticket_revocations"]
 else:
     tickets_collection = None
     events_collection = None
+    revocations_collection = None
+
+# Revocations of deleted tickets outlive any token issued for them
+REVOCATION_RETENTION = 400 * 86400
+
+register_indexes("tickets", [
+    IndexModel([("ticket_number", ASCENDING)], name="ticket_number_unique", unique=True),
+    IndexModel([("user", ASCENDING)], name="user"),
+    IndexModel([("event", ASCENDING)], name="event"),
+    IndexModel([("status", ASCENDING)], name="status"),
+], queries=[
+    {"filter": {"ticket_number": "TKT-00000000"}},
+    {"filter": {"user": "000000000000000000000000"}},
+    {"filter": {"event": "000000000000000000000000"}},
+    {"filter": {"status": "cancelled"}, "projection": {"_id": 1}},
+])
+
+# Deleted tickets, so every worker and gate scanner keeps rejecting their tokens
+register_indexes("ticket_revocations", [
+    IndexModel([("revoked_at", ASCENDING)], name="revoked_at_ttl", expireAfterSeconds=REVOCATION_RETENTION),
+])
+
+# Older tickets embed a rendered data URI in qr_code; list reads leave it out
+LIST_PROJECTION = {"qr_code": 0}
+
+def _keep_cancelled(query: Dict, changes: Dict) -> List[Tuple[Dict, Dict]]:
+    """
+    Split a ticket update so cancelled tickets stay cancelled
+
+    Returns the (query, changes) pairs to apply: the full changes for a
+    ticket that is not cancelled and, when the changes move the status, the
+    changes without status and QR token for one that is. The queries are
+    disjoint, so at most one of them matches.
+    """
+    if changes.get("status") in (None, "cancelled"):
+        return [(query, changes)]
+    payment_only = {field: value for field, value in changes.items() if field not in ("status", "qr_payload")}
+    return [
+        ({**query, "status": {"$ne": "cancelled"}}, changes),
+        ({**query, "status": "cancelled"}, payment_only),
+    ]
+
 
 class TicketsRepo:
     @staticmethod
-    async def create_ticket(ticket_data: TicketSchemaReq) -> Optional[Dict]:
-        print(f"Creating ticket with data: {ticket_data}")
+    def new_ticket_number() -> str:
+        """Generate a ticket number"""
+        return f"TKT-{uuid.uuid4().hex[:8].upper()}"
+
+    @staticmethod
+    async def create_ticket(
+        ticket_data: TicketSchemaReq,
+        ticket_id: Optional[ObjectId] = None,
+        ticket_number: Optional[str] = None,
+        qr_payload: Optional[str] = None
+    ) -> Optional[Dict]:
         """
         Create a new ticket in the database
         
         Args:
             ticket_data (TicketSchemaReq): The ticket data to be added
+            ticket_id (Optional[ObjectId]): Pre-assigned _id, so the QR payload can be signed before the insert
+            ticket_number (Optional[str]): Pre-assigned ticket number
+            qr_payload (Optional[str]): The signed QR payload to store
         
         Returns:
             Optional[Dict]: The newly created ticket document with _id
@@ -42,36 +101,25 @@ class TicketsRepo:
             if not ObjectId.is_valid(ticket_data.event):
                 raise Exception("Invalid event ID format")
                 
-            event = events_collection.find_one({"_id": ObjectId(ticket_data.event)})
+            event = await events_collection.find_one({"_id": ObjectId(ticket_data.event)})
             print(f"Event found: {event}")
             if not event:
                 raise Exception(f"Event with id {ticket_data.event} not found")
             
-            # Generate ticket number
-            ticket_number = f"TKT-{uuid.uuid4().hex[:8].upper()}"
-            print(f"Generated ticket number: {ticket_number}")
             # Create complete ticket document
             complete_ticket = {
                 **ticket_dict,
                 "status": "pending",
                 "purchase_date": datetime.now(),
-                "ticket_number": ticket_number,
+                "ticket_number": ticket_number or TicketsRepo.new_ticket_number(),
                 "payment_status": "pending",
-                "qr_code": None  # Will be generated later
+                "qr_payload": qr_payload
             }
+            if ticket_id is not None:
+                complete_ticket["_id"] = ticket_id
             
-            # Insert the ticket
-            result = tickets_collection.insert_one(complete_ticket)
-            print(f"Insert result: {result}")
-            if result.inserted_id:
-                # Fetch and return the newly created ticket
-                new_ticket = tickets_collection.find_one(
-                    {"_id": result.inserted_id}
-                )
-                print(f"New ticket: {new_ticket}")
-                return new_ticket
-            else:
-                raise Exception("Failed to create ticket")
+            # Insert the ticket and return it as stored
+            return await insert_document(tickets_collection, complete_ticket)
                 
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -103,9 +151,9 @@ class TicketsRepo:
             if not ObjectId.is_valid(user_id):
                 raise Exception("Invalid user ID format")
                 
-            cursor = tickets_collection.find({"user": user_id})
+            cursor = tickets_collection.find({"user": user_id}, LIST_PROJECTION)
             tickets = []
-            for ticket in cursor:
+            async for ticket in cursor:
                 tickets.append(ticket)
             # print(f"Tickets found: {tickets}")
             return tickets
@@ -139,9 +187,9 @@ class TicketsRepo:
             if not ObjectId.is_valid(event_id):
                 raise Exception("Invalid event ID format")
                 
-            cursor = tickets_collection.find({"event": event_id})
+            cursor = tickets_collection.find({"event": event_id}, LIST_PROJECTION)
             tickets = []
-            for ticket in cursor:
+            async for ticket in cursor:
                 tickets.append(ticket)
             print(f"Tickets found: {tickets}")
             return tickets
@@ -175,7 +223,7 @@ class TicketsRepo:
             if not ObjectId.is_valid(ticket_id):
                 raise Exception("Invalid ticket ID format")
                 
-            ticket = tickets_collection.find_one({"_id": ObjectId(ticket_id)})
+            ticket = await tickets_collection.find_one({"_id": ObjectId(ticket_id)})
             return ticket
             
         except PyMongoError as e:
@@ -204,7 +252,7 @@ class TicketsRepo:
             if tickets_collection is None:
                 raise Exception("Database connection not established")
                 
-            ticket = tickets_collection.find_one({"ticket_number": ticket_number})
+            ticket = await tickets_collection.find_one({"ticket_number": ticket_number})
             return ticket
             
         except PyMongoError as e:
@@ -219,12 +267,15 @@ class TicketsRepo:
         """
         Update the status of a ticket
         
+        Cancelling is final: the ticket's token is revoked on every worker,
+        so a cancelled ticket is never moved to another status.
+        
         Args:
             ticket_id (str): The ID of the ticket
             status (str): The new status
             
         Returns:
-            Optional[Dict]: The updated ticket document if found, None otherwise
+            Optional[Dict]: The updated ticket document, None if it is not found or cancelled
             
         Raises:
             PyMongoError: If there's an error during database operation
@@ -237,15 +288,14 @@ class TicketsRepo:
             if not ObjectId.is_valid(ticket_id):
                 raise Exception("Invalid ticket ID format")
                 
-            result = tickets_collection.update_one(
-                {"_id": ObjectId(ticket_id)},
+            query = {"_id": ObjectId(ticket_id)}
+            if status != "cancelled":
+                query["status"] = {"$ne": "cancelled"}
+            updated_ticket = await update_document(
+                tickets_collection,
+                query,
                 {"$set": {"status": status, "updated_at": datetime.now()}}
             )
-            
-            if result.modified_count == 0:
-                return None
-                
-            updated_ticket = tickets_collection.find_one({"_id": ObjectId(ticket_id)})
             return updated_ticket
             
         except PyMongoError as e:
@@ -256,13 +306,21 @@ class TicketsRepo:
             raise Exception(f"Error updating ticket: {str(e)}")
     
     @staticmethod
-    async def update_payment_status(ticket_id: str, payment_status: str) -> Optional[Dict]:
+    async def update_payment_status(
+        ticket_id: str,
+        payment_status: str,
+        status: Optional[str] = None,
+        qr_payload: Optional[str] = None
+    ) -> Optional[Dict]:
         """
         Update the payment status of a ticket
         
         Args:
             ticket_id (str): The ID of the ticket
             payment_status (str): The new payment status
+            status (Optional[str]): New ticket status to set in the same update; a
+                cancelled ticket keeps its status and QR token and only records the payment
+            qr_payload (Optional[str]): Re-issued QR token to store in the same update
             
         Returns:
             Optional[Dict]: The updated ticket document if found, None otherwise
@@ -278,16 +336,16 @@ class TicketsRepo:
             if not ObjectId.is_valid(ticket_id):
                 raise Exception("Invalid ticket ID format")
                 
-            result = tickets_collection.update_one(
-                {"_id": ObjectId(ticket_id)},
-                {"$set": {"payment_status": payment_status, "updated_at": datetime.now()}}
-            )
-            
-            if result.modified_count == 0:
-                return None
-                
-            updated_ticket = tickets_collection.find_one({"_id": ObjectId(ticket_id)})
-            return updated_ticket
+            changes = {"payment_status": payment_status, "updated_at": datetime.now()}
+            if status is not None:
+                changes["status"] = status
+            if qr_payload is not None:
+                changes["qr_payload"] = qr_payload
+            for query, update in _keep_cancelled({"_id": ObjectId(ticket_id)}, changes):
+                updated_ticket = await update_document(tickets_collection, query, {"$set": update})
+                if updated_ticket is not None:
+                    return updated_ticket
+            return None
             
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -297,20 +355,18 @@ class TicketsRepo:
             raise Exception(f"Error updating payment status: {str(e)}")
     
     @staticmethod
-    async def generate_qr_code(ticket_id: str, qr_code: str) -> Optional[Dict]:
+    async def get_qr_payload(ticket_id: str) -> Optional[Dict]:
         """
-        Generate and store QR code for a ticket
+        Get the fields needed to render a ticket's QR code
         
         Args:
             ticket_id (str): The ID of the ticket
-            qr_code (str): The QR code data
             
         Returns:
-            Optional[Dict]: The updated ticket document if found, None otherwise
+            Optional[Dict]: The fields the QR token is built from, None if not found
             
         Raises:
-            PyMongoError: If there's an error during database operation
-            Exception: For any other unexpected errors
+            Exception: If the ID is invalid or the lookup fails
         """
         try:
             if tickets_collection is None:
@@ -319,28 +375,106 @@ class TicketsRepo:
             if not ObjectId.is_valid(ticket_id):
                 raise Exception("Invalid ticket ID format")
                 
-            result = tickets_collection.update_one(
+            return await tickets_collection.find_one(
                 {"_id": ObjectId(ticket_id)},
-                {"$set": {"qr_code": qr_code, "updated_at": datetime.now()}}
+                {"event": 1, "persons": 1, "payment_status": 1, "qr_payload": 1}
             )
             
-            if result.modified_count == 0:
-                return None
-                
-            updated_ticket = tickets_collection.find_one({"_id": ObjectId(ticket_id)})
-            return updated_ticket
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise Exception(f"Database error occurred: {str(e)}")
+        except Exception as e:
+            print(f"Error retrieving QR payload: {str(e)}")
+            raise Exception(f"Error retrieving QR payload: {str(e)}")
+    
+    @staticmethod
+    async def get_qr_payloads(ticket_ids: List[ObjectId]) -> List[Dict]:
+        """
+        Get the QR token fields of several tickets in one query
+        
+        Args:
+            ticket_ids (List[ObjectId]): The ticket IDs
+            
+        Returns:
+            List[Dict]: The fields the QR tokens are built from, for the tickets that exist
+        """
+        try:
+            if tickets_collection is None:
+                raise Exception("Database connection not established")
+            cursor = tickets_collection.find(
+                {"_id": {"$in": ticket_ids}},
+                {"event": 1, "persons": 1, "payment_status": 1, "qr_payload": 1}
+            )
+            return await cursor.to_list(length=None)
+        except PyMongoError as e:
+            print(f"Database error occurred: {str(e)}")
+            raise
+    
+    @staticmethod
+    async def update_payment_statuses(updates: List[Dict]) -> int:
+        """
+        Batched form of update_payment_status
+        
+        Args:
+            updates (List[Dict]): {"ticket_id", "from", "changes"}; each update only
+                applies while the ticket's payment_status is one of "from", and a
+                cancelled ticket only takes the payment_status
+            
+        Returns:
+            int: Number of tickets modified
+            
+        Raises:
+            PyMongoError: If the bulk write fails
+        """
+        if tickets_collection is None:
+            raise Exception("Database connection not established")
+        operations = [
+            UpdateOne(query, {"$set": {**changes, "updated_at": datetime.now()}})
+            for update in updates
+            for query, changes in _keep_cancelled(
+                {"_id": update["ticket_id"], "payment_status": {"$in": update["from"]}},
+                update["changes"]
+            )
+        ]
+        if not operations:
+            return 0
+        result = await tickets_collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+    
+    @staticmethod
+    async def get_cancelled_ticket_ids() -> List[ObjectId]:
+        """
+        Get the IDs of all cancelled tickets
+        
+        Refunded tickets are cancelled by the payment webhook, and deleted
+        tickets are kept in ticket_revocations, so both are included.
+        
+        Returns:
+            List[ObjectId]: The cancelled ticket IDs
+            
+        Raises:
+            Exception: If the lookup fails
+        """
+        try:
+            if tickets_collection is None:
+                raise Exception("Database connection not established")
+            
+            cursor = tickets_collection.find({"status": "cancelled"}, {"_id": 1})
+            cancelled = [ticket["_id"] async for ticket in cursor]
+            deleted = revocations_collection.find({}, {"_id": 1})
+            return cancelled + [revocation["_id"] async for revocation in deleted]
             
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
             raise Exception(f"Database error occurred: {str(e)}")
         except Exception as e:
-            print(f"Error generating QR code: {str(e)}")
-            raise Exception(f"Error generating QR code: {str(e)}")
+            print(f"Error retrieving cancelled tickets: {str(e)}")
+            raise Exception(f"Error retrieving cancelled tickets: {str(e)}")
     
     @staticmethod
     async def delete_ticket(ticket_id: str) -> bool:
         """
-        Delete a ticket from the database
+        Delete a ticket from the database and record its revocation
         
         Args:
             ticket_id (str): The ID of the ticket to delete
@@ -359,8 +493,19 @@ class TicketsRepo:
             if not ObjectId.is_valid(ticket_id):
                 raise Exception("Invalid ticket ID format")
                 
+            # Record the revocation first: a failure after it leaves a revoked
+            # ticket, never a deleted one whose token still passes
+            revocation = await revocations_collection.update_one(
+                {"_id": ObjectId(ticket_id)},
+                {"$setOnInsert": {"revoked_at": datetime.now()}},
+                upsert=True
+            )
             result = await tickets_collection.delete_one({"_id": ObjectId(ticket_id)})
-            return result.deleted_count > 0
+            if result.deleted_count == 0:
+                if revocation.upserted_id is not None:
+                    await revocations_collection.delete_one({"_id": ObjectId(ticket_id)})
+                return False
+            return True
             
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
@@ -369,12 +514,22 @@ class TicketsRepo:
             print(f"Error deleting ticket: {str(e)}")
             raise Exception(f"Error deleting ticket: {str(e)}")
         
-    async def get_all_tickets() -> List[Dict]:
+    @staticmethod
+    async def get_all_tickets(
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
         """
-        Retrieve all tickets from the database
+        Retrieve one page of tickets, newest first
         
+        Args:
+            limit (int): Maximum number of tickets to return
+            after (Optional[str]): The next_cursor of the previous page
+            include_total (bool): Whether to include the total ticket count
+            
         Returns:
-            List[Dict]: A list of ticket documents
+            Dict: {"data": [...], "next_cursor": ...} plus "total" if requested
             
         Raises:
             PyMongoError: If there's an error during database operation
@@ -384,11 +539,7 @@ class TicketsRepo:
             if tickets_collection is None:
                 raise Exception("Database connection not established")
                 
-            tickets_cursor = await tickets_collection.find().to_list(length=None)
-            tickets = []
-            for ticket in tickets_cursor:
-                tickets.append(ticket)
-            return tickets
+            return await paginate(tickets_collection, limit=limit, after=after, projection=LIST_PROJECTION, include_total=include_total)
             
         except PyMongoError as e:
             print(f"Database error occurred: {str(e)}")
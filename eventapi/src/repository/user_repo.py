@@ -1,6 +1,11 @@
 from db.connect import MongoDBSingleton
+from db.indexes import register_indexes
+from db.pagination import paginate, DEFAULT_PAGE_SIZE
+from db.writes import update_document
+from pymongo import IndexModel, ASCENDING
 from models import users
 from schemas.authentication import RegistrationReq
+from typing import Dict, Optional
 
 db = MongoDBSingleton().get_database()
 
@@ -8,15 +13,22 @@ if db is not None:
     user_collection = db["users"]
 else:
     user_collection = None
+
+register_indexes("users", [
+    IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+], queries=[
+    {"filter": {"email": "user@example.com"}},
+])
+
 class UserRepo():
 
     @staticmethod
-    def findUserByEmail(email : str):
-        returnedUser = user_collection.find_one({"email" : email})
+    async def findUserByEmail(email : str):
+        returnedUser = await user_collection.find_one({"email" : email})
         return returnedUser
 
     @staticmethod
-    def insertUser(userData : RegistrationReq)->dict:
+    async def insertUser(userData : RegistrationReq)->dict:
         """To insert the user in the db"""
         print("repository " , userData)
         if user_collection is None:
@@ -31,19 +43,39 @@ class UserRepo():
             "role": userData.role if userData.role is not None else "user",
             "isVerified": userData.isVerified if userData.isVerified is not None else False,
         }
-        returned_user = user_collection.insert_one(new_user)
+        returned_user = await user_collection.insert_one(new_user)
         print("repo response" , returned_user)
         return new_user
     
     @staticmethod
-    async def getAllUsers():
+    async def getAllUsers(
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
         """
-        Get all users from the database
+        Get one page of users from the database, newest first
         """
         if user_collection is None:
             raise Exception("Database connection failed")
-        users_collection = user_collection.find()
-        users = []
-        for user in users_collection:
-            users.append(user)
-        return users
\ No newline at end of file
+        return await paginate(user_collection, limit=limit, after=after, include_total=include_total)
+
+    @staticmethod
+    async def updateUserRole(email: str, role: str) -> Optional[dict]:
+        """Set a user's role, returning the updated user or None if not found"""
+        if user_collection is None:
+            raise Exception("Database connection failed")
+        return await update_document(
+            user_collection,
+            {"email": email},
+            {"$set": {"role": role}},
+            projection={"password": 0, "otp": 0}
+        )
+
+    @staticmethod
+    async def deleteUser(email: str) -> bool:
+        """Delete a user, returning whether one was removed"""
+        if user_collection is None:
+            raise Exception("Database connection failed")
+        result = await user_collection.delete_one({"email": email})
+        return result.deleted_count > 0
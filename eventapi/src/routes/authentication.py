@@ -1,7 +1,7 @@
 from fastapi import APIRouter , HTTPException
 from schemas.authentication import RegistrationReq , RegistrationRes , LoginReq , LoginRes 
 from services.userService import UserService
-from utils.jwt_config import create_access_token
+from utils.jwt_config import create_access_token, user_claims
 
 
 authRouter = APIRouter(
@@ -11,14 +11,14 @@ authRouter = APIRouter(
 
 
 @authRouter.post("/register" , response_model=RegistrationRes)
-def user_register(user : RegistrationReq):
+async def user_register(user : RegistrationReq):
     print("router : " , user)
-    response = UserService.RegisterUser(user)
+    response = await UserService.RegisterUser(user)
     print("auth route register " , response)
     if "error" in response:
         raise HTTPException(status_code = 400 , detail = response["error"])
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data=user_claims(response))
     return{
         "name" : response["name"],
         "email" : response["email"],
@@ -28,15 +28,15 @@ def user_register(user : RegistrationReq):
     }
 
 @authRouter.post("/login" , response_model = LoginRes)
-def login_user(user : LoginReq):
+async def login_user(user : LoginReq):
     print("router login" , user)
 
-    response = UserService.LoginUser(user)
+    response = await UserService.LoginUser(user)
     print(f"response : {response}")
     if "error" in response:
         raise HTTPException(status_code = 400 , detail = response["error"])
     
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data=user_claims(response))
 
     return{
         "id" : str(response["_id"]),
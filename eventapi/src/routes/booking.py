@@ -1,10 +1,10 @@
 # fastapi/src/routes/booking.py
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Query
 from services.bookingService import BookingService
 from schemas.bookingSchema import BookingSchemaReq
-from bson import ObjectId
 from typing import List, Optional, Dict
-from fastapi.responses import JSONResponse
+from utils.responses import BSONResponse
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 bookingRouter = APIRouter(
     prefix="/bookings",
@@ -16,19 +16,19 @@ async def create_booking(booking_data: BookingSchemaReq):
     print(f"create_booking called with data: {booking_data}")
     try:
         result = await BookingService.create_booking(booking_data)
-        return {"message": "Booking created successfully", "data": result}
+        return BSONResponse(content={"message": "Booking created successfully", "data": result})
     except HTTPException as e:
         raise e
 
 @bookingRouter.get("/")
-async def get_bookings():
+async def get_bookings(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    include_total: bool = False
+):
     try:
-        bookings = await BookingService.getAllBookings()
-        for booking in bookings:
-            booking["_id"] = str(booking["_id"])
-            booking["user_id"] = str(booking["user_id"])
-            booking["event_id"] = str(booking["event_id"])
-        return bookings
+        page = await BookingService.getAllBookings(limit, after, include_total)
+        return BSONResponse(content=page)
     except HTTPException as e:
         raise e
 
@@ -37,23 +37,17 @@ async def get_booking(booking_id: str):
     try:
         booking = await BookingService.get_booking_by_id(booking_id)
         if booking:
-            booking["_id"] = str(booking["_id"])
-            booking["user_id"] = str(booking["user_id"])
-            booking["event_id"] = str(booking["event_id"])
-            booking["booking_date"] = booking["booking_date"].isoformat() if booking.get("booking_date") else None
-            booking["created_at"] = booking["created_at"].isoformat() if booking.get("created_at") else None
-            print(f"Booking found: {booking}")
             response = {
                 "status": "success",
                 "data": booking,
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "failed",
             "message": "Event not found",
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
     except HTTPException as e:
         raise e
 
@@ -61,7 +55,7 @@ async def get_booking(booking_id: str):
 async def update_booking(booking_id: str, status: str):
     try:
         result = await BookingService.update_booking_status(booking_id, status)
-        return {"message": "Booking updated successfully", "data": result}
+        return BSONResponse(content={"message": "Booking updated successfully", "data": result})
     except HTTPException as e:
         raise e
 
@@ -78,17 +72,7 @@ async def get_user_bookings(user_id: str):
     print(f"get_user_bookings called with user_id: {user_id}")
     try:
         result = await BookingService.get_user_bookings(user_id)
-        print(f"jhsfhds : {result}")
-        def serialize_booking(booking):
-            booking["_id"] = str(booking["_id"])
-            booking["user_id"] = str(booking["user_id"])
-            booking["event_id"] = str(booking["event_id"])
-            booking["booking_date"] = booking["booking_date"].isoformat() if booking.get("booking_date") else None
-            booking["created_at"] = booking["created_at"].isoformat() if booking.get("created_at") else None
-            booking["updated_at"] = booking["updated_at"].isoformat() if booking.get("updated_at") else None
-            return booking
-        result = [serialize_booking(booking) for booking in result]
-        return {"message": "User bookings retrieved successfully", "data": result}
+        return BSONResponse(content={"message": "User bookings retrieved successfully", "data": result})
     except HTTPException as e:
         raise e
 
@@ -96,6 +80,6 @@ async def get_user_bookings(user_id: str):
 async def get_event_bookings(event_id: str):
     try:
         result = await BookingService.get_event_bookings(event_id)
-        return {"message": "Event bookings retrieved successfully", "data": result}
+        return BSONResponse(content={"message": "Event bookings retrieved successfully", "data": result})
     except HTTPException as e:
         raise e
\ No newline at end of file
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, status
+from schemas.checkoutSchema import CheckoutSchemaReq
+from schemas.paymentSchema import VerifyPaymentSchema
+from services.checkoutService import CheckoutService
+from repository.bookings_repo import SoldOutError
+from utils.payment_gateway import GatewayError
+from utils.responses import BSONResponse
+
+checkoutRouter = APIRouter(
+    prefix="/checkout",
+    tags=["checkout"]
+)
+
+@checkoutRouter.post("/", status_code=status.HTTP_201_CREATED)
+async def checkout(payload: CheckoutSchemaReq):
+    """
+    Book seats, open the gateway order and issue a pending ticket in one call
+    
+    Pay against data.order, then call /checkout/{booking_id}/confirm.
+    """
+    try:
+        result = await CheckoutService.checkout(payload)
+        response = {
+            "status": "success",
+            "data": result,
+            "message": "Checkout created, awaiting payment"
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_201_CREATED)
+    except ValueError as e:
+        response = {"status": "failed", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except SoldOutError as e:
+        response = {"status": "failed", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_409_CONFLICT)
+    except GatewayError as e:
+        response = {"status": "failed", "message": f"Payment gateway error: {str(e)}"}
+        return BSONResponse(content=response, status_code=status.HTTP_502_BAD_GATEWAY)
+    except Exception as e:
+        response = {"status": "error", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@checkoutRouter.post("/{booking_id}/confirm")
+async def confirm_checkout(booking_id: str, payload: VerifyPaymentSchema):
+    """
+    Finalize a checkout after payment: confirms the payment, ticket and booking
+    """
+    try:
+        result = await CheckoutService.confirm(
+            booking_id,
+            payload.razorpay_payment_id,
+            payload.razorpay_order_id,
+            payload.razorpay_signature
+        )
+        if result is None:
+            response = {"status": "failed", "message": "No checkout with this order for the booking"}
+            return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        response = {
+            "status": "success",
+            "data": result,
+            "message": "Checkout confirmed"
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+    except ValueError as e:
+        response = {"status": "failed", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        response = {"status": "error", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,26 +1,16 @@
-from fastapi import APIRouter , status , Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter , status , Depends, Request
+from utils.responses import BSONResponse
 from schemas.companiesSchema import CompaniesAdmin
 from services.companiesService import CompaniesService
-from bson import ObjectId
 from typing import List
 from dependency.auth import admin_only
+from utils.snapshot import catalog_snapshots, snapshot_response
 
 companyRouter = APIRouter(
     prefix="/companies",
     tags=["companies"],
 )
 
-def convert_objectid_to_str(data):
-    """Recursively convert ObjectId fields in a dictionary to strings."""
-    if isinstance(data, dict):
-        return {k: convert_objectid_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    elif isinstance(data, ObjectId):
-        return str(data)  # Convert ObjectId to string
-    return data  # Return as is if it's not an ObjectId
-
 @companyRouter.post("/" , response_model=CompaniesAdmin)
 async def create_company(company: CompaniesAdmin):
     """
@@ -30,61 +20,65 @@ async def create_company(company: CompaniesAdmin):
         company (CompaniesAdmin): The company data to be created
         
     Returns:
-        JSONResponse: Created company data or error message
+        BSONResponse: Created company data or error message
     """
     try:
         new_company =await CompaniesService.AddCompany(company)
         if new_company:
-            new_company = convert_objectid_to_str(new_company)
             response = {
                 "status": "success",
                 "data": new_company,
                 "message": "Company created successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_201_CREATED)
+            return BSONResponse(content=response, status_code=status.HTTP_201_CREATED)
         
         response = {
             "status": "failed",
             "message": "Failed to create company"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @companyRouter.get("/", response_model=List[CompaniesAdmin])
-async def get_all_company():
+async def get_all_company(request: Request):
     """
     Get all companies - Admin only endpoint
     
+    Served from a pre-encoded snapshot with an ETag; If-None-Match gets a 304.
+    
     Returns:
-        JSONResponse: List of companies or error message
+        Response: List of companies or error message
     """
-    try:
+    async def build():
         companies = await CompaniesService.getCompanies()
         if companies:
-            companies = convert_objectid_to_str(companies)  # Convert ObjectId to string
             response = {
                 "status": "success",
                 "data": companies,
                 "message": "Companies retrieved successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return response, status.HTTP_200_OK
         
         response = {
             "status": "success",
             "data": [],
             "message": "No companies found"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+        return response, status.HTTP_200_OK
+
+    try:
+        snapshot = await catalog_snapshots.get_or_build("companies", "", build)
+        return snapshot_response(request, snapshot)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
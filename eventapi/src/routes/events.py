@@ -1,49 +1,44 @@
-from fastapi import APIRouter, status , Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, status , Depends , Query
+from utils.responses import BSONResponse
 from schemas.eventSchema import EventSchemaAdminReq
 from services.eventService import EventService
-from bson import ObjectId
-from typing import List 
+from typing import List, Optional
 from dependency.auth import admin_only
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 eventRouter = APIRouter(
     prefix="/events",
     tags=["events"],
 )
 
-def convert_objectid_to_str(data):
-    """Recursively convert ObjectId fields in a dictionary to strings."""
-    if isinstance(data, dict):
-        return {k: convert_objectid_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    elif isinstance(data, ObjectId):
-        return str(data)  # Convert ObjectId to string
-    return data  # Return as is if it's not an ObjectId
-
 @eventRouter.get("/")
-async def get_events():
+async def get_events(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    include_total: bool = False
+):
     try:
-        events = await EventService.getEvents()
-        if events:
-            events = convert_objectid_to_str(events)  # Convert ObjectId fields to strings
+        page = await EventService.getEvents(limit, after, include_total)
+        if page["data"] or after:
             response = {
                 "status": "success",
-                "data": events,
+                "data": page["data"],
+                "next_cursor": page["next_cursor"],
             }
-            print(f"events : {events}")
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            if include_total:
+                response["total"] = page["total"]
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         response = {
             "status": "failed",
             "message": "No events found",
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @eventRouter.post("/" , response_model=EventSchemaAdminReq)
 async def create_event(event: EventSchemaAdminReq):
@@ -55,75 +50,245 @@ async def create_event(event: EventSchemaAdminReq):
                 "data": event,
                 "message": "Event created successfully",
             }
-            return await JSONResponse(content=response, status_code=status.HTTPStatus.CREATED)
+            return BSONResponse(content=response, status_code=status.HTTP_201_CREATED)
         response = {
             "status": "failed", 
             "message": "Event creation failed",
         }
-        return await JSONResponse(content=response, status_code=status.HTTPStatus.BAD_REQUEST)
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-@eventRouter.get("/filter", response_model=List[EventSchemaAdminReq])
-async def get_events_by_location(state: str | None = None, city: str | None = None):
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+@eventRouter.get("/filter")
+async def filter_events(
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
     """
-    Get events filtered by state and/or city using query parameters
-    
+    Browse events by location, category, price, date and tags
+
+    One page of matching events plus the counts per state, city, category,
+    tag and price bucket for the same filters, fetched in a single query.
+
+    Example:
+        /events/filter?state=Maharashtra&city=Mumbai
+        /events/filter?category=music&min_price=500&max_price=2000&tags=jazz&tags=live
+        /events/filter?date_from=2025-03-01&date_to=2025-03-31
+    """
+    try:
+        page = await EventService.filterEvents(
+            state, city, category, min_price, max_price, date_from, date_to, tags, limit, after
+        )
+        response = {
+            "status": "success",
+            "data": page["data"],
+            "next_cursor": page["next_cursor"],
+            "total": page["total"],
+            "facets": page["facets"],
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+    except ValueError as e:
+        response = {
+            "status": "failed",
+            "message": str(e),
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        response = {
+            "status": "error",
+            "message": f"Error retrieving events: {str(e)}",
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@eventRouter.get("/cache/stats")
+async def get_event_cache_stats(user = Depends(admin_only)):
+    """
+    Get hit/miss/eviction counters of the event catalog cache (admin only)
+    """
+    response = {
+        "status": "success",
+        "data": EventService.getCacheStats(),
+    }
+    return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+
+@eventRouter.get("/search")
+async def search_events(
+    q: Optional[str] = Query(None, max_length=200),
+    category: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """
+    Search events by title, tags and description, best matches first
+
     Args:
-        state (str, optional): Query parameter for state name
-        city (str, optional): Query parameter for city name
-        
-    Returns:
-        JSONResponse: The filtered events data or error message
-    
+        q (Optional[str]): Search terms
+        category (Optional[str]): Only return events in this category
+        limit (int): Page size
+        after (Optional[str]): The next_cursor of the previous page
+    """
+    try:
+        page = await EventService.searchEvents(q, category, limit, after)
+        response = {
+            "status": "success",
+            "data": page["data"],
+            "next_cursor": page["next_cursor"],
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+    except ValueError as e:
+        response = {
+            "status": "failed",
+            "message": str(e),
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        response = {
+            "status": "error",
+            "message": str(e),
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@eventRouter.get("/upcoming")
+async def get_upcoming_events(
+    starts_from: Optional[str] = Query(None, alias="from"),
+    starts_to: Optional[str] = Query(None, alias="to"),
+    state: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """
+    Get events by start time, soonest first
+
+    Args:
+        from (Optional[str]): ISO date or datetime, defaults to now
+        to (Optional[str]): ISO date or datetime, exclusive
+        state (Optional[str]): Only events in this state
+
     Example:
-        /events/filter?state=California
-        /events/filter?state=California&city=San Francisco
+        /events/upcoming?state=Maharashtra
+        /events/upcoming?from=2025-03-14&to=2025-03-17
     """
     try:
-        # Validate input parameters
-        if not state:
-            response = {
-                "status": "failed",
-                "message": "State parameter is required",
-            }
-            return JSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
-            
-        # Clean input parameters
-        state = state.strip()
-        city = city.strip() if city else None
-        
-        if city:
-            events = EventService.getEventByCityName(state, city)
-            location_msg = f"city: {city}, state: {state}"
-        else:
-            events = EventService.getEventByStateName(state)
-            location_msg = f"state: {state}"
+        page = await EventService.getUpcomingEvents(starts_from, starts_to, state, limit, after)
+        response = {
+            "status": "success",
+            "data": page["data"],
+            "next_cursor": page["next_cursor"],
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+    except ValueError as e:
+        response = {
+            "status": "failed",
+            "message": str(e),
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        response = {
+            "status": "error",
+            "message": str(e),
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        if events:
-            events = convert_objectid_to_str(events)  # Convert ObjectId to string
+@eventRouter.get("/near")
+async def get_events_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(10, gt=0, le=200, description="Radius in km"),
+    category: Optional[str] = None,
+    starts_from: Optional[str] = Query(None, alias="from"),
+    starts_to: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """
+    Get events around a location, nearest first, with their distance in metres
+
+    Example:
+        /events/near?lat=19.076&lng=72.8777&radius=5
+        /events/near?lat=19.076&lng=72.8777&category=music&from=2025-03-14
+    """
+    try:
+        page = await EventService.getEventsNear(lat, lng, radius, category, starts_from, starts_to, limit, after)
+        response = {
+            "status": "success",
+            "data": page["data"],
+            "next_cursor": page["next_cursor"],
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+    except ValueError as e:
+        response = {
+            "status": "failed",
+            "message": str(e),
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        response = {
+            "status": "error",
+            "message": str(e),
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@eventRouter.get("/suggest")
+async def suggest_events(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=25)
+):
+    """
+    Autocomplete for the search box: events whose title, venue, city or tags
+    start with what has been typed, most booked first
+    """
+    response = {
+        "status": "success",
+        "data": EventService.suggestEvents(q, limit),
+    }
+    return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+
+@eventRouter.get("/{event_id}/full")
+async def get_event_page(event_id: str):
+    """
+    Get the event with its rating summary, applicable offers and live slot
+    availability in one response
+
+    Sections that are slow or failing come back as null and are listed in
+    "unavailable". Per-section timings are reported in the Server-Timing header.
+    """
+    try:
+        page, timings = await EventService.getEventPage(event_id)
+        headers = {"Server-Timing": ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())}
+        if page is None:
             response = {
-                "status": "success",
-                "data": events,
-                "message": f"Found events in {location_msg}"
+                "status": "failed",
+                "message": "Event not found",
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
-        
+            return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND, headers=headers)
+        response = {
+            "status": "success",
+            "data": page,
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK, headers=headers)
+    except ValueError as e:
         response = {
             "status": "failed",
-            "message": f"No events found in {location_msg}",
+            "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
-        
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         response = {
             "status": "error",
-            "message": f"Error retrieving events: {str(e)}",
+            "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @eventRouter.get("/{event_id}", response_model=EventSchemaAdminReq)
 async def get_event(event_id: str):
@@ -134,31 +299,30 @@ async def get_event(event_id: str):
         event_id (str): The ID of the event to retrieve
         
     Returns:
-        JSONResponse: The event data or error message
+        BSONResponse: The event data or error message
     """
     try:
         event = await EventService.getEventById(event_id)
         if event:
-            event = convert_objectid_to_str(event)  # Convert ObjectId to string
             response = {
                 "status": "success",
                 "data": event,
             }
             print(f"event : {event}")
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "failed",
             "message": "Event not found",
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # @eventRouter.put("/{event_id}")
 # async def update_event(event_id: int):
@@ -177,30 +341,29 @@ async def get_event_by_name(event_name: str):
         event_name (str): The name of the event to retrieve
         
     Returns:
-        JSONResponse: The event data or error message
+        BSONResponse: The event data or error message
     """
     try:
-        event = EventService.getEventByName(event_name)
+        event = await EventService.getEventByName(event_name)
         if event:
-            event = convert_objectid_to_str(event)  # Convert ObjectId to string
             response = {
                 "status": "success",
                 "data": event,
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "failed",
             "message": "Event not found",
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @eventRouter.put("/{event_id}", response_model=EventSchemaAdminReq)
 async def update_event(event_id: str, event: EventSchemaAdminReq):
@@ -212,33 +375,32 @@ async def update_event(event_id: str, event: EventSchemaAdminReq):
         event (EventSchemaAdminReq): The updated event data
         
     Returns:
-        JSONResponse: The updated event data or error message
+        BSONResponse: The updated event data or error message
     """
     print("route event update")
     try:
         print("Inside tryyy", event)
         updated_event = await EventService.updateEvent(event_id, event)
         if updated_event:
-            updated_event = convert_objectid_to_str(updated_event)  # Convert ObjectId to string
             response = {
                 "status": "success",
                 "data": updated_event,
                 "message": "Event updated successfully",
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "failed",
             "message": "Event not found or update failed",
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 @eventRouter.get("/category/{categoryName}")
 async def get_event_by_category(categoryName: str):
@@ -247,25 +409,24 @@ async def get_event_by_category(categoryName: str):
     Args:
         categoryName (str): The category name to filter events by
     Returns:
-        JSONResponse: The filtered events data or error message
+        BSONResponse: The filtered events data or error message
     """
     try:
         events =  await EventService.getEventsBycategory(categoryName)
         if events:
-            events = convert_objectid_to_str(events)
             response = {
                 "status": "success",
                 "data": events,
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         response = {
             "status": "failed",
             "message": "No events found for the given category",
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e),
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
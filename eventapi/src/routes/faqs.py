@@ -1,26 +1,17 @@
-from fastapi import APIRouter, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, status, Depends, Query, Request
+from utils.responses import BSONResponse
 from schemas.faqsSchema import FAQsSchemaReq
 from services.faqService import FAQService
-from bson import ObjectId
-from typing import List
+from typing import List, Optional
 from dependency.auth import admin_only
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.snapshot import catalog_snapshots, snapshot_response
 
 faqRouter = APIRouter(
     prefix="/faqs",
     tags=["faqs"]
 )
 
-def convert_objectid_to_str(data):
-    """Recursively convert ObjectId fields in a dictionary to strings."""
-    if isinstance(data, dict):
-        return {k: convert_objectid_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    elif isinstance(data, ObjectId):
-        return str(data)
-    return data
-
 @faqRouter.post("/",response_model=FAQsSchemaReq)
 async def create_faq(faq: FAQsSchemaReq):
     """
@@ -30,64 +21,68 @@ async def create_faq(faq: FAQsSchemaReq):
         faq (FAQsSchemaReq): The FAQ data to be created
         
     Returns:
-        JSONResponse: Created FAQ data or error message
+        BSONResponse: Created FAQ data or error message
     """
     try:
         new_faq = await FAQService.createFAQ(faq)
         if new_faq:
-            new_faq = convert_objectid_to_str(new_faq)
             response = {
                 "status": "success",
                 "data": new_faq,
                 "message": "FAQ created successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_201_CREATED)
+            return BSONResponse(content=response, status_code=status.HTTP_201_CREATED)
         
         response = {
             "status": "failed",
             "message": "Failed to create FAQ"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @faqRouter.get("/", response_model=List[FAQsSchemaReq])
-async def get_all_faqs():
+async def get_all_faqs(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    include_total: bool = False
+):
     """
-    Get all FAQs
+    Get one page of FAQs, newest first
+    
+    Served from a pre-encoded snapshot with an ETag; If-None-Match gets a 304.
     
     Returns:
-        JSONResponse: List of FAQs or error message
+        Response: Page of FAQs or error message
     """
-    try:
-        faqs = await FAQService.getAllFAQs()
-        if faqs:
-            faqs = convert_objectid_to_str(faqs)
-            response = {
-                "status": "success",
-                "data": faqs,
-                "message": "FAQs retrieved successfully"
-            }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
-        
+    async def build():
+        page = await FAQService.getAllFAQs(limit, after, include_total)
         response = {
             "status": "success",
-            "data": [],
-            "message": "No FAQs found"
+            "data": page["data"],
+            "next_cursor": page["next_cursor"],
+            "message": "FAQs retrieved successfully" if page["data"] else "No FAQs found"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+        if include_total:
+            response["total"] = page["total"]
+        return response, status.HTTP_200_OK
+
+    try:
+        snapshot = await catalog_snapshots.get_or_build("faqs", f"{limit}:{after}:{include_total}", build)
+        return snapshot_response(request, snapshot)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @faqRouter.get("/{faq_id}", response_model=FAQsSchemaReq)
 async def get_faq_by_id(faq_id: str):
@@ -98,28 +93,27 @@ async def get_faq_by_id(faq_id: str):
         faq_id (str): The ID of the FAQ to retrieve
         
     Returns:
-        JSONResponse: FAQ data or error message
+        BSONResponse: FAQ data or error message
     """
     try:
         faq = await FAQService.getFAQById(faq_id)
         if faq:
-            faq = convert_objectid_to_str(faq)
             response = {
                 "status": "success",
                 "data": faq,
                 "message": "FAQ retrieved successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "failed",
             "message": "FAQ not found"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, status, Depends
+from utils.responses import BSONResponse
 from schemas.feedbackSchema import FeedbackSchemaReq
-from services.feedbackService import FeedbackService
-from bson import ObjectId
+from services.feedbackService import FeedbackService, feedback_writer
+from utils.batch_writer import QueueFullError
+from dependency.auth import admin_only
 from typing import List
 
 feedbackRouter = APIRouter(
@@ -10,51 +11,66 @@ feedbackRouter = APIRouter(
     tags=["feedback"]
 )
 
-def convert_objectid_to_str(data):
-    """Recursively convert ObjectId fields in a dictionary to strings."""
-    if isinstance(data, dict):
-        return {k: convert_objectid_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    elif isinstance(data, ObjectId):
-        return str(data)
-    return data
-
 @feedbackRouter.post("/", response_model=FeedbackSchemaReq)
 async def create_feedback(feedback: FeedbackSchemaReq):
     """
     Create a new feedback
     
+    With buffered ingestion enabled the feedback is queued and written in
+    the next batch; the response is 202 with the feedback's id.
+    
     Args:
         feedback (FeedbackSchemaReq): The feedback data to be created
         
     Returns:
-        JSONResponse: Created feedback data or error message
+        BSONResponse: Created feedback data or error message
     """
     try:
-        print(f"routes {feedback}")
         new_feedback = await FeedbackService.createFeedback(feedback)
+        if new_feedback and feedback_writer.running:
+            response = {
+                "status": "success",
+                "data": new_feedback,
+                "message": "Feedback accepted"
+            }
+            return BSONResponse(content=response, status_code=status.HTTP_202_ACCEPTED)
         if new_feedback:
-            new_feedback = convert_objectid_to_str(new_feedback)
             response = {
                 "status": "success",
                 "data": new_feedback,
                 "message": "Feedback created successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_201_CREATED)
+            return BSONResponse(content=response, status_code=status.HTTP_201_CREATED)
         
         response = {
             "status": "failed",
             "message": "Failed to create feedback"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
         
+    except QueueFullError as e:
+        response = {
+            "status": "failed",
+            "message": str(e)
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@feedbackRouter.get("/ingest/stats")
+async def get_ingestion_stats(user = Depends(admin_only)):
+    """
+    Get the buffered feedback ingestion counters (admin only)
+    """
+    response = {
+        "status": "success",
+        "data": FeedbackService.ingestionStats(),
+    }
+    return BSONResponse(content=response, status_code=status.HTTP_200_OK)
 
 @feedbackRouter.get("/user/{user_id}", response_model=List[FeedbackSchemaReq])
 async def get_user_feedback(user_id: str):
@@ -65,32 +81,31 @@ async def get_user_feedback(user_id: str):
         user_id (str): The ID of the user to get feedback for
         
     Returns:
-        JSONResponse: List of feedback or error message
+        BSONResponse: List of feedback or error message
     """
     try:
         feedbacks = await FeedbackService.getFeedbackForUser(user_id)
         if feedbacks:
-            feedbacks = convert_objectid_to_str(feedbacks)
             response = {
                 "status": "success",
                 "data": feedbacks,
                 "message": "Feedback retrieved successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "success",
             "data": [],
             "message": "No feedback found for this user"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @feedbackRouter.get("/{feedback_id}", response_model=FeedbackSchemaReq)
 async def get_feedback_by_id(feedback_id: str):
@@ -101,29 +116,28 @@ async def get_feedback_by_id(feedback_id: str):
         feedback_id (str): The ID of the feedback to retrieve
         
     Returns:
-        JSONResponse: Feedback data or error message
+        BSONResponse: Feedback data or error message
     """
     try:
         feedback = await FeedbackService.getFeedbackById(feedback_id)
         if feedback:
-            feedback = convert_objectid_to_str(feedback)
             response = {
                 "status": "success",
                 "data": feedback,
                 "message": "Feedback retrieved successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "failed",
             "message": "Feedback not found"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
+        return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
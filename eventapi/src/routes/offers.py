@@ -1,34 +1,27 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Request
 from typing import List, Optional
 from schemas.offerSchema import OfferSchemaReq, OfferSchemaRes, AdminOfferSchemaReq
 from services.offerService import OfferService
-from datetime import datetime
-from bson import ObjectId
-from fastapi.responses import JSONResponse
+from schemas.paginationSchema import Page
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.responses import BSONResponse
+from utils.snapshot import catalog_snapshots, snapshot_response
 
 offerRouter = APIRouter(
     prefix="/offers",
     tags=["offers"],
 )
 
-def convert_objectid_to_str(data):
-    """Recursively convert ObjectId fields in a dictionary to strings."""
-    if isinstance(data, dict):
-        return {k: convert_objectid_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    elif isinstance(data, ObjectId):
-        return str(data)  # Convert ObjectId to string
-    return data  # Return as is if it's not an ObjectId
-
-@offerRouter.get("/", response_model=List[OfferSchemaRes])
-async def get_offers():
-    """Get all offers with optional active only filter"""
+@offerRouter.get("/", response_model=Page[OfferSchemaRes])
+async def get_offers(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get one page of offers, newest first"""
     try:
-        offers = await OfferService.get_all_offers()
-        for offer in offers:
-            offer['_id'] = str(offer['_id'])
-        return offers
+        page = await OfferService.get_all_offers(limit, after, include_total)
+        return BSONResponse(content=page)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -45,8 +38,7 @@ async def get_offer_by_promo_code(promo_code: str):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Offer with promo code not found"
             )
-        offer['_id'] = str(offer['_id'])
-        return offer
+        return BSONResponse(content=offer)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -59,15 +51,7 @@ async def create_offer(offer: OfferSchemaReq):
     try:
         print("Inside offer router")
         result = await OfferService.create_offer(offer)
-        transformed_result = {
-            **result,
-            "_id": str(result["_id"]),
-            "valid_till": result["valid_till"].isoformat(),
-            "created_at": result["created_at"].isoformat() if "created_at" in result else None,
-            "updated_at": result["updated_at"].isoformat() if "updated_at" in result else None
-        }
-        
-        return transformed_result
+        return BSONResponse(content=result, status_code=status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -84,8 +68,7 @@ async def get_offer(offer_id: str):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Offer not found"
             )
-        offer['_id'] = str(offer['_id'])
-        return offer
+        return BSONResponse(content=offer)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -99,17 +82,12 @@ async def update_offer(offer_id: str, offer: AdminOfferSchemaReq):
         updated_offer = await OfferService.update_offer(offer_id, offer)
         print("Updated offer:", updated_offer)
         if updated_offer:
-            updated_offer['_id'] = str(updated_offer['_id'])
-            updated_offer["valid_till"] = updated_offer["valid_till"].isoformat()
-            updated_offer["created_at"] = updated_offer["created_at"].isoformat() if "created_at" in updated_offer else None
-            updated_offer["updated_at"] = updated_offer["updated_at"].isoformat() if "updated_at" in updated_offer else None
-            print("jfksajdfdf")
             response = {
                 "status": "success",
                 "data": updated_offer,
                 "message": "Event updated successfully",
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -129,11 +107,14 @@ async def delete_offer(offer_id: str):
         )
 
 @offerRouter.get("/featured/", response_model=List[OfferSchemaRes])
-async def get_featured_offers():
-    """Get all featured offers"""
+async def get_featured_offers(request: Request):
+    """Get all featured offers, from a pre-encoded snapshot with an ETag"""
+    async def build():
+        return await OfferService.get_featured_offers(), status.HTTP_200_OK
+
     try:
-        offers = await OfferService.get_featured_offers()
-        return offers
+        snapshot = await catalog_snapshots.get_or_build("featured_offers", "", build)
+        return snapshot_response(request, snapshot)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
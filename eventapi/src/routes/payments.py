@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import Dict , List
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Request, Header
+from typing import Dict , List, Optional
 from schemas.paymentSchema import PaymentSchemaReq, PaymentSchemaRes , VerifyPaymentSchema
 from services.paymentService import PaymentService
-from datetime import datetime
+from utils.responses import BSONResponse
+from utils.batch_writer import QueueFullError
+from dependency.auth import admin_only
+import hashlib
+import json
+from schemas.paginationSchema import Page
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 paymentrouter = APIRouter(
     prefix="/payments",
@@ -10,8 +16,7 @@ paymentrouter = APIRouter(
     # dependencies=[Depends(JWTBearer())]
 )
 
-# Initialize PaymentService with Razorpay credentials
-# payment_service = PaymentService(client_id="rzp_test_nP3SqoPnodlV1N", client_secret="Odlne0wJUEmSL3e4DBZjFZWS")
+# Uses the shared pooled gateway client from utils.payment_gateway
 payment_service = PaymentService()
 
 @paymentrouter.post("/", response_model=PaymentSchemaRes, status_code=status.HTTP_201_CREATED)
@@ -22,20 +27,7 @@ async def create_payment(payment: PaymentSchemaReq):
     """
     try:
         result = await payment_service.create_payment(payment)
-        print(f"23 {result}")
-        def transform(doc: dict) -> dict:
-            
-            doc["_id"] = str(doc["_id"])
-            doc["user_id"] = str(doc["user_id"])
-    
-            # Add missing created_at if not present
-            if "created_at" not in doc:
-                doc["created_at"] = datetime.utcnow()  # or whatever timestamp logic you use
-
-            return doc
-
-        result = transform(result)
-        return result
+        return BSONResponse(content=result, status_code=status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,7 +41,7 @@ async def verify_payment(payload : VerifyPaymentSchema):
     """
     try:
         print(f"38 === > {payload.razorpay_payment_id}, {payload.razorpay_order_id}, {payload.razorpay_signature}")
-        verified = await PaymentService.verify_payment(payload.razorpay_payment_id, payload.razorpay_order_id, payload.razorpay_signature)
+        verified = await payment_service.verify_payment(payload.razorpay_payment_id, payload.razorpay_order_id, payload.razorpay_signature)
         print(f"50 === > {verified}")
         if not verified:
             raise HTTPException(
@@ -63,51 +55,83 @@ async def verify_payment(payload : VerifyPaymentSchema):
             detail=str(e)
         )
 
+@paymentrouter.post("/webhook")
+async def payment_webhook(
+    request: Request,
+    x_razorpay_signature: Optional[str] = Header(None),
+    x_razorpay_event_id: Optional[str] = Header(None)
+):
+    """
+    Receive a gateway webhook (payment.captured, payment.failed, refund.processed)
+    
+    The event is verified, recorded once per event id and acknowledged;
+    the payment, ticket and booking updates are applied in the background
+    in batches. Redeliveries are acknowledged without doing anything.
+    """
+    body = await request.body()
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        response = {"status": "failed", "message": "Invalid JSON body"}
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    event_id = x_razorpay_event_id or hashlib.sha256(body).hexdigest()
+    try:
+        result = await payment_service.receive_webhook(body, x_razorpay_signature, payload, event_id)
+        response = {"status": "success", "data": {"event_id": event_id, "result": result}}
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+    except ValueError as e:
+        response = {"status": "failed", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except QueueFullError as e:
+        response = {"status": "failed", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+    except Exception as e:
+        response = {"status": "error", "message": str(e)}
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@paymentrouter.get("/webhook/stats")
+async def get_webhook_stats(user = Depends(admin_only)):
+    """
+    Get the webhook worker's queue depth and counters (admin only)
+    """
+    response = {
+        "status": "success",
+        "data": PaymentService.webhookStats(),
+    }
+    return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+
 @paymentrouter.put("/{payment_id}/status", response_model=PaymentSchemaRes)
 async def update_payment_status(payment_id: str, status: str):
     """
     Update payment status
     """
     try:
-        updated_payment = await PaymentService.update_payment_status(payment_id, status)
+        updated_payment = await payment_service.update_payment_status(payment_id, status)
         if not updated_payment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Payment with ID {payment_id} not found"
             )
-        def transform(doc: dict) -> dict:
-            doc["_id"] = str(doc["_id"])
-            doc["user_id"] = str(doc["user_id"])
-    
-            # Add missing created_at if not present
-            if "created_at" not in doc:
-                doc["created_at"] = datetime.utcnow()  # or whatever timestamp logic you use
-
-            return doc
-        updated_payment = transform(updated_payment)
-        return updated_payment
+        return BSONResponse(content=updated_payment)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    
-
-def transform(doc: dict) -> dict:
-    doc["_id"] = str(doc["_id"])
-    doc["user_id"] = str(doc["user_id"])
-    return doc
 
 
-@paymentrouter.get("/", response_model=List[PaymentSchemaRes])
-async def get_all_payments():
-    print(f"17 hellooo")
+@paymentrouter.get("/", response_model=Page[PaymentSchemaRes])
+async def get_all_payments(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    include_total: bool = False
+):
     """
-    Get all payments
+    Get one page of payments, newest first
     """
     try:
-        payments = await PaymentService.get_all_payments()
-        return [transform(p) for p in payments]
+        page = await payment_service.get_all_payments(limit, after, include_total)
+        return BSONResponse(content=page)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -121,13 +145,13 @@ async def get_payment_by_id(payment_id: str):
     Get a single payment by ID
     """
     try:
-        payment = await PaymentService.get_payment_by_id(payment_id)
+        payment = await payment_service.get_payment_by_id(payment_id)
         if not payment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Payment with ID {payment_id} not found"
             )
-        return transform(payment)
+        return BSONResponse(content=payment)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
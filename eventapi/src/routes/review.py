@@ -1,25 +1,16 @@
-from fastapi import APIRouter, status , Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, status , Depends, Query
+from utils.responses import BSONResponse
 from schemas.reviewSchema import ReviewSchemaReq , PyObjectId
 from services.reviewService import ReviewService
-from bson import ObjectId
-from typing import List 
+from dependency.auth import admin_only
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import List, Literal, Optional
 
 reviewRouter = APIRouter(
     prefix="/review",
     tags=["review","rating"],
 )
 
-def convert_objectid_to_str(data):
-    """Recursively convert ObjectId fields in a dictionary to strings."""
-    if isinstance(data, dict):
-        return {k: convert_objectid_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    elif isinstance(data, ObjectId):
-        return str(data)  # Convert ObjectId to string
-    return data  # Return as is if it's not an ObjectId
-
 @reviewRouter.post("/", response_model=ReviewSchemaReq)
 async def create_review(review: ReviewSchemaReq):
     """
@@ -29,69 +20,127 @@ async def create_review(review: ReviewSchemaReq):
         review (ReviewSchemaReq): The review data to be created
         
     Returns:
-        JSONResponse: Created review data or error message
+        BSONResponse: Created review data or error message
     """
     try:
         # review_dict = review.model_dump()
         new_review = await ReviewService.createReview(review)
         
         if new_review:
-            new_review = convert_objectid_to_str(new_review)  # Convert ObjectId to string
             response = {
                 "status": "success",
                 "data": new_review,
                 "message": "Review created successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_201_CREATED)
+            return BSONResponse(content=response, status_code=status.HTTP_201_CREATED)
         
         response = {
             "status": "failed",
             "message": "Failed to create review"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-@reviewRouter.get("/event/{event_id}", response_model=List[ReviewSchemaReq])
-async def get_reviews_by_event(event_id: PyObjectId):
+@reviewRouter.get("/event/{event_id}/summary")
+async def get_rating_summary(event_id: PyObjectId):
     """
-    Get all reviews for a specific event
+    Get the review count, average rating and 1-5 star histogram of an event
     
     Args:
-        event_id (PyObjectId): The ID of the event to get reviews for
+        event_id (PyObjectId): The ID of the event
         
     Returns:
-        JSONResponse: List of reviews or error message
+        BSONResponse: The summary or error message
     """
     try:
-        reviews = await ReviewService.getReviewForEvent(event_id)
-        if reviews:
-            reviews = convert_objectid_to_str(reviews)
+        summary = await ReviewService.getRatingSummary(event_id)
+        if summary is None:
             response = {
-                "status": "success",
-                "data": reviews,
-                "message": "Reviews retrieved successfully"
+                "status": "failed",
+                "message": "Event not found"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_404_NOT_FOUND)
         
         response = {
             "status": "success",
-            "data": [],
-            "message": "No reviews found for this event"
+            "data": summary,
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
+        
+    except Exception as e:
+        response = {
+            "status": "error",
+            "message": str(e)
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@reviewRouter.get("/event/{event_id}")
+async def get_reviews_by_event(
+    event_id: PyObjectId,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    sort: Literal["recent", "rating"] = "recent"
+):
+    """
+    Get one page of reviews for a specific event
+    
+    Args:
+        event_id (PyObjectId): The ID of the event to get reviews for
+        limit (int): Page size
+        after (Optional[str]): The next_cursor of the previous page
+        sort (str): "recent" for newest first, "rating" for highest rated first
+        
+    Returns:
+        BSONResponse: Page of reviews or error message
+    """
+    try:
+        page = await ReviewService.getReviewForEvent(event_id, limit, after, sort)
+        response = {
+            "status": "success",
+            "data": page["data"],
+            "next_cursor": page["next_cursor"],
+            "message": "Reviews retrieved successfully" if page["data"] else "No reviews found for this event"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
+    except ValueError as e:
+        response = {
+            "status": "failed",
+            "message": str(e)
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        response = {
+            "status": "error",
+            "message": str(e)
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@reviewRouter.post("/summaries/rebuild")
+async def rebuild_rating_summaries(user = Depends(admin_only)):
+    """
+    Recompute every event's rating summary from the reviews (admin only)
+    """
+    try:
+        result = await ReviewService.rebuildSummaries()
+        response = {
+            "status": "success",
+            "data": result,
+            "message": "Rating summaries rebuilt"
+        }
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @reviewRouter.get("/user", response_model=List[ReviewSchemaReq])
 async def get_reviews_by_user(email: str):
@@ -102,7 +151,7 @@ async def get_reviews_by_user(email: str):
         email (str): The email of the user to get reviews for
         
     Returns:
-        JSONResponse: List of reviews or error message
+        BSONResponse: List of reviews or error message
     """
     try:
         if not email:
@@ -110,28 +159,27 @@ async def get_reviews_by_user(email: str):
                 "status": "failed",
                 "message": "Email is required"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
+            return BSONResponse(content=response, status_code=status.HTTP_400_BAD_REQUEST)
             
         reviews = await ReviewService.getReviewForUser(email)
         if reviews:
-            reviews = convert_objectid_to_str(reviews)
             response = {
                 "status": "success",
                 "data": reviews,
                 "message": "Reviews retrieved successfully"
             }
-            return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+            return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
         response = {
             "status": "success",
             "data": [],
             "message": "No reviews found for this user"
         }
-        return JSONResponse(content=response, status_code=status.HTTP_200_OK)
+        return BSONResponse(content=response, status_code=status.HTTP_200_OK)
         
     except Exception as e:
         response = {
             "status": "error",
             "message": str(e)
         }
-        return JSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return BSONResponse(content=response, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi.responses import JSONResponse
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Header, Response
+from utils.responses import BSONResponse
+from typing import List, Dict, Optional
 from schemas.ticketSchema import TicketSchemaReq, TicketSchemaRes , TicketSchemaUpdate
 from services.ticketService import TicketService
-from datetime import datetime
 from services.eventService import EventService 
+from schemas.paginationSchema import Page
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.qr import MEDIA_TYPES
 
 ticketrouter = APIRouter(
     prefix="/tickets",
@@ -16,14 +18,7 @@ async def create_ticket(ticket: TicketSchemaReq):
     print(f"Creating ticket with data: {ticket}")
     try:
         result = await TicketService.create_ticket(ticket)
-
-        result["_id"] = str(result["_id"])
-        result["user"] = str(result["user"])
-        result["event"] = str(result["event"])
-        if "payment_id" in result and result["payment_id"]:
-            result["payment_id"] = str(result["payment_id"])
-
-        return result
+        return BSONResponse(content=result, status_code=status.HTTP_201_CREATED)
 
     except Exception as e:
         raise HTTPException(
@@ -38,20 +33,11 @@ async def get_user_tickets(user_id: str):
     """
     try:
         tickets = await TicketService.get_user_tickets(user_id)
-        transformed_tickets = []
-        
         for ticket in tickets:
-            # Transform the basic ticket data
-            transformed_ticket = {
-                "_id": str(ticket["_id"]),
-                "user": str(ticket["user"]),
-                "event": str(ticket["event"])
-            }
-            
             # Get and add event details
             event = await EventService.getEventById(ticket["event"])
             if event:
-                transformed_ticket["event_detail"] = {
+                ticket["event_detail"] = {
                     "name": event["name"],
                     "state": event["state"],
                     "city": event["city"],
@@ -60,24 +46,7 @@ async def get_user_tickets(user_id: str):
                     "time": event["time"],
                     "description": event["description"],
                 }
-            
-            # Transform other fields
-            if "payment_id" in ticket and ticket["payment_id"]:
-                transformed_ticket["payment_id"] = str(ticket["payment_id"])
-            if "purchase_date" in ticket and isinstance(ticket["purchase_date"], datetime):
-                transformed_ticket["purchase_date"] = ticket["purchase_date"].isoformat()
-            if "updated_at" in ticket and isinstance(ticket["updated_at"], datetime):
-                transformed_ticket["updated_at"] = ticket["updated_at"].isoformat()
-            
-            # Add any remaining fields from the original ticket
-            for key, value in ticket.items():
-                if key not in transformed_ticket:
-                    transformed_ticket[key] = value
-            
-            # print(f"Transformed ticket: {transformed_ticket[0]}")
-            transformed_tickets.append(transformed_ticket)
-            # print(transformed_tickets)
-        return transformed_tickets
+        return BSONResponse(content=tickets)
         
     except Exception as e:
         raise HTTPException(
@@ -92,18 +61,7 @@ async def get_event_tickets(event_id: str):
     """
     try:
         tickets = await TicketService.get_event_tickets(event_id)
-        def transform(doc: dict) -> dict:
-            doc["_id"] = str(doc["_id"])
-            doc["user"] = str(doc["user"])
-            doc["event"] = str(doc["event"])
-            if "payment_id" in doc and doc["payment_id"]:
-                doc["payment_id"] = str(doc["payment_id"])
-            if "purchase_date" in doc and isinstance(doc["purchase_date"], datetime):
-                doc["purchase_date"] = doc["purchase_date"].isoformat()
-            if "updated_at" in doc and isinstance(doc["updated_at"], datetime):
-                doc["updated_at"] = doc["updated_at"].isoformat()
-            return doc
-        return [transform(ticket) for ticket in tickets]
+        return BSONResponse(content=tickets)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -117,29 +75,47 @@ async def get_ticket(ticket_id: str):
     """
     try:
         ticket = await TicketService.get_ticket(ticket_id)
-        def transform(doc: dict) -> dict:
-            doc["_id"] = str(doc["_id"])
-            doc["user"] = str(doc["user"])
-            doc["event"] = str(doc["event"])
-            if "payment_id" in doc and doc["payment_id"]:
-                doc["payment_id"] = str(doc["payment_id"])
-            if "purchase_date" in doc and isinstance(doc["purchase_date"], datetime):
-                doc["purchase_date"] = doc["purchase_date"].isoformat()
-            if "updated_at" in doc and isinstance(doc["updated_at"], datetime):
-                doc["updated_at"] = doc["updated_at"].isoformat()
-            return doc
         if not ticket:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Ticket with ID {ticket_id} not found"
             )
-        ticket = transform(ticket)
-        return ticket
+        return BSONResponse(content=ticket)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@ticketrouter.get("/{ticket_id}/qr.{fmt}")
+async def get_ticket_qr(ticket_id: str, fmt: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Render a ticket's QR code as PNG or SVG, with ETag revalidation
+    """
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unsupported QR format: {fmt}"
+        )
+    try:
+        result = await TicketService.get_qr_image(ticket_id, fmt, if_none_match)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ticket with ID {ticket_id} not found"
+        )
+    image, etag = result
+    # The token is re-signed when payment completes, so clients must revalidate;
+    # an unchanged QR still costs only a 304
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if image is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=image, media_type=MEDIA_TYPES[fmt], headers=headers)
 
 @ticketrouter.put("/{ticket_id}/confirm", response_model=TicketSchemaRes)
 async def confirm_ticket(ticket_id: str):
@@ -153,7 +129,7 @@ async def confirm_ticket(ticket_id: str):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Ticket with ID {ticket_id} not found"
             )
-        return updated_ticket
+        return BSONResponse(content=updated_ticket)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -172,7 +148,7 @@ async def cancel_ticket(ticket_id: str):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Ticket with ID {ticket_id} not found"
             )
-        return updated_ticket
+        return BSONResponse(content=updated_ticket)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -191,19 +167,7 @@ async def update_payment(ticket_id: str, payload:TicketSchemaUpdate):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Ticket with ID {ticket_id} not found"
             )
-        def transform(doc: dict) -> dict:
-            doc["_id"] = str(doc["_id"])
-            doc["user"] = str(doc["user"])
-            doc["event"] = str(doc["event"])
-            if "payment_id" in doc and doc["payment_id"]:
-                doc["payment_id"] = str(doc["payment_id"])
-            if "purchase_date" in doc and isinstance(doc["purchase_date"], datetime):
-                doc["purchase_date"] = doc["purchase_date"].isoformat()
-            if "updated_at" in doc and isinstance(doc["updated_at"], datetime):
-                doc["updated_at"] = doc["updated_at"].isoformat()
-            return doc
-        updated_ticket = transform(updated_ticket)
-        return updated_ticket
+        return BSONResponse(content=updated_ticket)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -228,13 +192,13 @@ async def delete_ticket(ticket_id: str):
             detail=str(e)
         )
 
-@ticketrouter.get("/verify/{ticket_number}", response_model=Dict)
-async def verify_ticket(ticket_number: str):
+@ticketrouter.get("/verify/{token}", response_model=Dict)
+async def verify_ticket(token: str):
     """
-    Verify a ticket for event entry
+    Verify a scanned QR token (offline) or a ticket number for event entry
     """
     try:
-        verification_result = await TicketService.verify_ticket(ticket_number)
+        verification_result = await TicketService.verify_ticket(token)
         return verification_result
     except Exception as e:
         raise HTTPException(
@@ -243,25 +207,18 @@ async def verify_ticket(ticket_number: str):
         )
     
 
-@ticketrouter.get("/", response_model=List[TicketSchemaRes])
-async def get_all_tickets():
+@ticketrouter.get("/", response_model=Page[TicketSchemaRes])
+async def get_all_tickets(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    include_total: bool = False
+):
     """
-    Get all tickets
+    Get one page of tickets, newest first
     """
     try:
-        tickets = await TicketService.get_all_tickets()
-        def transform(doc: dict) -> dict:
-            doc["_id"] = str(doc["_id"])
-            doc["user"] = str(doc["user"])
-            doc["event"] = str(doc["event"])
-            if "payment_id" in doc and doc["payment_id"]:
-                doc["payment_id"] = str(doc["payment_id"])
-            if "purchase_date" in doc and isinstance(doc["purchase_date"], datetime):
-                doc["purchase_date"] = doc["purchase_date"].isoformat()
-            if "updated_at" in doc and isinstance(doc["updated_at"], datetime):
-                doc["updated_at"] = doc["updated_at"].isoformat()
-            return doc
-        return [transform(ticket) for ticket in tickets]
+        page = await TicketService.get_all_tickets(limit, after, include_total)
+        return BSONResponse(content=page)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
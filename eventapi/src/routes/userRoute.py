@@ -1,10 +1,11 @@
-from fastapi import APIRouter , HTTPException , Depends , status
-from fastapi.responses import JSONResponse
-from schemas.userSchema import UserProfileRes 
+from fastapi import APIRouter , HTTPException , Depends , status , Query
+from utils.responses import BSONResponse
+from schemas.userSchema import UserProfileRes, UserRoleUpdate
 from services.userService import UserService
 from pydantic import EmailStr 
-from typing import Annotated
-from dependency.auth import get_current_user
+from typing import Annotated, Optional
+from dependency.auth import get_current_user, admin_only
+from db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 userRouter = APIRouter(
     tags=["User"],
@@ -19,7 +20,7 @@ async def get_user_profile(current_user: Annotated[str, Depends(get_current_user
     """
     try:
         # Get user details from the email extracted from the token
-        response = UserService.GetUserByEmail(email=current_user)
+        response = await UserService.GetUserByEmail(email=current_user)
         
         if "error" in response:
             raise HTTPException(
@@ -42,23 +43,51 @@ async def get_user_profile(current_user: Annotated[str, Depends(get_current_user
         )
     
 @userRouter.get("/")
-async def get_all_users():
+async def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    include_total: bool = False
+):
     """
-    Get a list of all users.
+    Get one page of users, newest first.
     """
     try:
-        # Get all users from the database
-        response = await UserService.GetAllUsers()
-        for res in response:
-            res['_id'] = str(res['_id'])
+        # Get a page of users from the database
+        response = await UserService.GetAllUsers(limit, after, include_total)
         if "error" in response:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=response["error"]
             )
-        return response
+        return BSONResponse(content=response)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve users: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@userRouter.put("/{email}/role")
+async def update_user_role(email: EmailStr, payload: UserRoleUpdate, user = Depends(admin_only)):
+    """
+    Change a user's role. Tokens issued before the change stop working.
+    """
+    response = await UserService.UpdateUserRole(email, payload.role)
+    if "error" in response:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=response["error"]
+        )
+    return BSONResponse(content=response)
+
+@userRouter.delete("/{email}")
+async def delete_user(email: EmailStr, user = Depends(admin_only)):
+    """
+    Delete a user. Tokens issued to them stop working.
+    """
+    response = await UserService.DeleteUser(email)
+    if "error" in response:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=response["error"]
+        )
+    return BSONResponse(content=response)
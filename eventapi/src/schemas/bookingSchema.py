@@ -11,7 +11,10 @@ class PyObjectId(str):
     def __get_pydantic_core_schema__(cls, source_type: Any, handler: Any) -> core_schema.CoreSchema:
         return core_schema.json_or_python_schema(
             json_schema=core_schema.str_schema(),
-            python_schema=core_schema.no_info_after_validator_function(cls.validate, core_schema.str_schema()),
+            python_schema=core_schema.no_info_after_validator_function(
+                cls.validate,
+                core_schema.union_schema([core_schema.is_instance_schema(ObjectId), core_schema.str_schema()])
+            ),
             serialization=core_schema.plain_serializer_function_ser_schema(lambda x: str(x))
         )
 
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from schemas.bookingSchema import AttendeeDetail
+
+
+class CheckoutSchemaReq(BaseModel):
+    """Everything needed to book seats, open a gateway order and issue a pending ticket"""
+    user_id: str
+    event_id: str
+    slot_name: str
+    quantity: int
+    currency: str = "INR"
+    payment_method: str = "razorpay"
+    attendee_details: Optional[List[AttendeeDetail]] = None
+    special_requests: Optional[str] = None
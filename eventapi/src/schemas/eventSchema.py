@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List , Dict
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List , Dict, Literal
 from bson import ObjectId
 
 class PyObjectId(str):
@@ -60,6 +60,22 @@ class Slots(BaseModel):
     name: Optional[str]
     price: Optional[int]
     status: Optional[str]
+    capacity: Optional[int] = None  # seats on sale; None means unlimited
+
+class GeoPoint(BaseModel):
+    """GeoJSON point of the venue; coordinates are [longitude, latitude]"""
+    type: Literal["Point"] = "Point"
+    coordinates: List[float]
+
+    @field_validator("coordinates")
+    @classmethod
+    def validate_coordinates(cls, v):
+        if len(v) != 2:
+            raise ValueError("coordinates must be [longitude, latitude]")
+        lng, lat = v
+        if not -180 <= lng <= 180 or not -90 <= lat <= 90:
+            raise ValueError("coordinates out of range")
+        return v
 
 class EventSchemaAdminReq(BaseModel):
     about: Optional[About]
@@ -77,6 +93,7 @@ class EventSchemaAdminReq(BaseModel):
     time: Optional[str]
     title: Optional[str]
     venue: Optional[str]
+    location: Optional[GeoPoint] = None
 
 
     class Config:
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """Schema for one page of a keyset-paginated list"""
+    data: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
@@ -53,7 +53,7 @@ class TicketSchemaRes(BaseModel):
     ticket_number: str
     payment_status: str
     payment_method: str
-    qr_code: Optional[str] = None
+    qr_payload: Optional[str] = None
     payment_id: Optional[PyObjectId] = None
 
 class TicketSchemaUpdate(BaseModel):
@@ -1,8 +1,11 @@
 from pydantic import BaseModel , EmailStr
-from typing import Optional
+from typing import Literal, Optional
 
 class UserProfileRes(BaseModel):
     name: str
     email: EmailStr
     avatar: Optional[str] = None
-    message: str
\ No newline at end of file
+    message: str
+
+class UserRoleUpdate(BaseModel):
+    role: Literal["user", "admin"]
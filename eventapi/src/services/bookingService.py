@@ -1,8 +1,8 @@
 # fastapi/src/services/bookingService.py
 from typing import List, Optional, Dict
 from datetime import datetime
-from schemas.bookingSchema import BookingSchemaReq,BookingSchemaRes
-from repository.bookings_repo import BookingRepo
+from schemas.bookingSchema import BookingSchemaReq
+from repository.bookings_repo import BookingRepo, SoldOutError
 from bson import ObjectId
 from pymongo.errors import PyMongoError
 from fastapi import HTTPException
@@ -15,6 +15,8 @@ class BookingService:
             # Validate booking data
             if not booking_data.user_id or not booking_data.event_id:
                 raise HTTPException(status_code=400, detail="User ID and Event ID are required")
+            if booking_data.quantity < 1:
+                raise HTTPException(status_code=400, detail="Quantity must be at least 1")
 
             booking_dict = {
                 "user_id": ObjectId(booking_data.user_id),
@@ -30,21 +32,13 @@ class BookingService:
                 "updated_at": None,
             }
 
+            # Returned as stored (BSONResponse encodes the ObjectIds): the seats
+            # are already reserved, so nothing may fail after the insert
             result = await BookingRepo.create_booking(booking_dict)
             print(f"create_booking result: {result}")
-            if result:
-                def convert_object_ids(doc: dict) -> dict:
-                    for key, value in doc.items():
-                        if isinstance(value, ObjectId):
-                            doc[key] = str(value)
-                        elif isinstance(value, list):
-                            doc[key] = [convert_object_ids(item) if isinstance(item, dict) else item for item in value]
-                        elif isinstance(value, dict):
-                            doc[key] = convert_object_ids(value)
-                    return doc
-                result = convert_object_ids(result)
-                return BookingSchemaRes(**result)
-            return None
+            return result
+        except SoldOutError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         except PyMongoError as e:
             raise HTTPException(status_code=500, detail="Database error occurred")
         except Exception as e:
@@ -108,6 +102,8 @@ class BookingService:
             # Call the repository to update booking status
             result = await BookingRepo.update_booking_status(booking_id, status)
             return result
+        except SoldOutError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         except PyMongoError as e:
             raise HTTPException(status_code=500, detail="Database error occurred")
         except Exception as e:
@@ -129,13 +125,13 @@ class BookingService:
             raise HTTPException(status_code=400, detail=str(e))
         
     @staticmethod
-    async def getAllBookings() -> List[Dict]:
+    async def getAllBookings(limit: int, after: Optional[str] = None, include_total: bool = False) -> Dict:
         """
-        Get All Bookings
+        Get one page of bookings
         """
         try:
-            response = await BookingRepo.getAllBookings()
-            if not response:
+            response = await BookingRepo.getAllBookings(limit, after, include_total)
+            if not response["data"] and after is None:
                 raise HTTPException(status_code=404, detail="No bookings found")
             return response
         except PyMongoError as e:
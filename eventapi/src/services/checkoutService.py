@@ -0,0 +1,253 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from bson import ObjectId
+from schemas.checkoutSchema import CheckoutSchemaReq
+from repository.checkout_repo import CheckoutRepo
+from repository.bookings_repo import BookingRepo
+from repository.payments_repo import PaymentRepo
+from repository.tickets_repo import TicketsRepo
+from services.eventService import EventService
+from services.ticketService import TicketService
+from services.paymentService import PaymentService
+from utils.payment_gateway import GatewayError, payment_gateway
+import asyncio
+import os
+import uuid
+
+SUPPORTED_CURRENCIES = ("INR", "USD")
+# Checkouts not paid within this long give their seats back
+CHECKOUT_TTL = timedelta(minutes=float(os.environ.get("CHECKOUT_TTL_MINUTES", 30)))
+
+
+def _slot_price(event: Dict, slot_name: str) -> float:
+    """Price of one seat in a slot, falling back to the event price"""
+    slots = event.get("slots") or []
+    for slot in slots:
+        if slot.get("name") == slot_name:
+            price = slot.get("price")
+            return float(price if price is not None else event.get("price") or 0)
+    if slots:
+        raise ValueError(f"Slot {slot_name} not found for this event")
+    return float(event.get("price") or 0)
+
+
+class CheckoutService:
+    @staticmethod
+    async def checkout(data: CheckoutSchemaReq) -> Dict:
+        """
+        Book seats and open the payment in one call
+        
+        The amount is computed from the event's slot price. The seats, the
+        booking, the payment and the pending ticket are written in one
+        transaction; the gateway order is only created once it committed, so
+        a rolled back checkout never leaves an order behind. If the order
+        cannot be created the payment is failed and the seats released. The
+        client pays against the returned gateway order and calls confirm (or
+        the gateway webhook arrives) to finalize; checkouts left unpaid for
+        CHECKOUT_TTL are released by expire_unpaid.
+        
+        Args:
+            data (CheckoutSchemaReq): The checkout request
+            
+        Returns:
+            Dict: {"booking", "payment", "ticket", "order"}; order holds the
+            gateway order id, amount and currency for the payment form
+            
+        Raises:
+            ValueError: If the request is invalid or the event/slot does not exist
+            SoldOutError: If the slot does not have enough seats left
+            GatewayError: If the gateway order could not be created
+            Exception: If the checkout could not be stored
+        """
+        if not ObjectId.is_valid(data.user_id) or not ObjectId.is_valid(data.event_id):
+            raise ValueError("Invalid user or event ID")
+        if data.quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        if data.currency not in SUPPORTED_CURRENCIES:
+            raise ValueError(f"Invalid currency. Supported currencies: {', '.join(SUPPORTED_CURRENCIES)}")
+        
+        event = await EventService.getEventById(data.event_id)
+        if not event:
+            raise ValueError(f"Event with id {data.event_id} not found")
+        total_amount = _slot_price(event, data.slot_name) * data.quantity
+        if total_amount <= 0:
+            raise ValueError("This slot has no price; book it through /bookings")
+        
+        booking_id, payment_id, ticket_id = ObjectId(), ObjectId(), ObjectId()
+        now = datetime.now()
+        attendees = [attendee.dict() for attendee in data.attendee_details] if data.attendee_details else None
+        booking = {
+            "_id": booking_id,
+            "user_id": ObjectId(data.user_id),
+            "event_id": ObjectId(data.event_id),
+            "payment_id": payment_id,
+            "ticket_id": ticket_id,
+            "booking_number": f"BK-{uuid.uuid4().hex[:8].upper()}",
+            "slot_name": data.slot_name,
+            "quantity": data.quantity,
+            "total_amount": total_amount,
+            "attendee_details": attendees,
+            "special_requests": data.special_requests,
+            "status": "pending",
+            "booking_date": now,
+            "created_at": now,
+            "updated_at": None,
+        }
+        payment = {
+            "_id": payment_id,
+            "ticket_id": str(ticket_id),
+            "user_id": data.user_id,
+            "booking_id": booking_id,
+            "amount": total_amount,
+            "currency": data.currency,
+            "status": "created",
+            "razorpay_order_id": None,
+            "created_at": now,
+        }
+        ticket = {
+            "_id": ticket_id,
+            "persons": data.quantity,
+            "total_price": total_amount,
+            "attendee_info": [attendee["name"] for attendee in attendees] if attendees else None,
+            "user": data.user_id,
+            "event": data.event_id,
+            "payment_method": data.payment_method,
+            "payment_id": payment_id,
+            "booking_id": booking_id,
+            "status": "pending",
+            "purchase_date": now,
+            "ticket_number": TicketsRepo.new_ticket_number(),
+            "payment_status": "pending",
+            "qr_payload": TicketService.generate_qr_code_data(
+                {"_id": ticket_id, "event": data.event_id, "persons": data.quantity},
+                event
+            ),
+        }
+        result = await CheckoutRepo.create_checkout(event, booking, payment, ticket)
+        
+        try:
+            order = await payment_gateway.create_order(
+                int(round(total_amount * 100)),
+                data.currency,
+                receipt=str(booking_id),
+                notes={"payment_for": "Event Registration", "booking_id": str(booking_id)}
+            )
+        except GatewayError:
+            try:
+                await CheckoutService._release([{"_id": payment_id, "razorpay_order_id": None}], "failed")
+            except Exception as e:
+                # Still "created": the expiry sweep releases the seats later
+                print(f"Error releasing checkout {booking_id}: {str(e)}")
+            raise
+        # If this write fails the order is still traceable by its receipt, and
+        # the unpaid checkout is released by expire_unpaid
+        result["payment"] = await PaymentRepo.set_order_id(payment_id, order["id"]) or result["payment"]
+        result["order"] = {"id": order["id"], "amount": order.get("amount"), "currency": order.get("currency", data.currency)}
+        return result
+
+    @staticmethod
+    async def _release(payments: List[Dict], status: str) -> int:
+        """Move checkout payments to completed or failed through the webhook path"""
+        return await PaymentService.apply_webhook_events([{
+            "event_id": f"checkout-{status}:{payment['_id']}",
+            "status": status,
+            "order_id": payment.get("razorpay_order_id"),
+            "_id": payment["_id"],
+        } for payment in payments])
+
+    @staticmethod
+    async def expire_unpaid(ttl: timedelta = CHECKOUT_TTL) -> Dict[str, int]:
+        """
+        Release the seats of checkouts that were not paid within ttl
+        
+        Each order is checked with the gateway first: one that was paid
+        after all (a webhook that never arrived) completes its payment
+        instead. The others fail their payment, which cancels the booking
+        and gives the seats back; a capture arriving later still completes
+        the payment and takes the seats again if they are free.
+        
+        Args:
+            ttl (timedelta): How long a checkout may stay unpaid
+            
+        Returns:
+            Dict[str, int]: Number of checkouts "expired" and "completed"
+        """
+        payments = await PaymentRepo.unpaid_checkouts(datetime.now() - ttl)
+        paid, unpaid = [], []
+        for payment in payments:
+            if payment.get("razorpay_order_id"):
+                try:
+                    order = await payment_gateway.fetch_order(payment["razorpay_order_id"])
+                except GatewayError as e:
+                    if e.status_code != 404:
+                        # Unknown state; look again on the next sweep
+                        print(f"Error checking order {payment['razorpay_order_id']}: {str(e)}")
+                        continue
+                    order = {}
+                if order.get("status") == "paid":
+                    paid.append(payment)
+                    continue
+            unpaid.append(payment)
+        if paid:
+            await CheckoutService._release(paid, "completed")
+        if unpaid:
+            await CheckoutService._release(unpaid, "failed")
+        return {"expired": len(unpaid), "completed": len(paid)}
+
+    @staticmethod
+    async def sweep_expired(interval: float):
+        """Release unpaid checkouts every interval seconds until cancelled"""
+        while True:
+            try:
+                result = await CheckoutService.expire_unpaid()
+                if any(result.values()):
+                    print(f"Checkout sweep: {result['expired']} expired, {result['completed']} completed")
+            except Exception as e:
+                print(f"Error expiring unpaid checkouts: {str(e)}")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    async def confirm(booking_id: str, razorpay_payment_id: str, razorpay_order_id: str, razorpay_signature: str) -> Optional[Dict]:
+        """
+        Finalize a checkout once the client has paid
+        
+        The checkout signature is verified and the payment is completed
+        through the same guarded transitions as the gateway webhook, which
+        confirms the ticket (re-signing its QR token as paid) and the
+        booking. Confirming twice, or after the webhook, changes nothing.
+        
+        Args:
+            booking_id (str): The booking returned by checkout
+            razorpay_payment_id (str): Razorpay payment ID
+            razorpay_order_id (str): Razorpay order ID
+            razorpay_signature (str): Razorpay signature
+            
+        Returns:
+            Optional[Dict]: {"booking", "payment", "ticket"} after confirmation, None if
+            the order does not belong to the booking
+            
+        Raises:
+            ValueError: If the signature does not match or the payment did not
+                end up completed
+            Exception: If the confirmation could not be applied
+        """
+        if not payment_gateway.verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature):
+            raise ValueError("Payment verification failed")
+        payment = await PaymentRepo.get_payment_by_order_id(razorpay_order_id)
+        if not payment or str(payment.get("booking_id")) != booking_id:
+            return None
+        await PaymentService.apply_webhook_events([{
+            "event_id": f"checkout:{razorpay_order_id}",
+            "status": "completed",
+            "order_id": razorpay_order_id,
+            "payment_id": razorpay_payment_id,
+        }])
+        booking, payment, ticket = await asyncio.gather(
+            BookingRepo.get_booking_by_id(booking_id),
+            PaymentRepo.get_payment_by_id(str(payment["_id"])),
+            TicketsRepo.get_ticket_by_id(payment["ticket_id"]),
+        )
+        if payment["status"] != "completed":
+            # e.g. refunded before the client confirmed
+            raise ValueError(f"Payment is {payment['status']} and cannot be confirmed")
+        return {"booking": booking, "payment": payment, "ticket": ticket}
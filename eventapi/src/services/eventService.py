@@ -1,13 +1,54 @@
 from repository.events_repo import EventsRepo
+from db.pagination import DEFAULT_PAGE_SIZE
+from repository.bookings_repo import BookingRepo
+from repository.review_repo import summarize
+from repository.offers_repo import OffersRepo
+from utils.cache import cache_from_env, DocumentCache
 from schemas.eventSchema import EventSchemaAdminReq
+from utils.autocomplete import event_suggestions
+from utils.event_time import parse_bound
+from datetime import date, datetime, timezone
+from bson import ObjectId
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Per-section caches of the event page (offers and availability); availability is short-lived since it
+# changes with every booking. EVENT_PAGE_CACHE_URL shares them across workers.
+page_cache = cache_from_env("event_page", "EVENT_PAGE_CACHE", ttl=60, max_entries=2048)
+availability_cache = DocumentCache(
+    "event_availability", page_cache.backend, ttl=int(os.environ.get("EVENT_AVAILABILITY_TTL", 5))
+)
+# Seconds a section may take before the page is returned without it
+SECTION_TIMEOUT = float(os.environ.get("EVENT_PAGE_SECTION_TIMEOUT", 0.5))
+# The page cannot be served without the event, so it gets a longer budget
+EVENT_TIMEOUT = float(os.environ.get("EVENT_PAGE_EVENT_TIMEOUT", 5))
+
+
+def _slot_availability(event: Optional[Dict], inventory: Dict[str, Dict]) -> List[Dict]:
+    """Merge an event's slots with their inventory rows; available is None for unlimited slots"""
+    slots = (event or {}).get("slots") or [{"name": name} for name in inventory]
+    availability = []
+    for slot in slots:
+        row = inventory.get(slot.get("name"))
+        capacity = row["capacity"] if row else slot.get("capacity")
+        sold = row["sold"] if row else 0
+        availability.append({
+            "name": slot.get("name"),
+            "price": slot.get("price"),
+            "capacity": capacity,
+            "sold": sold,
+            "available": max(capacity - sold, 0) if capacity is not None else None,
+        })
+    return availability
+
 
 class EventService:
     @staticmethod
-    async def getEvents():
-        """Get all events"""
-        print(f"inside event service")
-        events = await EventsRepo.findEvents()
-        print(f"event service {events}")
+    async def getEvents(limit: int, after: Optional[str] = None, include_total: bool = False):
+        """Get one page of events"""
+        events = await EventsRepo.findEvents(limit, after, include_total)
         return events
     
     @staticmethod
@@ -35,7 +76,7 @@ class EventService:
             raise Exception(f"Failed to retrieve event: {str(e)}")
     
     @staticmethod
-    def getEventByName(eventName: str):
+    async def getEventByName(eventName: str):
         """
         Get event by name from the database
         
@@ -53,7 +94,7 @@ class EventService:
             if not eventName or not isinstance(eventName, str):
                 raise Exception("Invalid event name provided")
                 
-            event = EventsRepo.findEventByName(eventName)
+            event = await EventsRepo.findEventByName(eventName)
             if not event:
                 return None
             return event
@@ -69,7 +110,7 @@ class EventService:
         return event
     
     @staticmethod
-    def getEventByStateName(stateName: str):
+    async def getEventByStateName(stateName: str):
         """
         Get events by state name from the database
         
@@ -87,7 +128,7 @@ class EventService:
             if not stateName or not isinstance(stateName, str):
                 raise Exception("Invalid state name provided")
                 
-            events = EventsRepo.findEventByStateName(stateName)
+            events = await EventsRepo.findEventByStateName(stateName)
             if not events:
                 return None
             return events
@@ -97,7 +138,7 @@ class EventService:
             raise Exception(f"Failed to retrieve events by state: {str(e)}")
     
     @staticmethod
-    def getEventByCityName(stateName: str, cityName: str):
+    async def getEventByCityName(stateName: str, cityName: str):
         """
         Get events by state name and city name from the database
         
@@ -119,7 +160,7 @@ class EventService:
             if not cityName or not isinstance(cityName, str):
                 raise Exception("Invalid city name provided")
                 
-            events = EventsRepo.findEventByCityName(stateName, cityName)
+            events = await EventsRepo.findEventByCityName(stateName, cityName)
             if not events:
                 return None
             return events
@@ -129,10 +170,12 @@ class EventService:
             raise Exception(f"Failed to retrieve events by city: {str(e)}")
     
     @staticmethod
-    def createEvent(event : EventSchemaAdminReq):
+    async def createEvent(event : EventSchemaAdminReq):
         """Create event"""
         try:
-            returned_event = EventsRepo.createEvent(event)
+            returned_event = await EventsRepo.createEvent(event)
+            if returned_event:
+                event_suggestions.upsert(returned_event)
             return returned_event
         except Exception as e:
             print(f"Error creating event: {str(e)}")
@@ -159,14 +202,297 @@ class EventService:
             event_data = event.model_dump(exclude_unset=True, exclude_none=True)
             print(f"inside event service update {event_data}")
             updated_event = await EventsRepo.updateEvent(eventId, event_data)
+            if event_data.get("slots"):
+                await BookingRepo.sync_slot_capacity(eventId, event_data["slots"])
             print(f"event updated : {updated_event}")
             if not updated_event:
                 return None
+            event_suggestions.upsert(updated_event)
             return updated_event
         except Exception as e:
             print(f"Error updating event: {str(e)}")
             raise Exception(f"Failed to update event: {str(e)}")
         
+    @staticmethod
+    async def filterEvents(
+        state: Optional[str] = None,
+        city: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None
+    ) -> Dict:
+        """
+        Browse events with any combination of filters, with facet counts for the sidebar
+
+        Args:
+            state (Optional[str]): Exact state
+            city (Optional[str]): Exact city
+            category (Optional[str]): Exact category
+            min_price (Optional[float]): Lowest price, inclusive
+            max_price (Optional[float]): Highest price, inclusive
+            date_from (Optional[str]): First date, YYYY-MM-DD
+            date_to (Optional[str]): Last date, YYYY-MM-DD
+            tags (Optional[List[str]]): Tags the event must all have
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data", "next_cursor", "total", "facets"}
+
+        Raises:
+            ValueError: If a range is inverted, a date is malformed or the cursor is invalid
+        """
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError("min_price must not be greater than max_price")
+        for value in (date_from, date_to):
+            if value:
+                try:
+                    date.fromisoformat(value)
+                except ValueError:
+                    raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("date_from must not be after date_to")
+
+        filters = {
+            "state": (state or "").strip() or None,
+            "city": (city or "").strip() or None,
+            "category": (category or "").strip() or None,
+            "min_price": min_price,
+            "max_price": max_price,
+            "date_from": date_from,
+            "date_to": date_to,
+            "tags": sorted({tag.strip() for tag in tags or [] if tag.strip()}) or None,
+        }
+        filters = {name: value for name, value in filters.items() if value is not None}
+        try:
+            return await EventsRepo.filterEvents(filters, limit, after)
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error filtering events: {str(e)}")
+            raise Exception(f"Failed to filter events: {str(e)}")
+
+    @staticmethod
+    async def getUpcomingEvents(
+        starts_from: Optional[str] = None,
+        starts_to: Optional[str] = None,
+        state: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None
+    ) -> Dict:
+        """
+        Get events starting in a time range, soonest first
+
+        Args:
+            starts_from (Optional[str]): ISO date/datetime; defaults to now
+            starts_to (Optional[str]): ISO date/datetime, exclusive
+            state (Optional[str]): Exact state
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...}
+
+        Raises:
+            ValueError: If a bound is malformed, the range is empty or the cursor is invalid
+        """
+        # "Now" is truncated to the minute so repeated calls share a cache entry
+        lower = parse_bound(starts_from) or datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        upper = parse_bound(starts_to)
+        if upper is not None and upper <= lower:
+            raise ValueError("to must be after from")
+        state = (state or "").strip() or None
+        try:
+            return await EventsRepo.findUpcoming(lower, upper, state, limit, after)
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error getting upcoming events: {str(e)}")
+            raise Exception(f"Failed to get upcoming events: {str(e)}")
+
+    @staticmethod
+    async def getEventsNear(
+        lat: float,
+        lng: float,
+        radius_km: float,
+        category: Optional[str] = None,
+        starts_from: Optional[str] = None,
+        starts_to: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None
+    ) -> Dict:
+        """
+        Get events around a point, nearest first
+
+        Args:
+            lat (float): Latitude
+            lng (float): Longitude
+            radius_km (float): Search radius in kilometres
+            category (Optional[str]): Exact category
+            starts_from (Optional[str]): ISO date/datetime, inclusive
+            starts_to (Optional[str]): ISO date/datetime, exclusive
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...}
+
+        Raises:
+            ValueError: If a date bound is malformed or the cursor is invalid
+        """
+        lower = parse_bound(starts_from)
+        upper = parse_bound(starts_to)
+        if lower is not None and upper is not None and upper <= lower:
+            raise ValueError("to must be after from")
+        category = (category or "").strip() or None
+        try:
+            return await EventsRepo.findNear(lat, lng, radius_km * 1000, category, lower, upper, limit, after)
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error getting nearby events: {str(e)}")
+            raise Exception(f"Failed to get nearby events: {str(e)}")
+
+    @staticmethod
+    async def getEventPage(eventId: str) -> Tuple[Optional[Dict], Dict[str, float]]:
+        """
+        Gather everything the event page needs in one call
+
+        The event (which carries its rating summary), applicable offers and slot
+        availability are loaded concurrently, each from its own cache.
+        An optional section that fails or takes longer than SECTION_TIMEOUT comes
+        back as None and is listed in "unavailable" instead of failing the page;
+        the event itself is given EVENT_TIMEOUT.
+
+        Args:
+            eventId (str): The event ID
+
+        Returns:
+            Tuple[Optional[Dict], Dict[str, float]]: The page (None when the event
+            does not exist) and the time each section took in milliseconds
+
+        Raises:
+            ValueError: If the event ID is malformed
+            Exception: If the event itself cannot be loaded
+        """
+        if not ObjectId.is_valid(eventId):
+            raise ValueError("Invalid event ID format")
+
+        timings: Dict[str, float] = {}
+        failures: Dict[str, str] = {}
+
+        async def section(name: str, load, timeout: float = SECTION_TIMEOUT):
+            started = time.perf_counter()
+            try:
+                return await asyncio.wait_for(load(), timeout)
+            except asyncio.TimeoutError:
+                failures[name] = "timeout"
+            except Exception as e:
+                print(f"Error loading event page section {name}: {str(e)}")
+                failures[name] = str(e)
+            finally:
+                timings[name] = (time.perf_counter() - started) * 1000
+            return None
+
+        event, offers, inventory = await asyncio.gather(
+            section("event", lambda: EventsRepo.findEventById(eventId), EVENT_TIMEOUT),
+            section("offers", lambda: page_cache.get_or_load(
+                f"offers:{eventId}", lambda: OffersRepo.find_offers_for_event(eventId)
+            )),
+            section("availability", lambda: availability_cache.get_or_load(
+                eventId, lambda: BookingRepo.slot_inventory(eventId)
+            )),
+        )
+        if "event" in failures:
+            raise Exception(f"Failed to load event: {failures['event']}")
+        if event is None:
+            return None, timings
+
+        page = {
+            "event": event,
+            "rating": summarize(event.get("rating_summary")),
+            "offers": offers,
+            "availability": _slot_availability(event, inventory) if inventory is not None else None,
+            "unavailable": sorted(failures),
+        }
+        return page, timings
+
+    @staticmethod
+    def suggestEvents(q: str, limit: int = 10) -> List[Dict]:
+        """
+        Autocomplete suggestions for the search box, served from memory
+
+        Args:
+            q (str): What the user has typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            List[Dict]: Matching events, most booked first
+        """
+        return event_suggestions.suggest(q, limit)
+
+    @staticmethod
+    async def buildSuggestions() -> int:
+        """Rebuild the autocomplete index from the events and booking counts"""
+        events = await EventsRepo.suggestSource()
+        popularity = await BookingRepo.event_popularity()
+        return event_suggestions.build(events, popularity)
+
+    @staticmethod
+    async def sync_suggestions(interval: float):
+        """
+        Rebuild the autocomplete index now and then every interval seconds until cancelled
+
+        createEvent/updateEvent patch the index of the worker that served them;
+        the periodic rebuild picks up other workers' changes and new bookings.
+        """
+        while True:
+            try:
+                count = await EventService.buildSuggestions()
+                print(f"Autocomplete index built for {count} events")
+            except Exception as e:
+                print(f"Error building autocomplete index: {str(e)}")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def getCacheStats():
+        """Get the event and search cache counters"""
+        return EventsRepo.cacheStats()
+
+    @staticmethod
+    async def searchEvents(q: Optional[str], category: Optional[str], limit: int, after: Optional[str]) -> Dict:
+        """
+        Search events by relevance, optionally within one category
+
+        Args:
+            q (Optional[str]): Search terms
+            category (Optional[str]): Exact category filter
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+
+        Returns:
+            Dict: {"data": [...], "next_cursor": ...}
+
+        Raises:
+            ValueError: If neither q nor category is given, or the cursor is invalid
+        """
+        q = (q or "").strip() or None
+        category = (category or "").strip() or None
+        if q is None and category is None:
+            raise ValueError("Provide a search query or a category")
+        try:
+            return await EventsRepo.searchEvents(q, category, limit, after)
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Error searching events: {str(e)}")
+            raise Exception(f"Failed to search events: {str(e)}")
+
     @staticmethod
     async def getEventsBycategory(category: str):
         """
@@ -1,6 +1,6 @@
 from repository.faqs_repo import FAQsRepo
 from schemas.faqsSchema import FAQsSchemaReq
-from typing import List, Optional
+from typing import Optional
 
 class FAQService:
     @staticmethod
@@ -32,22 +32,23 @@ class FAQService:
             raise Exception(f"Failed to create FAQ: {str(e)}")
     
     @staticmethod
-    async def getAllFAQs() -> List[dict]:
+    async def getAllFAQs(limit: int, after: Optional[str] = None, include_total: bool = False) -> dict:
         """
-        Get all FAQs
+        Get one page of FAQs
         
+        Args:
+            limit (int): Maximum number of FAQs to return
+            after (Optional[str]): The next_cursor of the previous page
+            include_total (bool): Whether to include the total FAQ count
+            
         Returns:
-            List[dict]: List of FAQ documents
-            None: If no FAQs are found
+            dict: The page of FAQ documents
             
         Raises:
             Exception: If there's an error during FAQ retrieval
         """
         try:
-            faqs = await FAQsRepo.getAllFAQs()
-            if not faqs:
-                return None
-            return faqs
+            return await FAQsRepo.getAllFAQs(limit, after, include_total)
             
         except Exception as e:
             print(f"Error retrieving FAQs: {str(e)}")
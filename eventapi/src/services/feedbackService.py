@@ -1,5 +1,22 @@
 from repository.feedback_repo import FeedbackRepo
 from schemas.feedbackSchema import FeedbackSchemaReq
+from utils.batch_writer import BatchWriter, QueueFullError
+from bson import ObjectId
+from typing import Dict
+import os
+
+# Buffered ingestion: with FEEDBACK_BUFFERED=1 submissions are queued and
+# written in batches of FEEDBACK_BATCH_SIZE, or after FEEDBACK_BATCH_DELAY
+# seconds, instead of one insert per request.
+FEEDBACK_BUFFERED = os.environ.get("FEEDBACK_BUFFERED", "0").lower() in ("1", "true", "yes")
+feedback_writer = BatchWriter(
+    FeedbackRepo.addFeedbackBatch,
+    name="feedback",
+    max_batch=int(os.environ.get("FEEDBACK_BATCH_SIZE", 500)),
+    max_delay=float(os.environ.get("FEEDBACK_BATCH_DELAY", 0.2)),
+    max_queue=int(os.environ.get("FEEDBACK_QUEUE_SIZE", 10000)),
+    put_timeout=float(os.environ.get("FEEDBACK_QUEUE_TIMEOUT", 1.0)),
+)
 
 class FeedbackService:
     @staticmethod
@@ -20,12 +37,20 @@ class FeedbackService:
             if not feedback:
                 raise Exception("Feedback data is required")
                 
+            if feedback_writer.running:
+                # Assign the id now so the caller gets it before the batch is written
+                new_feedback = {"_id": ObjectId(), **FeedbackRepo.toDocument(feedback)}
+                await feedback_writer.submit(new_feedback)
+                return new_feedback
+                
             new_feedback = await FeedbackRepo.addFeedback(feedback)
             if not new_feedback:
                 raise Exception("Failed to create feedback")
                 
             return new_feedback
             
+        except QueueFullError:
+            raise
         except Exception as e:
             print(f"Error creating feedback: {str(e)}")
             raise Exception(f"Failed to create feedback: {str(e)}")
@@ -84,4 +109,20 @@ class FeedbackService:
                 
         except Exception as e:
             print(f"Error retrieving feedback: {str(e)}")
-            raise Exception(f"Failed to retrieve feedback: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to retrieve feedback: {str(e)}")
+
+    @staticmethod
+    def start_ingestion():
+        """Start buffered ingestion if FEEDBACK_BUFFERED is set"""
+        if FEEDBACK_BUFFERED:
+            feedback_writer.start()
+
+    @staticmethod
+    async def stop_ingestion():
+        """Write every queued feedback before shutdown"""
+        await feedback_writer.stop()
+
+    @staticmethod
+    def ingestionStats() -> Dict:
+        """Queue depth and insert/failure counters of buffered ingestion"""
+        return {"buffered": FEEDBACK_BUFFERED, **feedback_writer.stats()}
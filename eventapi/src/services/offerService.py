@@ -23,10 +23,10 @@ class OfferService:
             raise Exception(f"Failed to create offer: {str(e)}")
 
     @staticmethod
-    async def get_all_offers() -> List[Dict]:
-        """Get all offers with optional active only filter"""
+    async def get_all_offers(limit: int, after: Optional[str] = None, include_total: bool = False) -> Dict:
+        """Get one page of offers"""
         try:
-            offers = await OffersRepo.find_all_offers()
+            offers = await OffersRepo.find_all_offers(limit, after, include_total)
             return offers
         except Exception as e:
             raise Exception(f"Failed to fetch offers: {str(e)}")
@@ -1,18 +1,71 @@
 from typing import Optional, Dict , List
 from schemas.paymentSchema import PaymentSchemaReq
 from repository.payments_repo import PaymentRepo
-import razorpay
-from razorpay.errors import SignatureVerificationError
+from repository.tickets_repo import TicketsRepo
+from repository.bookings_repo import BookingRepo
+from services.eventService import EventService
+from services.ticketService import TicketService
+from utils.payment_gateway import GatewayError, PaymentGateway, payment_gateway
+from utils.batch_writer import BatchWriter
+from utils.ticket_token import ticket_verifier
+from bson import ObjectId
+import asyncio
 import os
-from dotenv import load_dotenv
+
+# Gateway webhook event -> payment status it moves the payment to
+WEBHOOK_STATUSES = {
+    "payment.captured": "completed",
+    "payment.failed": "failed",
+    "refund.processed": "refunded",
+}
+# Payment / ticket payment_status each status may be reached from; anything
+# else (a redelivery, a failure arriving after the capture) is a no-op
+PAYMENT_TRANSITIONS = {
+    "completed": ["created", "failed"],
+    "failed": ["created"],
+    "refunded": ["completed"],
+}
+# Attempts at a whole webhook batch before it is applied event by event
+WEBHOOK_RETRIES = int(os.environ.get("PAYMENT_WEBHOOK_RETRIES", 3))
+TICKET_TRANSITIONS = {
+    "completed": ["pending", "failed"],
+    "failed": ["pending"],
+    "refunded": ["completed"],
+}
+
+def parse_webhook(payload: Dict, event_id: str) -> Optional[Dict]:
+    """
+    Reduce a gateway webhook payload to the fields the worker needs
+
+    Args:
+        payload (Dict): The webhook body
+        event_id (str): The gateway's event id (X-Razorpay-Event-Id)
+
+    Returns:
+        Optional[Dict]: {"event_id", "event", "status", "order_id", "payment_id",
+        "gateway_created_at"}, or None for events we do not handle
+    """
+    status = WEBHOOK_STATUSES.get(payload.get("event"))
+    if status is None:
+        return None
+    entities = payload.get("payload") or {}
+    payment = (entities.get("payment") or {}).get("entity") or {}
+    refund = (entities.get("refund") or {}).get("entity") or {}
+    return {
+        "event_id": event_id,
+        "event": payload["event"],
+        "status": status,
+        "order_id": payment.get("order_id"),
+        "payment_id": payment.get("id") or refund.get("payment_id"),
+        "gateway_created_at": payload.get("created_at"),
+    }
+
 
 class PaymentService:
-    def __init__(self):
-        client_id ="rzp_test_rJSE0fMsM9i0lv"
-        client_secret = "bowX7pTbpno8sbVFugSpcHGo"
-        self.client = razorpay.Client(auth=(client_id, client_secret))
-        print(f"client_id {client_id} , client_secret {client_secret}")
-        print(f"selct client {self.client}")
+    def __init__(self, gateway: Optional[PaymentGateway] = None):
+        # The shared gateway pools connections across requests; pass another
+        # implementation (or one pointed at the fake gateway) in tests
+        self.gateway = gateway or payment_gateway
         
     async def create_payment(self, payment_data: PaymentSchemaReq) -> Dict:
         """
@@ -27,7 +80,6 @@ class PaymentService:
         Raises:
             Exception: If there's an error creating the payment
         """
-        print(f"create payment {payment_data}")
         try:
             if not payment_data.amount or payment_data.amount <= 0:
                 raise ValueError("Amount must be greater than 0")
@@ -36,25 +88,13 @@ class PaymentService:
                 raise ValueError("Invalid currency. Supported currencies: INR, USD")
 
             amount = int(payment_data.amount * 100)  # Convert to paise
-            currency = payment_data.currency
-            print(f"amount {amount} , currency {currency}")
-            # Create Razorpay order
-            order_data = {
-            "amount": amount,
-            "currency": currency,
-            "payment_capture": 1,
-            "notes": {
-                "payment_for": "Event Registration"
-            }
-            }
-        
-            print(f"Attempting to create Razorpay order with data: {order_data}")
             try:
-                razorpay_order = self.client.order.create(
-                    data = order_data
-                )   
-                print(f"Razorpay order created successfully: {razorpay_order}")
-            except Exception as razorpay_error:
+                razorpay_order = await self.gateway.create_order(
+                    amount,
+                    payment_data.currency,
+                    notes={"payment_for": "Event Registration"}
+                )
+            except GatewayError as razorpay_error:
                 print(f"Error creating Razorpay order: {razorpay_error}")
                 raise Exception("Failed to create Razorpay order") 
             # Prepare payment data with Razorpay order details
@@ -63,7 +103,6 @@ class PaymentService:
                 "status": "created",
                 "razorpay_order_id": razorpay_order['id']
             }
-            print(f"razorpay order {razorpay_order}")
             # Store payment in the database
             payment = await PaymentRepo.create_payment(payment_record)
             return payment
@@ -71,7 +110,6 @@ class PaymentService:
             raise Exception(f"Error creating payment: {str(e)}")
 
     async def verify_payment(self, razorpay_payment_id: str, razorpay_order_id: str, razorpay_signature: str) -> bool:
-        print(f"verify payment {razorpay_payment_id}, {razorpay_order_id}, {razorpay_signature}")
         """
         Verify Razorpay payment signature
         
@@ -87,15 +125,7 @@ class PaymentService:
             Exception: If there's an error verifying the payment
         """
         try:
-            # Verify payment signature
-            self.client.utility.verify_payment_signature({
-                'razorpay_order_id': razorpay_order_id,
-                'razorpay_payment_id': razorpay_payment_id,
-                'razorpay_signature': razorpay_signature
-            })
-            return True
-        except razorpay.errors.SignatureVerificationError:
-            return False
+            return self.gateway.verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature)
         except Exception as e:
             raise Exception(f"Error verifying payment: {str(e)}")
 
@@ -118,9 +148,171 @@ class PaymentService:
         except Exception as e:
             raise Exception(f"Error updating payment status: {str(e)}")
         
-    async def get_all_payments(self) -> List[Dict]:
-        print("get all payments")
-        return await PaymentRepo.get_all_payments()
+    async def get_all_payments(self, limit: int, after: Optional[str] = None, include_total: bool = False) -> Dict:
+        return await PaymentRepo.get_all_payments(limit, after, include_total)
     
     async def get_payment_by_id(self,payment_id: str) -> Optional[Dict]:
-        return await PaymentRepo.get_payment_by_id(payment_id)
\ No newline at end of file
+        return await PaymentRepo.get_payment_by_id(payment_id)
+
+    async def receive_webhook(self, body: bytes, signature: str, payload: Dict, event_id: str) -> str:
+        """
+        Verify, deduplicate and queue a gateway webhook event
+
+        Args:
+            body (bytes): The raw request body the signature covers
+            signature (str): The X-Razorpay-Signature header
+            payload (Dict): The parsed body
+            event_id (str): The gateway's event id
+
+        Returns:
+            str: "queued", "applied" (no worker running), "duplicate" or "ignored"
+
+        Raises:
+            ValueError: If the signature does not match
+            QueueFullError: If the worker queue stays full; the event is forgotten
+                so the gateway's retry is processed
+            Exception: If the event could not be recorded
+        """
+        if not self.gateway.verify_webhook_signature(body, signature):
+            raise ValueError("Invalid webhook signature")
+        event = parse_webhook(payload, event_id)
+        if event is None:
+            return "ignored"
+        if not await PaymentRepo.record_webhook(event):
+            # A redelivery of a dead-lettered event gets another try
+            if not await PaymentRepo.retry_failed_webhook(event_id):
+                return "duplicate"
+        try:
+            if not webhook_writer.running:
+                await PaymentService.apply_webhook_events([event])
+                return "applied"
+            await webhook_writer.submit(event)
+            return "queued"
+        except Exception:
+            await PaymentRepo.forget_webhook(event_id)
+            raise
+
+    @staticmethod
+    async def apply_webhook_events(events: List[Dict]) -> int:
+        """
+        Apply a batch of webhook events to payments, tickets and bookings
+
+        Payments move with one ordered bulk write; their tickets then follow
+        the payment's resulting status in a second bulk write (a completed
+        payment confirms the ticket and re-signs its QR token with the paid
+        flag, a refund cancels and revokes it). Completed payments confirm
+        their bookings; failed and refunded ones cancel theirs, which gives
+        the seats back. Every step is guarded by the current state, so
+        replaying a batch is safe.
+
+        Args:
+            events (List[Dict]): Events from parse_webhook
+
+        Returns:
+            int: Number of events applied
+
+        Raises:
+            Exception: If any step fails; the steps are idempotent, so the
+            batch can simply be applied again
+        """
+        transitions = [{**event, "from": PAYMENT_TRANSITIONS[event["status"]]} for event in events]
+        payments = await PaymentRepo.apply_transitions(transitions)
+
+        by_ticket = {
+            ObjectId(str(payment["ticket_id"])): payment
+            for payment in payments
+            if ObjectId.is_valid(str(payment.get("ticket_id")))
+        }
+        tickets = await TicketsRepo.get_qr_payloads(list(by_ticket)) if by_ticket else []
+        event_docs = {}
+        updates = []
+        for ticket in tickets:
+            status = by_ticket[ticket["_id"]]["status"]
+            if ticket.get("payment_status") not in TICKET_TRANSITIONS.get(status, []):
+                continue
+            changes = {"payment_status": status}
+            if status == "completed":
+                event_id = str(ticket["event"])
+                if event_id not in event_docs and ObjectId.is_valid(event_id):
+                    event_docs[event_id] = await EventService.getEventById(event_id)
+                ticket["payment_status"] = status
+                changes["status"] = "confirmed"
+                changes["qr_payload"] = TicketService.generate_qr_code_data(ticket, event_docs.get(event_id))
+            elif status == "refunded":
+                # A refunded ticket must stop passing at the gate
+                changes["status"] = "cancelled"
+            updates.append({"ticket_id": ticket["_id"], "from": TICKET_TRANSITIONS[status], "changes": changes})
+        await TicketsRepo.update_payment_statuses(updates)
+        for update in updates:
+            if update["changes"]["payment_status"] == "refunded":
+                ticket_verifier.revoke(str(update["ticket_id"]))
+
+        await BookingRepo.confirm_paid([payment["_id"] for payment in payments if payment["status"] == "completed"])
+        await BookingRepo.cancel_for_payments(
+            [payment["_id"] for payment in payments if payment["status"] == "failed"], "payment_failed"
+        )
+        await BookingRepo.cancel_for_payments(
+            [payment["_id"] for payment in payments if payment["status"] == "refunded"], "refunded"
+        )
+        await PaymentRepo.mark_webhooks_applied([event["event_id"] for event in events])
+        return len(events)
+
+    @staticmethod
+    async def _write_webhook_batch(events: List[Dict]) -> int:
+        """
+        Webhook worker write: apply a batch, retrying, then event by event
+
+        A batch that keeps failing is split so one bad event cannot hold
+        back the others; events that still fail are dead-lettered on their
+        payment_webhooks row (failed_at, error) and are queued again when
+        the gateway redelivers them or on the next startup.
+        """
+        for attempt in range(1, WEBHOOK_RETRIES + 1):
+            try:
+                return await PaymentService.apply_webhook_events(events)
+            except Exception as e:
+                print(f"Error applying {len(events)} payment webhook events (attempt {attempt}): {str(e)}")
+                if attempt < WEBHOOK_RETRIES:
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+        applied = 0
+        for event in events:
+            try:
+                applied += await PaymentService.apply_webhook_events([event])
+            except Exception as e:
+                print(f"Payment webhook event {event['event_id']} failed: {str(e)}")
+                try:
+                    await PaymentRepo.mark_webhook_failed(event["event_id"], str(e))
+                except Exception as mark_error:
+                    print(f"Error dead-lettering webhook event {event['event_id']}: {str(mark_error)}")
+        return applied
+
+    @staticmethod
+    async def start_webhooks() -> None:
+        """Start the webhook worker and queue events a previous process left unapplied"""
+        webhook_writer.start()
+        try:
+            for event in await PaymentRepo.pending_webhooks():
+                await webhook_writer.submit(event)
+        except Exception as e:
+            print(f"Error replaying payment webhooks: {str(e)}")
+
+    @staticmethod
+    async def stop_webhooks() -> None:
+        """Apply every queued webhook event before shutdown"""
+        await webhook_writer.stop()
+
+    @staticmethod
+    def webhookStats() -> Dict:
+        """Queue depth and applied/failure counters of the webhook worker"""
+        return webhook_writer.stats()
+
+
+# Webhook events are acknowledged once recorded and applied in batches
+webhook_writer = BatchWriter(
+    PaymentService._write_webhook_batch,
+    name="payment webhooks",
+    max_batch=int(os.environ.get("PAYMENT_WEBHOOK_BATCH_SIZE", 200)),
+    max_delay=float(os.environ.get("PAYMENT_WEBHOOK_BATCH_DELAY", 0.05)),
+    max_queue=int(os.environ.get("PAYMENT_WEBHOOK_QUEUE_SIZE", 10000)),
+    put_timeout=float(os.environ.get("PAYMENT_WEBHOOK_QUEUE_TIMEOUT", 0.5)),
+)
@@ -1,7 +1,9 @@
-from repository.review_repo import ReviewRepo
+from repository.review_repo import ReviewRepo, summarize
+from repository.events_repo import EventsRepo
+from db.pagination import DEFAULT_PAGE_SIZE
+from typing import Dict, Optional
 from schemas.reviewSchema import ReviewSchemaReq
 from bson import ObjectId
-from services.userService import UserService
 
 class ReviewService:
 
@@ -34,32 +36,69 @@ class ReviewService:
             raise Exception(f"Failed to create review: {str(e)}")
     
     @staticmethod
-    async def getReviewForEvent(event: ObjectId):
+    async def getReviewForEvent(
+        event: ObjectId,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort_by: str = "recent"
+    ) -> Dict:
         """
-        Get all reviews for a specific event
+        Get one page of reviews for a specific event
         
         Args:
             event (ObjectId): The ID of the event to get reviews for
+            limit (int): Page size
+            after (Optional[str]): The next_cursor of the previous page
+            sort_by (str): "recent" or "rating"
             
         Returns:
-            list: List of review documents if found
-            None: If no reviews are found
+            Dict: {"data": [...], "next_cursor": ...}
             
         Raises:
+            ValueError: If ``after`` is not a valid cursor
             Exception: If there's an error during the database operation
         """
         try:
             if not ObjectId.is_valid(event):
                 raise Exception("Invalid event ID format")
                 
-            reviews = await ReviewRepo.getReviewByEvent(event)
-            if not reviews:
-                return None
-            return reviews
+            return await ReviewRepo.getReviewByEvent(event, limit, after, sort_by)
             
+        except ValueError:
+            raise
         except Exception as e:
             print(f"Error retrieving reviews for event: {str(e)}")
             raise Exception(f"Failed to retrieve reviews for event: {str(e)}")
+
+    @staticmethod
+    async def getRatingSummary(event: str) -> Optional[Dict]:
+        """
+        Get the rating count, average and 1-5 histogram of an event
+        
+        Args:
+            event (str): The ID of the event
+            
+        Returns:
+            Dict: {"count", "average", "stars"}
+            None: If the event does not exist
+        """
+        try:
+            if not ObjectId.is_valid(event):
+                raise Exception("Invalid event ID format")
+                
+            found = await EventsRepo.findEventById(event)
+            if not found:
+                return None
+            return summarize(found.get("rating_summary"))
+            
+        except Exception as e:
+            print(f"Error retrieving rating summary: {str(e)}")
+            raise Exception(f"Failed to retrieve rating summary: {str(e)}")
+
+    @staticmethod
+    async def rebuildSummaries() -> Dict:
+        """Recompute every event's rating summary from the reviews"""
+        return await ReviewRepo.rebuildSummaries()
     
     @staticmethod
     async def getReviewForUser(email: str):
@@ -80,21 +119,10 @@ class ReviewService:
             if not email:
                 raise Exception("Email is required")
                 
-            print("hw")
-            # First get the user ID from the email
-            user = UserService.GetUserByEmail(email)
-            print(f"user {user}")
-            if not user:
+            # email -> user -> reviews -> event titles in one aggregation
+            reviews = await ReviewRepo.getReviewsByEmail(email)
+            if reviews is None:
                 raise Exception("User not found")
-                
-            user_id = user['_id']
-            print(f"user id {user_id} {type(user_id)}")
-            if not user_id:
-                raise Exception("User ID not found")
-                
-            # Get reviews for the user
-            reviews = await ReviewRepo.getReviewByUser(user_id)
-            print(f"reviews {reviews}")
             if not reviews:
                 return None
             return reviews
@@ -1,18 +1,27 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from schemas.ticketSchema import TicketSchemaReq
 from repository.tickets_repo import TicketsRepo
-import qrcode
-import base64
-import io
-import uuid
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from services.eventService import EventService
+from utils.ticket_token import sign_ticket, verify_ticket_token, ticket_verifier
+from utils.qr import get_qr_image, qr_etag
+import asyncio
+
+# Tokens stay valid until a day after the event ends, or this long after
+# purchase when the event has no parseable date
+TICKET_TOKEN_TTL = timedelta(days=365)
+EVENT_GRACE = timedelta(days=1)
 
 class TicketService:
     @staticmethod
     async def create_ticket(ticket_data: TicketSchemaReq) -> Dict:
-        print(f"ticket service {ticket_data}")
         """
         Create a new ticket
         
+        The _id and ticket number are assigned up front so the signed QR
+        payload is stored by the same insert.
+        
         Args:
             ticket_data (TicketSchemaReq): The ticket data
             
@@ -23,17 +32,18 @@ class TicketService:
             Exception: If there's an error creating the ticket
         """
         try:
-            # Create the ticket
-            ticket = await TicketsRepo.create_ticket(ticket_data)
-            
+            ticket_id = ObjectId()
+            ticket_number = TicketsRepo.new_ticket_number()
+            event = None
+            if ObjectId.is_valid(ticket_data.event):
+                event = await EventService.getEventById(ticket_data.event)
+            qr_payload = TicketService.generate_qr_code_data(
+                {"_id": ticket_id, "event": ticket_data.event, "persons": ticket_data.persons},
+                event
+            )
+            ticket = await TicketsRepo.create_ticket(ticket_data, ticket_id, ticket_number, qr_payload)
             if ticket:
-                # Generate QR code
-                qr_data = await TicketService.generate_qr_code_data(str(ticket["_id"]), ticket["ticket_number"])
-                print(f"QR code data: {qr_data}")
-                # Update ticket with QR code
-                updated_ticket = await TicketsRepo.generate_qr_code(str(ticket["_id"]), qr_data)
-                print(f"Updated ticket: {updated_ticket}")
-                return updated_ticket if updated_ticket else ticket
+                return ticket
             
             raise Exception("Failed to create ticket")
         except Exception as e:
@@ -129,10 +139,14 @@ class TicketService:
             Optional[Dict]: The updated ticket if found, None otherwise
             
         Raises:
-            Exception: If there's an error confirming the ticket
+            Exception: If the ticket was cancelled (its token stays revoked) or
+                there's an error confirming the ticket
         """
         try:
-            return await TicketsRepo.update_ticket_status(ticket_id, "confirmed")
+            ticket = await TicketsRepo.update_ticket_status(ticket_id, "confirmed")
+            if ticket is None and await TicketsRepo.get_ticket_by_id(ticket_id):
+                raise ValueError("Cancelled tickets cannot be confirmed")
+            return ticket
         except Exception as e:
             raise Exception(f"Error confirming ticket: {str(e)}")
     
@@ -151,7 +165,10 @@ class TicketService:
             Exception: If there's an error cancelling the ticket
         """
         try:
-            return await TicketsRepo.update_ticket_status(ticket_id, "cancelled")
+            ticket = await TicketsRepo.update_ticket_status(ticket_id, "cancelled")
+            if ticket:
+                ticket_verifier.revoke(ticket_id)
+            return ticket
         except Exception as e:
             raise Exception(f"Error cancelling ticket: {str(e)}")
     
@@ -171,13 +188,22 @@ class TicketService:
             Exception: If there's an error updating payment status
         """
         try:
-            ticket = await TicketsRepo.update_payment_status(ticket_id, payment_status)
+            if payment_status != "completed":
+                return await TicketsRepo.update_payment_status(ticket_id, payment_status)
             
-            # If payment is completed, also confirm the ticket
-            if payment_status == "completed" and ticket:
-                ticket = await TicketsRepo.update_ticket_status(ticket_id, "confirmed")
-                
-            return ticket
+            # Completing the payment confirms the ticket and re-issues its
+            # token with the paid flag, all in one update
+            ticket = await TicketsRepo.get_qr_payload(ticket_id)
+            if not ticket:
+                return None
+            ticket["payment_status"] = "completed"
+            event = await EventService.getEventById(str(ticket["event"]))
+            return await TicketsRepo.update_payment_status(
+                ticket_id,
+                payment_status,
+                status="confirmed",
+                qr_payload=TicketService.generate_qr_code_data(ticket, event)
+            )
         except Exception as e:
             raise Exception(f"Error updating payment status: {str(e)}")
     
@@ -196,62 +222,84 @@ class TicketService:
             Exception: If there's an error deleting the ticket
         """
         try:
-            return await TicketsRepo.delete_ticket(ticket_id)
+            deleted = await TicketsRepo.delete_ticket(ticket_id)
+            if deleted:
+                ticket_verifier.revoke(ticket_id)
+            return deleted
         except Exception as e:
             raise Exception(f"Error deleting ticket: {str(e)}")
     
     @staticmethod
-    async def generate_qr_code_data(ticket_id: str, ticket_number: str) -> str:
+    def generate_qr_code_data(ticket: Dict, event: Optional[Dict] = None) -> str:
         """
-        Generate QR code for a ticket
+        Generate the signed QR token for a ticket
+        
+        Args:
+            ticket (Dict): The ticket (needs _id, event, persons; payment_status sets the paid flag)
+            event (Optional[Dict]): The ticket's event, whose ends_at bounds the token's validity
+            
+        Returns:
+            str: The compact signed token encoded into the QR code
+        """
+        expires_at = ObjectId(ticket["_id"]).generation_time + TICKET_TOKEN_TTL
+        ends_at = (event or {}).get("ends_at")
+        if isinstance(ends_at, datetime):
+            # Mongo hands back naive UTC datetimes
+            if ends_at.tzinfo is None:
+                ends_at = ends_at.replace(tzinfo=timezone.utc)
+            expires_at = ends_at + EVENT_GRACE
+        return sign_ticket(
+            str(ticket["_id"]),
+            str(ticket["event"]),
+            int(ticket["persons"]),
+            int(expires_at.timestamp()),
+            paid=ticket.get("payment_status") == "completed"
+        )
+    
+    @staticmethod
+    async def get_qr_image(ticket_id: str, fmt: str, if_none_match: Optional[str] = None) -> Optional[Tuple[Optional[bytes], str]]:
+        """
+        Get the rendered QR code of a ticket
         
         Args:
             ticket_id (str): The ticket ID
-            ticket_number (str): The ticket number
+            fmt (str): "png" or "svg"
+            if_none_match (Optional[str]): The request's If-None-Match header
             
         Returns:
-            str: Base64 encoded QR code image
+            Optional[Tuple[Optional[bytes], str]]: The image and its ETag; the image is
+            None when the client's copy is current. None if the ticket does not exist
             
         Raises:
-            Exception: If there's an error generating the QR code
+            Exception: If there's an error rendering the QR code
         """
         try:
-            # Create QR code data with ticket ID and number for verification
-            qr_data = {
-                "id": ticket_id,
-                "number": ticket_number,
-                "verification": uuid.uuid4().hex
-            }
-            
-            # Generate QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(str(qr_data))
-            qr.make(fit=True)
-            
-            # Create QR code image
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            img.save(buffer)
-            qr_base64 = base64.b64encode(buffer.getvalue()).decode()
-            
-            return f"data:image/png;base64,{qr_base64}"
+            ticket = await TicketsRepo.get_qr_payload(ticket_id)
+            if not ticket:
+                return None
+            payload = ticket.get("qr_payload")
+            if not payload:
+                # Tickets created before tokens were stored get one derived on the fly
+                event = await EventService.getEventById(str(ticket["event"]))
+                payload = TicketService.generate_qr_code_data(ticket, event)
+            etag = qr_etag(payload, fmt)
+            if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+                return None, etag
+            return await get_qr_image(payload, fmt)
         except Exception as e:
             raise Exception(f"Error generating QR code: {str(e)}")
     
     @staticmethod
-    async def verify_ticket(ticket_number: str) -> Dict:
+    async def verify_ticket(token: str) -> Dict:
         """
         Verify a ticket for event entry
         
+        Scanned QR tokens are checked offline against the signature, expiry
+        and the local revocation set. A typed-in ticket number ("TKT-...")
+        falls back to a database lookup.
+        
         Args:
-            ticket_number (str): The ticket number to verify
+            token (str): The scanned token or the ticket number
             
         Returns:
             Dict: Verification result with ticket details
@@ -259,6 +307,9 @@ class TicketService:
         Raises:
             Exception: If there's an error verifying the ticket
         """
+        if not token.startswith("TKT-"):
+            return verify_ticket_token(token)
+        ticket_number = token
         try:
             ticket = await TicketsRepo.get_ticket_by_number(ticket_number)
             
@@ -296,18 +347,44 @@ class TicketService:
             raise Exception(f"Error verifying ticket: {str(e)}")
 
     @staticmethod
-    async def get_all_tickets() -> List[Dict]:
+    async def refresh_revocations() -> int:
+        """
+        Load the cancelled tickets into the local revocation set
+        
+        Returns:
+            int: Number of revoked tickets
+        """
+        ticket_verifier.load_revocations(await TicketsRepo.get_cancelled_ticket_ids())
+        return ticket_verifier.revoked_count()
+    
+    @staticmethod
+    async def sync_revocations(interval: float):
+        """Keep the revocation set in step with other workers until cancelled"""
+        while True:
+            try:
+                await TicketService.refresh_revocations()
+            except Exception as e:
+                print(f"Error refreshing ticket revocations: {str(e)}")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    async def get_all_tickets(limit: int, after: Optional[str] = None, include_total: bool = False) -> Dict:
         """
-        Get all tickets
+        Get one page of tickets
         
+        Args:
+            limit (int): Maximum number of tickets to return
+            after (Optional[str]): The next_cursor of the previous page
+            include_total (bool): Whether to include the total ticket count
+            
         Returns:
-            List[Dict]: List of all tickets
+            Dict: The page of tickets
             
         Raises:
             Exception: If there's an error retrieving tickets
         """
         try:
-            tickets = await TicketsRepo.get_all_tickets()
+            tickets = await TicketsRepo.get_all_tickets(limit, after, include_total)
             return tickets
         except Exception as e:
             raise Exception(f"Error retrieving tickets: {str(e)}")
\ No newline at end of file
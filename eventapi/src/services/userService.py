@@ -1,12 +1,14 @@
 from repository.user_repo import UserRepo
+from dependency.auth import revoke_principal
 from schemas.authentication import RegistrationReq , LoginReq
+from typing import Optional
 import bcrypt
 
 class UserService:
     @staticmethod
-    def RegisterUser(user : RegistrationReq):
+    async def RegisterUser(user : RegistrationReq):
         """Register a user after checking if email is not exists"""
-        ifUserPresent = UserRepo.findUserByEmail(user.email)
+        ifUserPresent = await UserRepo.findUserByEmail(user.email)
         if ifUserPresent:
             return{
                 "error":"User Already Exists"
@@ -16,8 +18,9 @@ class UserService:
 
         hash_password =  bcrypt.hashpw(user.password.encode('utf-8') , bcrypt.gensalt())
         user.password = hash_password.decode('utf-8')
-        newUser =UserRepo.insertUser(user)
+        newUser = await UserRepo.insertUser(user)
         return{
+            "_id": newUser["_id"],
             "name": newUser["name"],
             "lastname": newUser["lastname"],
             "email": newUser["email"],
@@ -27,9 +30,9 @@ class UserService:
         }
     
     @staticmethod
-    def LoginUser(user : LoginReq):
+    async def LoginUser(user : LoginReq):
         """Login a user by checking email exists"""
-        ifUserPresent = UserRepo.findUserByEmail(user.email)
+        ifUserPresent = await UserRepo.findUserByEmail(user.email)
         if ifUserPresent is None:
             return{
                 "error":"Please Logon First"
@@ -39,13 +42,14 @@ class UserService:
             "messge":"Login success",
             "_id":ifUserPresent["_id"],
             "email":ifUserPresent["email"],
+            "role":ifUserPresent.get("role", "user"),
             "password":ifUserPresent["password"]
         }
     
     @staticmethod
-    def GetUserByEmail(email : str):
+    async def GetUserByEmail(email : str):
         """Get user by email"""
-        user = UserRepo.findUserByEmail(email)
+        user = await UserRepo.findUserByEmail(email)
         if user is None:
             return{
                 "error":"User not found"
@@ -58,13 +62,41 @@ class UserService:
         }
     
     @staticmethod
-    async def GetAllUsers():
+    async def GetAllUsers(limit: int, after: Optional[str] = None, include_total: bool = False):
         """
-        Get all users from the database
+        Get one page of users from the database
         """
-        users = await UserRepo.getAllUsers()
+        users = await UserRepo.getAllUsers(limit, after, include_total)
         if users is None:
             return{
                 "error":"No users found"
             }
-        return users
\ No newline at end of file
+        return users
+
+    @staticmethod
+    async def UpdateUserRole(email: str, role: str):
+        """
+        Change a user's role and revoke the tokens issued with the old one
+        """
+        user = await UserRepo.updateUserRole(email, role)
+        if user is None:
+            return{
+                "error":"User not found"
+            }
+        await revoke_principal(email)
+        return user
+
+    @staticmethod
+    async def DeleteUser(email: str):
+        """
+        Delete a user and revoke every token issued to them
+        """
+        deleted = await UserRepo.deleteUser(email)
+        if not deleted:
+            return{
+                "error":"User not found"
+            }
+        await revoke_principal(email)
+        return{
+            "message":"User deleted successfully"
+        }
@@ -0,0 +1,80 @@
+"""
+Shared test setup.
+
+The repositories bind their collections when they are imported, so the
+Mongo singleton is pointed at an in-memory mongomock-motor client before
+any of them load. Each test starts with empty collections carrying the
+registered indexes (unique keys matter for idempotency).
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+from mongomock.collection import BulkOperationBuilder
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connect import MongoDBSingleton  # noqa: E402
+
+
+def _ignore_sort(add):
+    # pymongo 4.11 passes sort= to bulk update/replace ops, which mongomock predates
+    def wrapper(self, *args, sort=None, **kwargs):
+        return add(self, *args, **kwargs)
+    return wrapper
+
+
+BulkOperationBuilder.add_update = _ignore_sort(BulkOperationBuilder.add_update)
+BulkOperationBuilder.add_replace = _ignore_sort(BulkOperationBuilder.add_replace)
+
+
+def _round_trip(method):
+    # mongomock answers without suspending; yield first like a real round
+    # trip so concurrent coroutines interleave between database calls
+    async def wrapper(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ("bulk_write", "count_documents", "delete_many", "delete_one", "find_one", "find_one_and_delete",
+              "find_one_and_update", "insert_many", "insert_one", "replace_one", "update_many", "update_one"):
+    setattr(AsyncMongoMockCollection, _name, _round_trip(getattr(AsyncMongoMockCollection, _name)))
+
+_mongo = MongoDBSingleton()
+_mongo.client = AsyncMongoMockClient()
+_mongo.db = _mongo.client["eventmanagement"]
+
+from db import indexes  # noqa: E402
+from utils import fake_gateway, ticket_token  # noqa: E402
+from utils.payment_gateway import RazorpayGateway  # noqa: E402
+
+indexes.load_registry()
+
+
+async def _reset(db) -> None:
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
+    await indexes.ensure_indexes(db)
+
+
+@pytest.fixture(autouse=True)
+def db():
+    asyncio.run(_reset(_mongo.db))
+    # Modules hold the shared verifier, so reset it in place: a signing key
+    # (no ../.env here) and an empty revocation set
+    ticket_token.ticket_verifier.__init__("test-signing-key")
+    return _mongo.db
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """A RazorpayGateway talking in-process to utils/fake_gateway.py, without latency"""
+    monkeypatch.setattr(fake_gateway, "LATENCY", 0)
+    monkeypatch.setattr(fake_gateway, "orders", {})
+    client = RazorpayGateway("key", "secret", base_url="http://fake/v1", retries=0)
+    client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_gateway.app), base_url="http://fake/v1")
+    return client
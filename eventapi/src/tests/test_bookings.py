@@ -0,0 +1,75 @@
+import asyncio
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from repository.bookings_repo import bookings_collection, events_collection, inventory_collection
+from schemas.bookingSchema import AttendeeDetail, BookingSchemaReq, BookingSchemaRes
+from services.bookingService import BookingService
+
+
+async def _event(capacity: int) -> ObjectId:
+    result = await events_collection.insert_one({"name": "Gig", "slots": [{"name": "General", "capacity": capacity}]})
+    return result.inserted_id
+
+
+def _request(event_id: ObjectId, quantity: int = 1) -> BookingSchemaReq:
+    return BookingSchemaReq(
+        user_id=str(ObjectId()),
+        event_id=str(event_id),
+        slot_name="General",
+        quantity=quantity,
+        total_amount=500.0 * quantity,
+        attendee_details=[AttendeeDetail(name="Asha", email="asha@example.com")],
+    )
+
+
+def test_create_booking_returns_the_stored_booking():
+    async def run():
+        event_id = await _event(capacity=10)
+        booking = await BookingService.create_booking(_request(event_id, quantity=2))
+        stored = await bookings_collection.find_one({"_id": booking["_id"]})
+        slot = await inventory_collection.find_one({"event_id": event_id})
+        return booking, stored, slot
+
+    booking, stored, slot = asyncio.run(run())
+    assert booking["booking_number"] == stored["booking_number"]
+    assert booking["status"] == "pending"
+    assert slot["sold"] == 2
+    # The response schema accepts the raw document's ObjectIds
+    assert BookingSchemaRes(**booking).model_dump(by_alias=True)["event_id"] == str(booking["event_id"])
+
+
+def test_concurrent_bookings_never_oversell():
+    capacity, attempts = 10, 60
+
+    async def run():
+        event_id = await _event(capacity=capacity)
+        results = await asyncio.gather(
+            *(BookingService.create_booking(_request(event_id)) for _ in range(attempts)),
+            return_exceptions=True
+        )
+        slot = await inventory_collection.find_one({"event_id": event_id})
+        stored = await bookings_collection.count_documents({"event_id": event_id})
+        return results, slot, stored
+
+    results, slot, stored = asyncio.run(run())
+    booked = [result for result in results if isinstance(result, dict)]
+    sold_out = [result for result in results if isinstance(result, HTTPException) and result.status_code == 409]
+    assert len(booked) == capacity
+    assert len(sold_out) == attempts - capacity
+    assert slot["sold"] == capacity
+    assert stored == capacity
+
+
+def test_concurrent_cancellations_release_seats_once():
+    async def run():
+        event_id = await _event(capacity=5)
+        booking = await BookingService.create_booking(_request(event_id, quantity=3))
+        await asyncio.gather(
+            *(BookingService.update_booking_status(str(booking["_id"]), "cancelled") for _ in range(10))
+        )
+        return await inventory_collection.find_one({"event_id": event_id})
+
+    slot = asyncio.run(run())
+    assert slot["sold"] == 0
@@ -0,0 +1,166 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from db.connect import MongoDBSingleton
+from repository.bookings_repo import SoldOutError, bookings_collection, events_collection, inventory_collection
+from repository.payments_repo import payments_collection
+from repository.tickets_repo import tickets_collection
+from schemas.checkoutSchema import CheckoutSchemaReq
+from services import checkoutService
+from services.checkoutService import CheckoutService
+from services.paymentService import PaymentService
+from utils import fake_gateway
+from utils.payment_gateway import GatewayError
+
+
+class _Session:
+    """mongomock has no sessions; run the transaction body directly"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        return await callback(None)
+
+
+@pytest.fixture(autouse=True)
+def checkout_gateway(gateway, monkeypatch):
+    monkeypatch.setattr(checkoutService, "payment_gateway", gateway)
+
+    async def start_session():
+        return _Session()
+
+    monkeypatch.setattr(MongoDBSingleton().client, "start_session", start_session)
+
+
+async def _event(capacity: int = 2) -> ObjectId:
+    result = await events_collection.insert_one({
+        "name": "Gig",
+        "date": "2030-01-01",
+        "price": 500,
+        "slots": [{"name": "General", "capacity": capacity, "price": 500}],
+    })
+    return result.inserted_id
+
+
+async def _checkout(event_id: ObjectId, quantity: int = 1):
+    request = CheckoutSchemaReq(user_id=str(ObjectId()), event_id=str(event_id), slot_name="General", quantity=quantity)
+    return await CheckoutService.checkout(request)
+
+
+async def _sold(event_id: ObjectId) -> int:
+    return (await inventory_collection.find_one({"event_id": event_id}))["sold"]
+
+
+def _failure(order_id: str):
+    return {"event_id": f"evt_fail_{order_id}", "status": "failed", "order_id": order_id, "payment_id": "pay_1"}
+
+
+def _capture(order_id: str):
+    return {"event_id": f"evt_capture_{order_id}", "status": "completed", "order_id": order_id, "payment_id": "pay_1"}
+
+
+def test_checkout_opens_the_order_after_storing_the_booking(gateway):
+    async def run():
+        event_id = await _event()
+        result = await _checkout(event_id, quantity=2)
+        payment = await payments_collection.find_one({"_id": result["payment"]["_id"]})
+        return result, payment, await _sold(event_id)
+
+    result, payment, sold = asyncio.run(run())
+    assert result["order"]["id"] in fake_gateway.orders
+    assert payment["razorpay_order_id"] == result["order"]["id"]
+    assert result["order"]["amount"] == 100000
+    assert sold == 2
+
+
+def test_gateway_failure_releases_the_seats(gateway, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise GatewayError("Gateway unavailable")
+
+    monkeypatch.setattr(gateway, "create_order", unavailable)
+
+    async def run():
+        event_id = await _event()
+        with pytest.raises(GatewayError):
+            await _checkout(event_id)
+        booking = await bookings_collection.find_one({"event_id": event_id})
+        payment = await payments_collection.find_one({"booking_id": booking["_id"]})
+        return booking, payment, await _sold(event_id)
+
+    booking, payment, sold = asyncio.run(run())
+    assert booking["status"] == "cancelled"
+    assert payment["status"] == "failed"
+    assert sold == 0
+
+
+def test_failed_payment_releases_seats_and_late_capture_retakes_them(gateway):
+    async def run():
+        event_id = await _event(capacity=1)
+        result = await _checkout(event_id)
+        order_id = result["order"]["id"]
+
+        await PaymentService.apply_webhook_events([_failure(order_id)])
+        after_failure = await bookings_collection.find_one({"_id": result["booking"]["_id"]}), await _sold(event_id)
+
+        await PaymentService.apply_webhook_events([_capture(order_id)])
+        after_capture = await bookings_collection.find_one({"_id": result["booking"]["_id"]}), await _sold(event_id)
+        ticket = await tickets_collection.find_one({"_id": result["ticket"]["_id"]})
+        return after_failure, after_capture, ticket
+
+    (failed, sold_after_failure), (captured, sold_after_capture), ticket = asyncio.run(run())
+    assert failed["status"] == "cancelled"
+    assert failed["cancel_reason"] == "payment_failed"
+    assert sold_after_failure == 0
+    assert captured["status"] == "confirmed"
+    assert "cancel_reason" not in captured
+    assert sold_after_capture == 1
+    assert ticket["status"] == "confirmed"
+
+
+def test_seats_of_a_failed_payment_can_be_booked_again(gateway):
+    async def run():
+        event_id = await _event(capacity=1)
+        first = await _checkout(event_id)
+        with pytest.raises(SoldOutError):
+            await _checkout(event_id)
+        await PaymentService.apply_webhook_events([_failure(first["order"]["id"])])
+        second = await _checkout(event_id)
+        return second, await _sold(event_id)
+
+    second, sold = asyncio.run(run())
+    assert second["booking"]["status"] == "pending"
+    assert sold == 1
+
+
+def test_expiry_sweep_releases_unpaid_checkouts(gateway):
+    async def run():
+        event_id = await _event(capacity=3)
+        stale = await _checkout(event_id)
+        paid = await _checkout(event_id)
+        fresh = await _checkout(event_id)
+        old = datetime.now() - timedelta(hours=2)
+        await payments_collection.update_many(
+            {"_id": {"$in": [stale["payment"]["_id"], paid["payment"]["_id"]]}},
+            {"$set": {"created_at": old}}
+        )
+        # Paid at the gateway, but the webhook never arrived
+        fake_gateway.orders[paid["order"]["id"]]["status"] = "paid"
+
+        result = await CheckoutService.expire_unpaid(timedelta(minutes=30))
+        bookings = {
+            name: (await bookings_collection.find_one({"_id": checkout["booking"]["_id"]}))["status"]
+            for name, checkout in (("stale", stale), ("paid", paid), ("fresh", fresh))
+        }
+        return result, bookings, await _sold(event_id)
+
+    result, bookings, sold = asyncio.run(run())
+    assert result == {"expired": 1, "completed": 1}
+    assert bookings == {"stale": "cancelled", "paid": "confirmed", "fresh": "pending"}
+    assert sold == 2
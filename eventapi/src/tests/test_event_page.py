@@ -0,0 +1,23 @@
+import asyncio
+
+from bson import ObjectId
+
+from repository.events_repo import EventsRepo
+from services import eventService
+from services.eventService import EventService
+
+
+def test_slow_event_load_does_not_fail_the_page(monkeypatch):
+    event_id = ObjectId()
+
+    async def slow_event(eventId):
+        await asyncio.sleep(0.05)
+        return {"_id": event_id, "name": "Gig", "slots": []}
+
+    monkeypatch.setattr(eventService, "SECTION_TIMEOUT", 0.01)
+    monkeypatch.setattr(EventsRepo, "findEventById", staticmethod(slow_event))
+    page, timings = asyncio.run(EventService.getEventPage(str(event_id)))
+
+    assert page["event"]["_id"] == event_id
+    assert "event" not in page["unavailable"]
+    assert timings["event"] >= 50
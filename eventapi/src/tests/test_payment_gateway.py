@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+import pytest
+
+from utils.payment_gateway import GatewayError, RazorpayGateway
+
+
+def _gateway(*outcomes):
+    """A gateway whose transport plays back outcomes (an exception or a status code) in order"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"id": "order_1", "status": "created"})
+
+    gateway = RazorpayGateway("key", "secret", base_url="http://gateway/v1", retries=3, backoff=0)
+    gateway._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://gateway/v1")
+    return gateway, calls
+
+
+def test_create_order_is_not_retried_after_a_read_timeout():
+    gateway, calls = _gateway(httpx.ReadTimeout("timed out"), 200)
+    with pytest.raises(GatewayError):
+        asyncio.run(gateway.create_order(50000, "INR"))
+    assert calls == ["POST"]
+
+
+def test_create_order_is_not_retried_after_a_server_error():
+    gateway, calls = _gateway(503, 200)
+    with pytest.raises(GatewayError):
+        asyncio.run(gateway.create_order(50000, "INR"))
+    assert calls == ["POST"]
+
+
+def test_create_order_is_retried_when_it_never_reached_the_gateway():
+    gateway, calls = _gateway(httpx.ConnectError("refused"), 429, 200)
+    order = asyncio.run(gateway.create_order(50000, "INR"))
+    assert order["id"] == "order_1"
+    assert calls == ["POST", "POST", "POST"]
+
+
+def test_reads_are_retried_after_timeouts_and_server_errors():
+    gateway, calls = _gateway(httpx.ReadTimeout("timed out"), 502, 200)
+    order = asyncio.run(gateway.fetch_order("order_1"))
+    assert order["id"] == "order_1"
+    assert calls == ["GET", "GET", "GET"]
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import hmac
+
+import orjson
+
+from repository.payments_repo import PaymentRepo, payments_collection, webhooks_collection
+from services import paymentService
+from services.paymentService import PaymentService
+from utils.payment_gateway import RazorpayGateway
+
+WEBHOOK_SECRET = "whsec_test"
+
+
+def _webhook(event: str = "payment.captured"):
+    payload = {
+        "event": event,
+        "created_at": 1700000000,
+        "payload": {"payment": {"entity": {"id": "pay_1", "order_id": "order_1"}}},
+    }
+    body = orjson.dumps(payload)
+    signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return body, signature, payload
+
+
+def _service() -> PaymentService:
+    return PaymentService(RazorpayGateway("key", "secret", webhook_secret=WEBHOOK_SECRET))
+
+
+def test_redelivered_webhook_is_acknowledged_as_duplicate():
+    async def run():
+        await payments_collection.insert_one({"razorpay_order_id": "order_1", "status": "created"})
+        service = _service()
+        body, signature, payload = _webhook()
+
+        first = await service.receive_webhook(body, signature, payload, "evt_1")
+        second = await service.receive_webhook(body, signature, payload, "evt_1")
+
+        payment = await payments_collection.find_one({"razorpay_order_id": "order_1"})
+        recorded = await webhooks_collection.count_documents({"event_id": "evt_1"})
+        return first, second, payment, recorded
+
+    first, second, payment, recorded = asyncio.run(run())
+    assert (first, second) == ("applied", "duplicate")
+    assert payment["status"] == "completed"
+    assert payment["razorpay_payment_id"] == "pay_1"
+    assert recorded == 1
+
+
+def test_failed_event_is_dead_lettered_and_retried_on_redelivery(monkeypatch):
+    monkeypatch.setattr(paymentService, "WEBHOOK_RETRIES", 1)
+    original = PaymentRepo.apply_transitions
+
+    async def broken(transitions):
+        raise Exception("Database error occurred: boom")
+
+    async def run():
+        await payments_collection.insert_one({"razorpay_order_id": "order_1", "status": "created"})
+        service = _service()
+        body, signature, payload = _webhook()
+        event = paymentService.parse_webhook(payload, "evt_1")
+        await PaymentRepo.record_webhook(event)
+
+        monkeypatch.setattr(PaymentRepo, "apply_transitions", staticmethod(broken))
+        applied = await PaymentService._write_webhook_batch([event])
+        dead = await webhooks_collection.find_one({"event_id": "evt_1"})
+        pending = await PaymentRepo.pending_webhooks()
+
+        monkeypatch.setattr(PaymentRepo, "apply_transitions", staticmethod(original))
+        redelivered = await service.receive_webhook(body, signature, payload, "evt_1")
+        retried = await webhooks_collection.find_one({"event_id": "evt_1"})
+        payment = await payments_collection.find_one({"razorpay_order_id": "order_1"})
+        return applied, dead, pending, redelivered, retried, payment
+
+    applied, dead, pending, redelivered, retried, payment = asyncio.run(run())
+    assert applied == 0
+    assert dead["failed_at"] is not None
+    assert "boom" in dead["error"]
+    assert dead["attempts"] == 1
+    assert [event["event_id"] for event in pending] == ["evt_1"]
+    assert "failed_at" not in pending[0]
+    assert redelivered == "applied"
+    assert retried["applied_at"] is not None
+    assert "failed_at" not in retried and "error" not in retried
+    assert payment["status"] == "completed"
@@ -0,0 +1,104 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from jobs import reconcile_payments
+from jobs.reconcile_payments import load_checkpoint, reconcile
+from repository.payments_repo import payments_collection
+from utils import fake_gateway
+
+# order status at the gateway, payment status in the database
+PAYMENTS = {
+    "order_a": ("created", "created"),
+    "order_b": ("paid", "created"),      # webhook lost: corrected to completed
+    "order_c": (None, "created"),        # unknown to the gateway
+    "order_d": ("paid", "refunded"),
+    "order_e": ("created", "completed"),  # reported, not corrected
+}
+
+
+@pytest.fixture
+def payments(gateway):
+    async def seed():
+        for order_id, (gateway_status, status) in PAYMENTS.items():
+            if gateway_status:
+                fake_gateway.orders[order_id] = {"id": order_id, "status": gateway_status}
+            await payments_collection.insert_one({"razorpay_order_id": order_id, "status": status, "amount": 500.0})
+        # Checkouts whose order is not open yet are skipped
+        await payments_collection.insert_one({"razorpay_order_id": None, "status": "created"})
+
+    asyncio.run(seed())
+
+
+async def _statuses():
+    return {payment["razorpay_order_id"]: payment["status"] async for payment in payments_collection.find()}
+
+
+def test_reports_discrepancies_and_corrects_paid_orders(db, gateway, payments, tmp_path):
+    report = io.StringIO()
+    checkpoint = asyncio.run(reconcile(db, gateway, report, str(tmp_path / "checkpoint.json"), batch_size=2))
+    entries = {entry["order_id"]: entry for entry in map(json.loads, report.getvalue().splitlines())}
+    statuses = asyncio.run(_statuses())
+
+    assert set(entries) == {"order_b", "order_c", "order_e"}
+    assert entries["order_b"]["action"] == "completed"
+    assert entries["order_c"]["issue"] == "missing"
+    assert entries["order_e"]["action"] is None
+    assert statuses["order_b"] == "completed"
+    assert statuses["order_e"] == "completed"
+    assert checkpoint["checked"] == 5
+    assert (checkpoint["discrepancies"], checkpoint["corrected"], checkpoint["failed"]) == (3, 1, 0)
+    assert load_checkpoint(str(tmp_path / "checkpoint.json")) == checkpoint
+
+
+def test_dry_run_reports_without_correcting(db, gateway, payments, tmp_path):
+    report = io.StringIO()
+    checkpoint = asyncio.run(reconcile(db, gateway, report, str(tmp_path / "checkpoint.json"), dry_run=True))
+    assert checkpoint["corrected"] == 1
+    assert asyncio.run(_statuses())["order_b"] == "created"
+
+
+def test_failed_corrections_are_reported(db, gateway, payments, tmp_path, monkeypatch):
+    async def broken(events):
+        raise Exception("Database error occurred: boom")
+
+    monkeypatch.setattr(reconcile_payments.PaymentService, "apply_webhook_events", staticmethod(broken))
+    report = io.StringIO()
+    checkpoint = asyncio.run(reconcile(db, gateway, report, str(tmp_path / "checkpoint.json")))
+    entries = {entry["order_id"]: entry for entry in map(json.loads, report.getvalue().splitlines())}
+
+    assert entries["order_b"]["action"] == "failed"
+    assert "boom" in entries["order_b"]["detail"]
+    assert (checkpoint["corrected"], checkpoint["failed"]) == (0, 1)
+
+
+def test_resumes_from_the_checkpoint(db, gateway, payments, tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoint.json")
+    fetch_order = gateway.fetch_order
+    fetched = []
+
+    async def interrupted(order_id):
+        if len(fetched) == 2:
+            raise KeyboardInterrupt
+        fetched.append(order_id)
+        return await fetch_order(order_id)
+
+    monkeypatch.setattr(gateway, "fetch_order", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(reconcile(db, gateway, io.StringIO(), path, batch_size=2, concurrency=1))
+    assert load_checkpoint(path)["checked"] == 2
+
+    async def counted(order_id):
+        fetched.append(order_id)
+        return await fetch_order(order_id)
+
+    monkeypatch.setattr(gateway, "fetch_order", counted)
+    report = io.StringIO()
+    checkpoint = asyncio.run(reconcile(db, gateway, report, path, batch_size=2))
+
+    # The first batch is not fetched again
+    assert sorted(fetched) == sorted(PAYMENTS)
+    assert checkpoint["checked"] == 5
+    assert checkpoint["corrected"] == 1
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from repository.bookings_repo import events_collection
+from repository.payments_repo import payments_collection
+from repository.tickets_repo import TicketsRepo, tickets_collection
+from schemas.ticketSchema import TicketSchemaReq
+from services.paymentService import PaymentService
+from services.ticketService import TicketService
+
+
+async def _paid_ticket():
+    event = await events_collection.insert_one({"name": "Gig", "date": "2099-01-01"})
+    request = TicketSchemaReq(persons=2, total_price=1000.0, user=str(ObjectId()),
+                              event=str(event.inserted_id), payment_method="razorpay")
+    ticket = await TicketService.create_ticket(request)
+    return await TicketService.update_payment(str(ticket["_id"]), "completed")
+
+
+def test_cancelled_ticket_cannot_be_confirmed_again():
+    async def run():
+        ticket = await _paid_ticket()
+        ticket_id = str(ticket["_id"])
+        await TicketService.cancel_ticket(ticket_id)
+        with pytest.raises(Exception, match="Cancelled tickets cannot be confirmed"):
+            await TicketService.confirm_ticket(ticket_id)
+        stored = await tickets_collection.find_one({"_id": ticket["_id"]})
+        return ticket, stored
+
+    ticket, stored = asyncio.run(run())
+    assert stored["status"] == "cancelled"
+    assert asyncio.run(TicketService.verify_ticket(ticket["qr_payload"]))["verified"] is False
+
+
+def test_confirming_a_live_ticket_still_works():
+    async def run():
+        ticket = await _paid_ticket()
+        return await TicketService.confirm_ticket(str(ticket["_id"]))
+
+    ticket = asyncio.run(run())
+    assert ticket["status"] == "confirmed"
+    assert asyncio.run(TicketService.verify_ticket(ticket["qr_payload"]))["verified"] is True
+
+
+def test_payment_completing_after_cancellation_keeps_the_ticket_cancelled():
+    async def run():
+        event = await events_collection.insert_one({"name": "Gig", "date": "2099-01-01"})
+        request = TicketSchemaReq(persons=1, total_price=500.0, user=str(ObjectId()),
+                                  event=str(event.inserted_id), payment_method="razorpay")
+        ticket = await TicketService.create_ticket(request)
+        await payments_collection.insert_one({"razorpay_order_id": "order_1", "status": "created",
+                                              "ticket_id": str(ticket["_id"])})
+        await TicketService.cancel_ticket(str(ticket["_id"]))
+        await PaymentService.apply_webhook_events([
+            {"event_id": "evt_1", "status": "completed", "order_id": "order_1", "payment_id": "pay_1"}
+        ])
+        await TicketService.refresh_revocations()
+        return ticket, await TicketsRepo.get_ticket_by_id(str(ticket["_id"]))
+
+    ticket, stored = asyncio.run(run())
+    assert stored["status"] == "cancelled"
+    assert stored["payment_status"] == "completed"
+    assert stored["qr_payload"] == ticket["qr_payload"]
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from dependency import auth
+from repository.user_repo import user_collection
+from services.userService import UserService
+
+
+async def _admin_claims(email):
+    await user_collection.insert_one({"email": email, "role": "admin", "password": "x"})
+    claims = {"sub": email, "role": "admin", "iat": int(time.time())}
+    # Warm the principal cache as a normal admin request would
+    await auth.admin_only(claims)
+    return claims
+
+
+def test_role_change_refuses_tokens_issued_before_it():
+    async def run():
+        claims = await _admin_claims("demoted@example.com")
+        await UserService.UpdateUserRole("demoted@example.com", "user")
+        with pytest.raises(HTTPException) as error:
+            await auth.admin_only(claims)
+        return error.value, await auth.get_principal("demoted@example.com")
+
+    error, principal = asyncio.run(run())
+    assert error.status_code == 401
+    assert principal["role"] == "user"
+
+
+def test_deleted_user_tokens_are_refused():
+    async def run():
+        claims = await _admin_claims("removed@example.com")
+        assert "error" not in await UserService.DeleteUser("removed@example.com")
+        with pytest.raises(HTTPException) as error:
+            await auth.admin_only(claims)
+        return error.value, await auth.get_principal("removed@example.com")
+
+    error, principal = asyncio.run(run())
+    assert error.status_code == 401
+    assert principal is None
+
+
+def test_unknown_user_role_change_is_reported():
+    assert asyncio.run(UserService.UpdateUserRole("nobody@example.com", "admin")) == {"error": "User not found"}
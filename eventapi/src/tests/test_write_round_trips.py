@@ -0,0 +1,109 @@
+"""
+Each create endpoint's repository call costs one write and never reads the
+document back. Commands are counted at the collection, the way a Motor
+command listener would see them.
+"""
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockCollection
+
+from repository.bookings_repo import BookingRepo, events_collection
+from repository.companies_repo import CompanyRepo
+from repository.faqs_repo import FAQsRepo
+from repository.feedback_repo import FeedbackRepo
+from repository.offers_repo import OffersRepo
+from repository.payments_repo import PaymentRepo
+from repository.review_repo import ReviewRepo
+from repository.tickets_repo import TicketsRepo
+from schemas.companiesSchema import CompaniesAdmin
+from schemas.faqsSchema import FAQsSchemaReq
+from schemas.feedbackSchema import FeedbackSchemaReq
+from schemas.reviewSchema import ReviewSchemaReq
+from schemas.ticketSchema import TicketSchemaReq
+
+OPERATIONS = ("aggregate", "count_documents", "delete_one", "find", "find_one", "find_one_and_update",
+              "insert_many", "insert_one", "update_many", "update_one")
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    seen = []
+
+    def record(name, method):
+        def wrapper(self, *args, **kwargs):
+            seen.append((self.name, name))
+            return method(self, *args, **kwargs)
+        return wrapper
+
+    for name in OPERATIONS:
+        monkeypatch.setattr(AsyncMongoMockCollection, name, record(name, getattr(AsyncMongoMockCollection, name)))
+    return seen
+
+
+async def _event() -> ObjectId:
+    result = await events_collection.insert_one({"name": "Gig", "slots": [{"name": "General", "capacity": 5}]})
+    return result.inserted_id
+
+
+def _booking(event_id: ObjectId) -> dict:
+    return {"user_id": ObjectId(), "event_id": event_id, "slot_name": "General", "quantity": 1,
+            "total_amount": 500.0, "status": "pending"}
+
+
+def _count(create, setup=None):
+    """Run setup unobserved, then return the created document and the commands create sent"""
+    async def run(seen):
+        context = await setup() if setup else None
+        seen.clear()
+        return await create(context), list(seen)
+    return run
+
+
+@pytest.mark.parametrize("create, collection", [
+    (lambda _: PaymentRepo.create_payment({"amount": 500.0, "currency": "INR", "status": "created"}), "payments"),
+    (lambda _: CompanyRepo.addCompany(CompaniesAdmin(name="Acme", Image="acme.png")), "clients"),
+    (lambda _: FAQsRepo.addFAQ(FAQsSchemaReq(question="When?", answer="Soon")), "faqs"),
+    (lambda _: FeedbackRepo.addFeedback(FeedbackSchemaReq(feedback="Great")), "feedback"),
+    (lambda _: OffersRepo.create_offer({"title": "10% off", "code": "TEN"}), "offers"),
+])
+def test_create_is_a_single_insert(commands, create, collection):
+    document, seen = asyncio.run(_count(create)(commands))
+    assert "_id" in document
+    assert seen == [(collection, "insert_one")]
+
+
+def test_create_review_inserts_and_counts_the_rating_without_reads(commands):
+    async def create(event_id):
+        return await ReviewRepo.addReview(ReviewSchemaReq(rating=4, review="Good", event=str(event_id)))
+
+    document, seen = asyncio.run(_count(create, _event)(commands))
+    assert "_id" in document
+    assert [operation for _, operation in seen] == ["insert_one", "update_one"]
+
+
+def test_create_ticket_reads_the_event_once_and_inserts_once(commands):
+    async def create(event_id):
+        request = TicketSchemaReq(persons=1, total_price=500.0, user=str(ObjectId()), event=str(event_id),
+                                  payment_method="razorpay")
+        return await TicketsRepo.create_ticket(request)
+
+    document, seen = asyncio.run(_count(create, _event)(commands))
+    assert "_id" in document
+    assert seen == [("events", "find_one"), ("tickets", "insert_one")]
+
+
+def test_create_booking_reserves_and_inserts_without_reading_back(commands):
+    async def setup():
+        event_id = await _event()
+        # The slot's inventory row exists after its first booking
+        await BookingRepo.create_booking(_booking(event_id))
+        return event_id
+
+    async def create(event_id):
+        return await BookingRepo.create_booking(_booking(event_id))
+
+    document, seen = asyncio.run(_count(create, setup)(commands))
+    assert "_id" in document
+    assert seen == [("events", "find_one"), ("slot_inventory", "update_one"), ("bookings", "insert_one")]
@@ -0,0 +1,190 @@
+"""
+In-memory autocomplete over event titles, venues, cities and tags.
+
+Every event is split into normalized tokens (lowercase, accents stripped).
+The distinct tokens are kept in one sorted list, so the events for a prefix
+are found with two bisects, and a posting set maps each token to the events
+that contain it. Suggestions are ranked by popularity (seats booked), then
+title.
+
+The index is built once from the events collection and then patched per
+event when an event is created or updated, so suggest() never touches Mongo.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+RESULT_CACHE_SIZE = 4096
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, strip accents and split into alphanumeric tokens"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN.findall(text.lower())
+
+
+def _event_tokens(event: Dict) -> Set[str]:
+    tokens = set()
+    for field in ("title", "venue", "city"):
+        tokens.update(tokenize(event.get(field)))
+    for tag in event.get("tags") or []:
+        tokens.update(tokenize(tag))
+    return tokens
+
+
+class AutocompleteIndex:
+    """Sorted token array + posting sets, with a small per-query result cache."""
+
+    def __init__(self):
+        self._tokens: List[str] = []
+        self._postings: Dict[str, Set[str]] = {}
+        self._events: Dict[str, Dict] = {}
+        self._event_tokens: Dict[str, Set[str]] = {}
+        self._popularity: Dict[str, int] = {}
+        self._results: "OrderedDict[Tuple[str, int], List[Dict]]" = OrderedDict()
+
+    def build(self, events: Iterable[Dict], popularity: Optional[Dict[str, int]] = None) -> int:
+        """
+        Replace the whole index
+
+        Args:
+            events (Iterable[Dict]): Event documents with title, venue, city and tags
+            popularity (Optional[Dict[str, int]]): Seats booked per event id
+
+        Returns:
+            int: Number of events indexed
+        """
+        self._postings = {}
+        self._events = {}
+        self._event_tokens = {}
+        self._popularity = dict(popularity or {})
+        for event in events:
+            event_id = str(event["_id"])
+            tokens = _event_tokens(event)
+            self._events[event_id] = self._entry(event_id, event)
+            self._event_tokens[event_id] = tokens
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(event_id)
+        self._tokens = sorted(self._postings)
+        self._results.clear()
+        return len(self._events)
+
+    def upsert(self, event: Dict, popularity: Optional[int] = None) -> None:
+        """Add an event or re-index it after an update"""
+        event_id = str(event["_id"])
+        previous = self._events.get(event_id, {})
+        # Partial updates only carry the changed fields
+        merged = {**previous, **{field: event[field] for field in ("title", "venue", "city", "tags") if field in event}}
+        if popularity is not None:
+            self._popularity[event_id] = popularity
+        self._unlink(event_id)
+        tokens = _event_tokens(merged)
+        self._events[event_id] = self._entry(event_id, merged)
+        self._event_tokens[event_id] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                insort(self._tokens, token)
+            postings.add(event_id)
+        self._results.clear()
+
+    def remove(self, event_id: str) -> None:
+        """Drop an event from the index"""
+        event_id = str(event_id)
+        self._unlink(event_id)
+        self._events.pop(event_id, None)
+        self._popularity.pop(event_id, None)
+        self._results.clear()
+
+    def _unlink(self, event_id: str) -> None:
+        for token in self._event_tokens.pop(event_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(event_id)
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def _entry(self, event_id: str, event: Dict) -> Dict:
+        return {
+            "_id": event_id,
+            "title": event.get("title"),
+            "venue": event.get("venue"),
+            "city": event.get("city"),
+            "tags": event.get("tags"),
+        }
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        start = bisect_left(self._tokens, prefix)
+        end = bisect_left(self._tokens, prefix + "\uffff", start)
+        if end - start == 1:
+            return self._postings[self._tokens[start]]
+        matches = set()
+        for token in self._tokens[start:end]:
+            matches |= self._postings[token]
+        return matches
+
+    def suggest(self, q: str, k: int = 10) -> List[Dict]:
+        """
+        Top events for a search-box query
+
+        Every token but the last must match a whole token; the last one is
+        treated as a prefix, so "jazz mu" finds jazz events in Mumbai.
+
+        Args:
+            q (str): What the user has typed so far
+            k (int): Maximum number of suggestions
+
+        Returns:
+            List[Dict]: {"_id", "title", "venue", "city", "popularity"} best first
+        """
+        tokens = tokenize(q)
+        if not tokens:
+            return []
+        key = (" ".join(tokens), k)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            return cached
+
+        *words, prefix = tokens
+        candidates = self._prefix_matches(prefix)
+        for word in words:
+            if not candidates:
+                break
+            candidates = candidates & self._postings.get(word, set())
+
+        best = heapq.nsmallest(
+            k,
+            candidates,
+            key=lambda event_id: (-self._popularity.get(event_id, 0), self._events[event_id]["title"] or ""),
+        )
+        results = [
+            {
+                "_id": event_id,
+                "title": self._events[event_id]["title"],
+                "venue": self._events[event_id]["venue"],
+                "city": self._events[event_id]["city"],
+                "popularity": self._popularity.get(event_id, 0),
+            }
+            for event_id in best
+        ]
+        self._results[key] = results
+        if len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return results
+
+    def stats(self) -> Dict:
+        return {"events": len(self._events), "tokens": len(self._tokens), "cached_queries": len(self._results)}
+
+
+event_suggestions = AutocompleteIndex()
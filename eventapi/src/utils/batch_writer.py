@@ -0,0 +1,158 @@
+"""
+Write-behind batching for high-volume inserts.
+
+Documents are put on a bounded asyncio queue and a background task writes
+them in batches, when a batch is full or the oldest queued document has
+waited ``max_delay`` seconds. A full queue makes submit() wait up to
+``put_timeout`` seconds and then raise QueueFullError, so a burst slows
+callers down instead of growing memory without bound. stop() flushes
+everything still queued, for use in the application lifespan.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue stays full for longer than put_timeout"""
+
+
+class BatchWriter:
+    """Bounded queue + background flusher around a batch insert function."""
+
+    def __init__(
+        self,
+        write: Callable[[List[Dict]], Awaitable[int]],
+        name: str,
+        max_batch: int = 500,
+        max_delay: float = 0.2,
+        max_queue: int = 10000,
+        put_timeout: float = 1.0,
+        retries: int = 3,
+    ):
+        self.write = write
+        self.name = name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.submitted = 0
+        self.inserted = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the background flusher; call from the running event loop"""
+        if self.running:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop accepting documents and flush everything still queued"""
+        if not self.running:
+            return
+        self._closing = True
+        await self._queue.put(None)  # wakes the flusher if it is idle
+        await self._task
+        self._task = None
+
+    async def submit(self, document: Dict) -> None:
+        """
+        Queue a document for the next batch
+
+        Raises:
+            QueueFullError: If the writer is stopped or the queue stays full for put_timeout seconds
+        """
+        if not self.running or self._closing:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} ingestion is not accepting documents")
+        try:
+            await asyncio.wait_for(self._queue.put(document), self.put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} ingestion queue is full, retry later")
+        self.submitted += 1
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            batch = [] if first is None else [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                if self._closing:
+                    # Draining: take whatever is left without waiting
+                    if self._queue.empty():
+                        break
+                    document = self._queue.get_nowait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        document = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if document is not None:
+                    batch.append(document)
+            if batch:
+                await self._flush(batch)
+            if self._closing and self._queue.empty():
+                return
+
+    async def _flush(self, batch: List[Dict]) -> None:
+        started = time.perf_counter()
+        for attempt in range(1, self.retries + 1):
+            try:
+                self.inserted += await self.write(batch)
+                break
+            except BulkWriteError as e:
+                # ordered=False: everything but the reported documents was written
+                errors = len(e.details.get("writeErrors", []))
+                self.inserted += len(batch) - errors
+                self.failed += errors
+                print(f"{self.name} batch: {errors} of {len(batch)} documents rejected")
+                break
+            except PyMongoError as e:
+                if attempt == self.retries:
+                    self.failed += len(batch)
+                    print(f"Error writing {self.name} batch of {len(batch)}: {str(e)}")
+                else:
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+            except Exception as e:
+                # Not a transient database error (no connection, a bad document):
+                # drop the batch but keep the flusher alive for the next one
+                self.failed += len(batch)
+                print(f"Error writing {self.name} batch of {len(batch)}: {str(e)}")
+                break
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "submitted": self.submitted,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
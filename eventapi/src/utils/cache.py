@@ -0,0 +1,211 @@
+"""
+Read-through caches for rarely changing documents.
+
+A DocumentCache stores BSON-encoded values in a pluggable backend:
+
+* MemoryCache - in-process TTL + LRU map bounded by entry count and bytes,
+  the default and what tests use.
+* RedisCache - any redis.asyncio compatible client, so every worker of a
+  multi-process deployment shares one cache and one invalidation.
+
+Values are BSON so ObjectId/datetime survive the round trip, and each read
+decodes a fresh copy that callers are free to mutate.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import bson
+
+
+class CacheBackend:
+    """Byte-level storage used by DocumentCache."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def invalidate(self, prefix: str) -> int:
+        """Drop every key starting with prefix and return how many were dropped."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {}
+
+
+class MemoryCache(CacheBackend):
+    """In-process TTL + LRU cache bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._bytes += len(value)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._drop(key)
+
+    async def invalidate(self, prefix: str) -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisCache(CacheBackend):
+    """Backend for a shared redis.asyncio compatible client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def invalidate(self, prefix: str) -> int:
+        keys = [key async for key in self.client.scan_iter(match=f"{prefix}*")]
+        if keys:
+            await self.client.delete(*keys)
+        return len(keys)
+
+    def stats(self) -> Dict:
+        return {"backend": "redis"}
+
+
+def backend_from_url(url: Optional[str], max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024) -> CacheBackend:
+    """
+    Build a backend from a cache URL
+
+    Args:
+        url (Optional[str]): "redis://..." for a shared cache, empty or "memory://" for in-process
+        max_entries (int): Entry bound for the in-process cache
+        max_bytes (int): Byte bound for the in-process cache
+
+    Returns:
+        CacheBackend: The configured backend
+    """
+    if url and url.startswith(("redis://", "rediss://")):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise Exception("The redis package is required for a redis:// cache URL")
+        return RedisCache(redis.from_url(url))
+    return MemoryCache(max_entries=max_entries, max_bytes=max_bytes)
+
+
+class DocumentCache:
+    """Namespaced read-through cache of BSON-encodable values."""
+
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: int = 60):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str):
+        raw = await self.backend.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bson.decode(raw)["v"]
+
+    async def set(self, key: str, value) -> None:
+        await self.backend.set(self._key(key), bson.encode({"v": value}), self.ttl)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable]):
+        """Return the cached value, or load, cache and return it. None is never cached."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+        value = await loader()
+        if value is not None:
+            await self.set(key, value)
+        return value
+
+    async def invalidate(self, key: Optional[str] = None) -> int:
+        """Drop one key, or the whole namespace when no key is given."""
+        if key is not None:
+            await self.backend.delete(self._key(key))
+            return 1
+        return await self.backend.invalidate(f"{self.namespace}:")
+
+    def stats(self) -> Dict:
+        return {"namespace": self.namespace, "ttl": self.ttl, "hits": self.hits, "misses": self.misses, **self.backend.stats()}
+
+
+def cache_from_env(namespace: str, prefix: str, ttl: int = 60, max_entries: int = 1024) -> DocumentCache:
+    """
+    Build a DocumentCache configured by <prefix>_URL, <prefix>_TTL and <prefix>_MAX_ENTRIES
+
+    Args:
+        namespace (str): Key namespace, e.g. "events"
+        prefix (str): Environment variable prefix, e.g. "EVENT_CACHE"
+        ttl (int): Default time to live in seconds
+        max_entries (int): Default entry bound for the in-process backend
+
+    Returns:
+        DocumentCache: The cache
+    """
+    backend = backend_from_url(
+        os.environ.get(f"{prefix}_URL"),
+        max_entries=int(os.environ.get(f"{prefix}_MAX_ENTRIES", max_entries)),
+    )
+    return DocumentCache(namespace, backend, ttl=int(os.environ.get(f"{prefix}_TTL", ttl)))
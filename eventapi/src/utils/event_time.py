@@ -0,0 +1,132 @@
+"""
+Normalized event start/end times.
+
+Events are entered with free-form ``date`` and ``time`` strings. They are
+parsed here into UTC ``starts_at``/``ends_at`` datetimes, which are what the
+range and sort queries use. Local times are read in EVENT_TIMEZONE
+(default Asia/Kolkata).
+"""
+import os
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+EVENT_TIMEZONE = ZoneInfo(os.environ.get("EVENT_TIMEZONE", "Asia/Kolkata"))
+# Used as the end time when the event does not say when it ends
+DEFAULT_DURATION = timedelta(hours=float(os.environ.get("EVENT_DEFAULT_DURATION_HOURS", 3)))
+
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%d-%m-%Y",
+    "%d/%m/%Y",
+    "%d.%m.%Y",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%B %d %Y",
+    "%b %d %Y",
+    "%A %d %B %Y",
+    "%a %d %b %Y",
+)
+TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I %p", "%I:%M%p", "%I%p", "%H.%M", "%I.%M %p")
+
+# Fields whose change means starts_at/ends_at must be recomputed
+TIME_SOURCE_FIELDS = ("date", "time", "additionalInfo")
+
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    """Parse the free-form event date, None if it is not recognised"""
+    if not value:
+        return None
+    # "15th March, 2025" -> "15 March 2025"
+    text = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", value.strip(), flags=re.IGNORECASE)
+    text = " ".join(text.replace(",", " ").split())
+    if re.match(r"\d{4}-\d{2}-\d{2}T", text):
+        text = text[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_time(value: Optional[str]) -> Optional[time]:
+    """Parse a free-form time of day such as "19:30", "7:30 PM" or "7pm" """
+    if not value:
+        return None
+    # "7:30 PM onwards", "19:30 - 23:00" -> the first time only
+    match = re.search(r"\d{1,2}(?:[:.]\d{2}){0,2}\s*(?:[ap]\.?m\.?)?", value.strip(), flags=re.IGNORECASE)
+    if not match:
+        return None
+    text = re.sub(r"([AP])\.?M\.?", r"\1M", match.group(0).upper()).strip()
+    text = re.sub(r"(\d)\s*([AP]M)", r"\1 \2", text)
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def _to_utc(day: date, at: time) -> datetime:
+    return datetime.combine(day, at, tzinfo=EVENT_TIMEZONE).astimezone(timezone.utc)
+
+
+def event_times(event: Dict) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Compute the UTC start and end of an event document
+
+    The start is ``date`` + ``time`` (midnight when the time is missing). The
+    end is additionalInfo.timings.eventEnd, on the next day if it is earlier
+    than the start, or the start + DEFAULT_DURATION.
+
+    Args:
+        event (Dict): Event document or update with date, time and additionalInfo
+
+    Returns:
+        Tuple[Optional[datetime], Optional[datetime]]: (starts_at, ends_at), both
+        None when the date cannot be parsed
+    """
+    day = parse_date(event.get("date"))
+    if day is None:
+        return None, None
+    starts_at = _to_utc(day, parse_time(event.get("time")) or time(0, 0))
+
+    timings = ((event.get("additionalInfo") or {}).get("timings") or {})
+    end_time = parse_time(timings.get("eventEnd"))
+    if end_time is None:
+        return starts_at, starts_at + DEFAULT_DURATION
+    ends_at = _to_utc(day, end_time)
+    if ends_at <= starts_at:
+        ends_at += timedelta(days=1)
+    return starts_at, ends_at
+
+
+def time_fields(event: Dict) -> Dict:
+    """The {"starts_at", "ends_at"} to $set for an event, empty if the date is unparseable"""
+    starts_at, ends_at = event_times(event)
+    if starts_at is None:
+        return {}
+    return {"starts_at": starts_at, "ends_at": ends_at}
+
+
+def parse_bound(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a ?from=/?to= query bound as UTC
+
+    Accepts an ISO datetime (naive values are read in EVENT_TIMEZONE) or a
+    plain date, which means midnight local time.
+
+    Raises:
+        ValueError: If the value is not an ISO date or datetime
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid datetime {value!r}, expected ISO 8601")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=EVENT_TIMEZONE)
+    return parsed.astimezone(timezone.utc)
@@ -0,0 +1,63 @@
+"""
+Local stand-in for the Razorpay orders API, for tests and load runs.
+
+    FAKE_GATEWAY_LATENCY=0.3 uvicorn utils.fake_gateway:app --port 9000
+    PAYMENT_GATEWAY_URL=http://127.0.0.1:9000/v1 uvicorn main:app
+
+Every call sleeps FAKE_GATEWAY_LATENCY seconds (default 0.3) to mimic a
+slow upstream. FAKE_GATEWAY_FAILURE_RATE makes that fraction of calls
+answer 503, which exercises the client's retries.
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+
+LATENCY = float(os.environ.get("FAKE_GATEWAY_LATENCY", 0.3))
+FAILURE_RATE = float(os.environ.get("FAKE_GATEWAY_FAILURE_RATE", 0))
+
+app = FastAPI(title="Fake payment gateway")
+orders = {}
+
+
+async def _upstream() -> None:
+    await asyncio.sleep(LATENCY)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+
+@app.post("/v1/orders")
+async def create_order(request: Request):
+    await _upstream()
+    body = await request.json()
+    order = {
+        "id": f"order_{uuid.uuid4().hex[:14]}",
+        "entity": "order",
+        "amount": body["amount"],
+        "amount_paid": 0,
+        "amount_due": body["amount"],
+        "currency": body.get("currency", "INR"),
+        "receipt": body.get("receipt"),
+        "status": "created",
+        "notes": body.get("notes", {}),
+        "created_at": int(time.time()),
+    }
+    orders[order["id"]] = order
+    return order
+
+
+@app.get("/v1/orders/{order_id}")
+async def get_order(order_id: str):
+    await _upstream()
+    if order_id not in orders:
+        raise HTTPException(status_code=404, detail="The id provided does not exist")
+    return orders[order_id]
+
+
+@app.get("/v1/payments/{payment_id}")
+async def get_payment(payment_id: str):
+    await _upstream()
+    return {"id": payment_id, "entity": "payment", "status": "captured"}
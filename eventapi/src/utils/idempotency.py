@@ -0,0 +1,197 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A POST to one of the configured paths that carries an Idempotency-Key
+header runs once. The first request claims the key in the store, runs,
+and its response is saved. Retries with the same key get the saved
+response back (marked with Idempotent-Replayed: true) instead of creating
+another booking, ticket or gateway order. A key reused with a different
+body is rejected with 422.
+
+Duplicates that arrive while the first request is still running wait for
+it: in the same process on an asyncio future, across workers by polling
+the store for up to IDEMPOTENCY_WAIT seconds, after which they get 409.
+Responses with a 5xx status are not saved, so those requests can be
+retried. Keys are scoped to the path and the caller's Authorization
+header.
+
+The store is any object with async claim/get/complete/release, such as
+repository.idempotency_repo.IdempotencyRepo (shared by all workers) or
+MemoryIdempotencyStore (single process, tests).
+"""
+import asyncio
+import hashlib
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import orjson
+
+IDEMPOTENCY_WAIT = float(os.environ.get("IDEMPOTENCY_WAIT", 10))
+MAX_KEY_LENGTH = 255
+
+
+class MemoryIdempotencyStore:
+    """In-process store with the same interface as IdempotencyRepo."""
+
+    def __init__(self, ttl: int = 24 * 3600, lease: float = 60):
+        self.ttl = ttl
+        self.lease = lease
+        self._records: Dict[str, Dict] = {}
+
+    def _live(self, key: str) -> Optional[Dict]:
+        record = self._records.get(key)
+        if record is not None and time.monotonic() - record["created_at"] > self.ttl:
+            del self._records[key]
+            return None
+        return record
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[Dict]:
+        record = self._live(key)
+        now = time.monotonic()
+        if record is None or (
+            record["state"] == "pending"
+            and record["fingerprint"] == fingerprint
+            and now - record["created_at"] > self.lease
+        ):
+            self._records[key] = {"fingerprint": fingerprint, "state": "pending", "created_at": now}
+            return None
+        return record
+
+    async def get(self, key: str) -> Optional[Dict]:
+        return self._live(key)
+
+    async def complete(self, key: str, status_code: int, headers: List[List[str]], body: bytes) -> None:
+        record = self._records.get(key)
+        if record is not None:
+            record.update(state="done", status_code=status_code, headers=headers, body=body,
+                          created_at=time.monotonic())
+
+    async def release(self, key: str) -> None:
+        record = self._records.get(key)
+        if record is not None and record["state"] == "pending":
+            del self._records[key]
+
+
+def _error(status_code: int, message: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+    body = orjson.dumps({"status": "failed", "message": message})
+    raw = [[b"content-type", b"application/json"], [b"content-length", str(len(body)).encode()]]
+    raw += [[name.encode(), value.encode()] for name, value in (headers or {}).items()]
+    return {"status_code": status_code, "raw_headers": raw, "body": body}
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware applying Idempotency-Key semantics to POSTs on ``paths``."""
+
+    def __init__(self, app, store, paths: Iterable[str], wait: float = IDEMPOTENCY_WAIT):
+        self.app = app
+        self.store = store
+        self.paths = {path.rstrip("/") for path in paths}
+        self.wait = wait
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") not in self.paths:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        if not idempotency_key:
+            return await self.app(scope, receive, send)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return await self._send(send, _error(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"))
+
+        # Read the body up front: it is part of the fingerprint and is replayed to the app
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        caller = hashlib.sha256(headers.get(b"authorization", b"")).hexdigest()[:16]
+        key = f"{scope['path'].rstrip('/')}:{caller}:{idempotency_key}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        # Same-process duplicate: wait for the running request instead of polling the store
+        running = self._inflight.get(key)
+        if running is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(running), self.wait)
+            except asyncio.TimeoutError:
+                pass
+
+        try:
+            record = await self.store.claim(key, fingerprint)
+        except Exception as e:
+            print(f"Idempotency store unavailable: {str(e)}")
+            return await self._send(send, _error(503, "Idempotency store unavailable", {"Retry-After": "1"}))
+        if record is not None:
+            return await self._send(send, await self._existing(key, fingerprint, record))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            await self._run(scope, body, send, key)
+        finally:
+            self._inflight.pop(key, None)
+            future.set_result(None)
+
+    async def _existing(self, key: str, fingerprint: str, record: Dict) -> Dict:
+        """The response for a key another request already claimed"""
+        if record["fingerprint"] != fingerprint:
+            return _error(422, "Idempotency-Key was already used with a different request")
+        deadline = time.monotonic() + self.wait
+        while record is not None and record["state"] != "done" and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            record = await self.store.get(key)
+        if record is None:
+            # The first request failed and released the key; the client can retry
+            return _error(409, "The original request with this Idempotency-Key failed, retry it", {"Retry-After": "1"})
+        if record["state"] != "done":
+            return _error(409, "A request with this Idempotency-Key is still in progress", {"Retry-After": "1"})
+        raw = [[name.encode("latin-1"), value.encode("latin-1")] for name, value in record["headers"]]
+        raw.append([b"idempotent-replayed", b"true"])
+        return {"status_code": record["status_code"], "raw_headers": raw, "body": bytes(record["body"])}
+
+    async def _run(self, scope, body: bytes, send, key: str) -> None:
+        """Run the request as the key's owner and save its response"""
+        delivered = False
+
+        async def receive():
+            nonlocal delivered
+            if delivered:
+                # Nothing more to read; block like a client that is still connected
+                await asyncio.Event().wait()
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        response = {"status_code": 500, "headers": [], "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status_code"] = message["status"]
+                response["headers"] = [[name.decode("latin-1"), value.decode("latin-1")]
+                                       for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await self.store.release(key)
+            raise
+        if response["status_code"] >= 500:
+            await self.store.release(key)
+            return
+        try:
+            await self.store.complete(key, response["status_code"], response["headers"], b"".join(response["body"]))
+        except Exception as e:
+            # The response already went out; a retry will simply run again
+            print(f"Error saving idempotent response: {str(e)}")
+            await self.store.release(key)
+
+    @staticmethod
+    async def _send(send, response: Dict) -> None:
+        await send({"type": "http.response.start", "status": response["status_code"], "headers": response["raw_headers"]})
+        await send({"type": "http.response.body", "body": response["body"]})
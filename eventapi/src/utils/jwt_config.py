@@ -11,14 +11,32 @@ ACCESS_TOKEN_EXPIRE_MINUTES = config.get("ACCESS_TOKEN_EXPIRE_MINUTES")
 if ACCESS_TOKEN_EXPIRE_MINUTES is not None:
     ACCESS_TOKEN_EXPIRE_MINUTES = int(ACCESS_TOKEN_EXPIRE_MINUTES)
 
+def user_claims(user: dict) -> dict:
+    """
+    Build the access token claims for a user document
+
+    The role and user id ride in the token so authorization checks can
+    usually be answered without a database round trip.
+
+    Args:
+        user (dict): The user document (needs email, _id and role)
+
+    Returns:
+        dict: {"sub": email, "uid": user id, "role": role}
+    """
+    return {
+        "sub": user["email"],
+        "uid": str(user["_id"]),
+        "role": user.get("role", "user"),
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    print(f"jwt config file {data} {expires_delta}")
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Async payment gateway adapter.
+
+RazorpayGateway talks to the Razorpay REST API over one shared
+httpx.AsyncClient: keep-alive connections from a bounded pool, separate
+connect/read timeouts, and retries with exponential backoff and full jitter
+for connection errors, 429 and 5xx. Nothing blocks the event loop.
+Creating an order is not idempotent, so a POST is only retried when it
+never reached the gateway (connect errors, pool timeouts, 429); a read
+timeout or 5xx on it could mean the order exists, and is raised instead.
+
+The base URL comes from PAYMENT_GATEWAY_URL, so tests and load runs can
+point the adapter at the local fake gateway in utils/fake_gateway.py.
+Credentials are read from RAZORPAY_KEY_ID / RAZORPAY_KEY_SECRET (and
+RAZORPAY_WEBHOOK_SECRET for webhooks) in ../.env or the environment.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import random
+from typing import Dict, Optional
+
+import httpx
+from dotenv import dotenv_values
+
+config = dotenv_values("../.env")
+
+
+def _setting(name: str, default: Optional[str] = None) -> Optional[str]:
+    return config.get(name) or os.environ.get(name) or default
+
+
+class GatewayError(Exception):
+    """Raised when the gateway rejects a request or stays unreachable after retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PaymentGateway:
+    """Interface the payment service uses; one implementation per provider."""
+
+    async def create_order(self, amount: int, currency: str, receipt: Optional[str] = None, notes: Optional[Dict] = None) -> Dict:
+        raise NotImplementedError
+
+    async def fetch_order(self, order_id: str) -> Dict:
+        raise NotImplementedError
+
+    async def fetch_payment(self, payment_id: str) -> Dict:
+        raise NotImplementedError
+
+    def verify_payment_signature(self, order_id: str, payment_id: str, signature: str) -> bool:
+        raise NotImplementedError
+
+    def verify_webhook_signature(self, body: bytes, signature: str) -> bool:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class RazorpayGateway(PaymentGateway):
+    """Razorpay orders API over a pooled async HTTP client."""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # Failures that happen before the request is sent; safe to retry any method
+    UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    SENT_ERRORS = (httpx.ReadTimeout, httpx.RemoteProtocolError)
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+    def __init__(
+        self,
+        key_id: str,
+        key_secret: str,
+        webhook_secret: str = "",
+        base_url: str = "https://api.razorpay.com/v1",
+        connect_timeout: float = 2.0,
+        read_timeout: float = 10.0,
+        max_connections: int = 50,
+        max_keepalive: int = 20,
+        retries: int = 3,
+        backoff: float = 0.2,
+    ):
+        self.key_secret = key_secret
+        self.webhook_secret = webhook_secret
+        self.retries = retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(key_id, key_secret),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=30,
+            ),
+        )
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict:
+        idempotent = method in self.IDEMPOTENT_METHODS
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._client.request(method, path, **kwargs)
+            except self.UNSENT_ERRORS as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            except self.SENT_ERRORS as e:
+                error = f"{type(e).__name__}: {str(e)}"
+                if not idempotent:
+                    raise GatewayError(f"Gateway outcome unknown: {error}")
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                retryable = response.status_code in self.RETRY_STATUSES and (idempotent or response.status_code == 429)
+                if not retryable:
+                    raise GatewayError(
+                        f"Gateway returned {response.status_code}: {response.text[:200]}",
+                        status_code=response.status_code
+                    )
+                error = f"Gateway returned {response.status_code}"
+            if attempt < self.retries:
+                # Full jitter keeps retries from many workers from lining up
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        raise GatewayError(f"Gateway unavailable after {self.retries + 1} attempts: {error}")
+
+    async def create_order(self, amount: int, currency: str, receipt: Optional[str] = None, notes: Optional[Dict] = None) -> Dict:
+        """
+        Create an order
+
+        Args:
+            amount (int): Amount in the smallest currency unit (paise)
+            currency (str): ISO currency code
+            receipt (Optional[str]): Our reference for the order
+            notes (Optional[Dict]): Free-form key/values stored with the order
+
+        Returns:
+            Dict: The gateway's order, with its "id"
+
+        Raises:
+            GatewayError: If the order could not be created
+        """
+        body = {"amount": amount, "currency": currency, "payment_capture": 1, "notes": notes or {}}
+        if receipt:
+            body["receipt"] = receipt
+        return await self._request("POST", "/orders", json=body)
+
+    async def fetch_order(self, order_id: str) -> Dict:
+        """Get an order as the gateway sees it ("status": created, attempted or paid)"""
+        return await self._request("GET", f"/orders/{order_id}")
+
+    async def fetch_payment(self, payment_id: str) -> Dict:
+        """Get a payment as the gateway sees it"""
+        return await self._request("GET", f"/payments/{payment_id}")
+
+    def verify_payment_signature(self, order_id: str, payment_id: str, signature: str) -> bool:
+        """Check the checkout signature: HMAC-SHA256 of "order_id|payment_id" with the key secret"""
+        expected = hmac.new(self.key_secret.encode(), f"{order_id}|{payment_id}".encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
+
+    def verify_webhook_signature(self, body: bytes, signature: str) -> bool:
+        """Check X-Razorpay-Signature: HMAC-SHA256 of the raw body with the webhook secret"""
+        if not self.webhook_secret:
+            return False
+        expected = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def gateway_from_env() -> RazorpayGateway:
+    """Build the gateway from PAYMENT_GATEWAY_* and RAZORPAY_KEY_* settings"""
+    return RazorpayGateway(
+        key_id=_setting("RAZORPAY_KEY_ID", ""),
+        key_secret=_setting("RAZORPAY_KEY_SECRET", ""),
+        webhook_secret=_setting("RAZORPAY_WEBHOOK_SECRET", ""),
+        base_url=_setting("PAYMENT_GATEWAY_URL", "https://api.razorpay.com/v1"),
+        connect_timeout=float(_setting("PAYMENT_GATEWAY_CONNECT_TIMEOUT", "2")),
+        read_timeout=float(_setting("PAYMENT_GATEWAY_READ_TIMEOUT", "10")),
+        max_connections=int(_setting("PAYMENT_GATEWAY_MAX_CONNECTIONS", "50")),
+        retries=int(_setting("PAYMENT_GATEWAY_RETRIES", "3")),
+    )
+
+
+payment_gateway = gateway_from_env()
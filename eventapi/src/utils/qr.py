@@ -0,0 +1,120 @@
+"""
+On-demand QR code rendering off the event loop.
+
+Rendering is CPU bound pure Python, so it runs in a bounded worker pool
+(processes by default, QR_RENDER_POOL=thread for threads) with at most
+QR_RENDER_WORKERS workers and a bounded number of queued renders. Rendered
+images are kept in an LRU keyed by their ETag.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import qrcode
+import qrcode.image.svg
+
+from utils.cache import MemoryCache
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+QR_RENDER_POOL = os.environ.get("QR_RENDER_POOL", "process")
+QR_RENDER_WORKERS = int(os.environ.get("QR_RENDER_WORKERS", 2))
+QR_RENDER_QUEUE = int(os.environ.get("QR_RENDER_QUEUE", QR_RENDER_WORKERS * 8))
+QR_CACHE_TTL = int(os.environ.get("QR_CACHE_TTL", 24 * 60 * 60))
+
+qr_cache = MemoryCache(
+    max_entries=int(os.environ.get("QR_CACHE_MAX_ENTRIES", 4096)),
+    max_bytes=int(os.environ.get("QR_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+_executor: Optional[Executor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def render_qr(payload: str, fmt: str) -> bytes:
+    """
+    Render a QR code image (runs inside the worker pool)
+
+    Args:
+        payload (str): The data to encode
+        fmt (str): "png" or "svg"
+
+    Returns:
+        bytes: The encoded image
+    """
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+        image_factory=qrcode.image.svg.SvgPathImage if fmt == "svg" else None,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image().save(buffer)
+    return buffer.getvalue()
+
+
+def qr_etag(payload: str, fmt: str) -> str:
+    """Strong ETag of the image for a payload, known without rendering it."""
+    digest = hashlib.sha256(f"{fmt}:{payload}".encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if QR_RENDER_POOL == "thread":
+            _executor = ThreadPoolExecutor(max_workers=QR_RENDER_WORKERS, thread_name_prefix="qr")
+        else:
+            # spawn keeps the driver's threads and sockets out of the workers
+            _executor = ProcessPoolExecutor(
+                max_workers=QR_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _executor
+
+
+async def get_qr_image(payload: str, fmt: str) -> Tuple[bytes, str]:
+    """
+    Get a QR image from the cache, rendering it in the pool on a miss
+
+    Args:
+        payload (str): The data to encode
+        fmt (str): "png" or "svg"
+
+    Returns:
+        Tuple[bytes, str]: The image and its ETag
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    global _slots
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported QR format: {fmt}")
+    etag = qr_etag(payload, fmt)
+    image = await qr_cache.get(etag)
+    if image is not None:
+        return image, etag
+    if _slots is None:
+        _slots = asyncio.Semaphore(QR_RENDER_QUEUE)
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(_get_executor(), render_qr, payload, fmt)
+    await qr_cache.set(etag, image, QR_CACHE_TTL)
+    return image, etag
+
+
+def shutdown_qr_pool():
+    """Stop the render workers; called when the app shuts down."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,36 @@
+"""
+JSON response class for documents straight out of MongoDB.
+
+orjson serializes dicts, lists, strings, numbers and datetimes natively in
+C and only calls back into Python for the BSON types it does not know, so
+routes can return documents as read without converting them first.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import JSONResponse
+
+
+def bson_default(obj: Any):
+    """Encode the BSON types orjson does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content that may contain ObjectId, datetime and Decimal128 values"""
+    return orjson.dumps(content, default=bson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class BSONResponse(JSONResponse):
+    """JSONResponse that encodes ObjectId, datetime and Decimal128 without a pre-pass"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,119 @@
+"""
+Pre-encoded response snapshots for small, rarely changing catalogs.
+
+A snapshot holds the JSON body of a response, its gzip-compressed form and
+a strong ETag derived from the body. Repeated requests are answered with
+the stored bytes, and a matching If-None-Match gets a 304 before anything
+is queried or encoded. The repositories invalidate a catalog when they
+write to it; SNAPSHOT_TTL bounds how long another worker's write can go
+unnoticed.
+"""
+import gzip
+import hashlib
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from utils.responses import dumps
+
+SNAPSHOT_TTL = int(os.environ.get("SNAPSHOT_TTL", 300))
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+
+class Snapshot:
+    """An encoded response body, its gzip form and ETag."""
+
+    __slots__ = ("body", "gzipped", "etag", "status_code", "built_at")
+
+    def __init__(self, content, status_code: int = 200):
+        self.body = dumps(content)
+        self.gzipped = gzip.compress(self.body, mtime=0) if len(self.body) >= GZIP_MIN_BYTES else None
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.status_code = status_code
+        self.built_at = time.monotonic()
+
+
+class SnapshotCache:
+    """Snapshots per catalog and request variant (e.g. page parameters)."""
+
+    def __init__(self, ttl: int = SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._snapshots: Dict[str, Dict[str, Snapshot]] = {}
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, catalog: str, key: str = "") -> Optional[Snapshot]:
+        snapshot = self._snapshots.get(catalog, {}).get(key)
+        if snapshot is None or time.monotonic() - snapshot.built_at > self.ttl:
+            return None
+        return snapshot
+
+    async def get_or_build(
+        self,
+        catalog: str,
+        key: str,
+        build: Callable[[], Awaitable[Tuple[object, int]]]
+    ) -> Snapshot:
+        """
+        Get the snapshot, building it from ``build()`` -> (content, status_code) on a miss
+
+        Exceptions from ``build`` propagate and nothing is stored.
+        """
+        snapshot = self.get(catalog, key)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        content, status_code = await build()
+        snapshot = Snapshot(content, status_code)
+        self._snapshots.setdefault(catalog, {})[key] = snapshot
+        self.builds += 1
+        return snapshot
+
+    def invalidate(self, catalog: str) -> None:
+        """Drop every snapshot of a catalog"""
+        self._snapshots.pop(catalog, None)
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "builds": self.builds,
+            "snapshots": {catalog: len(entries) for catalog, entries in self._snapshots.items()},
+        }
+
+
+catalog_snapshots = SnapshotCache()
+
+
+def not_modified(request: Request, snapshot: Optional[Snapshot]) -> bool:
+    """Whether the client's If-None-Match already names this snapshot"""
+    if snapshot is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return snapshot.etag in tags or "*" in tags
+
+
+def snapshot_response(request: Request, snapshot: Snapshot) -> Response:
+    """304, gzipped or plain response for a snapshot, depending on the request headers"""
+    headers = {"ETag": snapshot.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if not_modified(request, snapshot):
+        return Response(status_code=304, headers=headers)
+    if snapshot.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(
+            content=snapshot.gzipped,
+            status_code=snapshot.status_code,
+            media_type="application/json",
+            headers=headers,
+        )
+    return Response(
+        content=snapshot.body,
+        status_code=snapshot.status_code,
+        media_type="application/json",
+        headers=headers,
+    )
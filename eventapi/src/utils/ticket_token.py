@@ -0,0 +1,134 @@
+"""
+Signed ticket tokens encoded into the QR codes and verified offline.
+
+A token packs the ticket id, event id, number of persons, expiry and a
+"paid" flag into 32 bytes, followed by a 16 byte truncated HMAC-SHA256, and
+is base64url encoded to 64 characters. A gate can verify it with the
+signing key and a local revocation set, without a database lookup.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from bson import ObjectId
+from dotenv import dotenv_values
+from utils.jwt_config import SECRET_KEY
+
+config = dotenv_values("../.env")
+
+# Falls back to the JWT secret so existing deployments keep working
+TICKET_SIGNING_KEY = config.get("TICKET_SIGNING_KEY") or SECRET_KEY
+TOKEN_VERSION = 1
+FLAG_PAID = 0x01
+SIGNATURE_BYTES = 16
+
+# version, flags, ticket id, event id, persons, expiry (unix seconds)
+_BODY = struct.Struct(">BB12s12sHI")
+TOKEN_BYTES = _BODY.size + SIGNATURE_BYTES
+
+
+class TicketVerifier:
+    """Checks ticket tokens against the signing key and a local revocation set."""
+
+    def __init__(self, key: Optional[str]):
+        self._mac = hmac.new(key.encode(), digestmod=hashlib.sha256) if key else None
+        self._revoked: Set[bytes] = set()
+
+    def _signature(self, body: bytes) -> bytes:
+        if self._mac is None:
+            raise Exception("TICKET_SIGNING_KEY is not configured")
+        mac = self._mac.copy()
+        mac.update(body)
+        return mac.digest()[:SIGNATURE_BYTES]
+
+    def sign(self, ticket_id: str, event_id: str, persons: int, expires_at: int, paid: bool = False) -> str:
+        """
+        Build a signed token
+
+        Args:
+            ticket_id (str): The ticket ID
+            event_id (str): The event ID
+            persons (int): Number of persons admitted
+            expires_at (int): Unix time after which the token is refused
+            paid (bool): Whether the ticket's payment is complete
+
+        Returns:
+            str: The base64url token
+        """
+        body = _BODY.pack(
+            TOKEN_VERSION,
+            FLAG_PAID if paid else 0,
+            ObjectId(ticket_id).binary,
+            ObjectId(event_id).binary,
+            persons,
+            expires_at,
+        )
+        return base64.urlsafe_b64encode(body + self._signature(body)).decode()
+
+    def verify(self, token: str, now: Optional[float] = None) -> Dict:
+        """
+        Verify a token without touching the database
+
+        Args:
+            token (str): The scanned token
+            now (Optional[float]): Current unix time, for tests
+
+        Returns:
+            Dict: {"verified": bool, "message": str} plus "ticket" when verified
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token)
+        except (binascii.Error, ValueError):
+            return {"verified": False, "message": "Invalid ticket token"}
+        if len(raw) != TOKEN_BYTES:
+            return {"verified": False, "message": "Invalid ticket token"}
+        body, signature = raw[:_BODY.size], raw[_BODY.size:]
+        if not hmac.compare_digest(signature, self._signature(body)):
+            return {"verified": False, "message": "Invalid ticket signature"}
+        version, flags, ticket_id, event_id, persons, expires_at = _BODY.unpack(body)
+        if version != TOKEN_VERSION:
+            return {"verified": False, "message": "Unsupported ticket token"}
+        if ticket_id in self._revoked:
+            return {"verified": False, "message": "Ticket has been cancelled"}
+        if expires_at < (now if now is not None else time.time()):
+            return {"verified": False, "message": "Ticket has expired"}
+        if not flags & FLAG_PAID:
+            return {"verified": False, "message": "Payment incomplete"}
+        return {
+            "verified": True,
+            "message": "Ticket verified successfully",
+            "ticket": {
+                "id": str(ObjectId(ticket_id)),
+                "event": str(ObjectId(event_id)),
+                "persons": persons,
+                "expires_at": expires_at,
+            },
+        }
+
+    def revoke(self, ticket_id: str):
+        """Refuse a ticket from now on"""
+        self._revoked.add(ObjectId(ticket_id).binary)
+
+    def load_revocations(self, ticket_ids: Iterable):
+        """Add tickets to the revocation set, e.g. the cancelled tickets from the database"""
+        self._revoked.update(ObjectId(ticket_id).binary for ticket_id in ticket_ids)
+
+    def revoked_count(self) -> int:
+        return len(self._revoked)
+
+
+ticket_verifier = TicketVerifier(TICKET_SIGNING_KEY)
+
+
+def sign_ticket(ticket_id: str, event_id: str, persons: int, expires_at: int, paid: bool = False) -> str:
+    """Sign a ticket token with the configured key"""
+    return ticket_verifier.sign(ticket_id, event_id, persons, expires_at, paid)
+
+
+def verify_ticket_token(token: str) -> Dict:
+    """Verify a ticket token with the configured key and revocation set"""
+    return ticket_verifier.verify(token)